@@ -0,0 +1,166 @@
+# app/cache.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time-to-live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SharedBackend(Protocol):
+    """Minimal Redis-style key/value interface for a cache tier shared across processes."""
+
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> Any: ...
+
+
+class LocalSharedBackend:
+    """In-process stand-in for a Redis server, for tests and single-node setups."""
+
+    def __init__(self):
+        self._cache = TTLCache(maxsize=1_000_000)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        self._cache.set(key, value, ttl=ex)
+
+
+def redis_backend(url: str, setting: str = "RESULT_CACHE_REDIS_URL") -> SharedBackend:
+    """Connect to a Redis-protocol server; requires the optional ``redis`` package."""
+    try:
+        import redis
+    except ImportError as e:
+        raise RuntimeError(f"{setting} is set but the 'redis' package is not installed") from e
+    return redis.Redis.from_url(url)
+
+
+def result_key(type: str, a: float, b: float) -> str:
+    """Cache key for a binary calculation.
+
+    Operands are keyed by their exact float value via ``float.hex`` so that
+    -0.0 and 0.0 stay distinct (they compare equal, but ``0.0 + -0.0`` and
+    ``-0.0 + -0.0`` differ in sign) and every NaN maps to the same key.
+    """
+    return f"calc:{type}:{float(a).hex()}:{float(b).hex()}"
+
+
+class ResultCache:
+    """Two-tier memoization for pure ``(type, a, b) -> result`` functions.
+
+    Lookups try the in-process LRU/TTL tier, then the optional shared tier.
+    Exceptions are never cached. A failing shared tier degrades to a miss.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: Optional[float] = None,
+        shared: Optional[SharedBackend] = None,
+    ):
+        self.enabled = maxsize > 0
+        self.local = TTLCache(maxsize=max(maxsize, 1), ttl=ttl)
+        self.shared = shared
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = self._shared_hits = self._misses = self._shared_errors = 0
+
+    def get_or_compute(self, type: str, a: float, b: float, fn: Callable[[float, float], float]) -> float:
+        if not self.enabled:
+            return fn(a, b)
+        key = result_key(getattr(type, "value", type), a, b)
+        result = self.local.get(key, _MISSING)
+        if result is not _MISSING:
+            self._count("_hits")
+            return result
+        if self.shared is not None:
+            raw = self._shared_call(self.shared.get, key)
+            if raw is not None:
+                result = float.fromhex(raw.decode() if isinstance(raw, bytes) else raw)
+                self.local.set(key, result)
+                self._count("_shared_hits")
+                return result
+        self._count("_misses")
+        result = fn(a, b)
+        self.local.set(key, result)
+        if self.shared is not None:
+            ex = int(self.ttl) if self.ttl else None
+            self._shared_call(self.shared.set, key, float(result).hex().encode(), ex)
+        return result
+
+    def _shared_call(self, method, *args):
+        try:
+            return method(*args)
+        except Exception:
+            logger.warning("result cache shared tier unavailable", exc_info=True)
+            self._count("_shared_errors")
+            return None
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._shared_hits + self._misses
+            return {
+                "hits": self._hits,
+                "shared_hits": self._shared_hits,
+                "misses": self._misses,
+                "shared_errors": self._shared_errors,
+                "hit_rate": (self._hits + self._shared_hits) / lookups if lookups else 0.0,
+                "size": len(self.local),
+            }
+
+    def clear(self) -> None:
+        self.local.clear()
+        with self._lock:
+            self._hits = self._shared_hits = self._misses = self._shared_errors = 0
@@ -1,36 +1,350 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
+from concurrent.futures import Future
+from typing import Callable, Iterator, List, Tuple, TypeVar
+import anyio.to_thread
+import logging
 import os
+import threading
+import time
 
-# if we're testing, use in-memory DB
-if os.getenv("TESTING"):
-    DATABASE_URL = "sqlite:///:memory:"
-else:
-    BASE_DIR = Path(__file__).resolve().parent.parent  # .../app
-    DB_PATH = BASE_DIR / "test.db"
-    DATABASE_URL = f"sqlite:///{DB_PATH}"
-
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+from app.profiling import profile_phase
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # .../app
+DEFAULT_DATABASE_URL = f"sqlite:///{BASE_DIR / 'test.db'}"
+# what create_all() built before migrations existed, and the newest
+# migration; see upgrade_schema()
+BASELINE_REVISION = "0001"
+SCHEMA_REVISION = "0004"
+
+# Upper bound on blocking DB work running concurrently in the worker threadpool
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "40"))
+# Arbitrary key for the PostgreSQL advisory lock held during schema setup
+SCHEMA_LOCK_KEY = 0x63616C63
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    url: str = DEFAULT_DATABASE_URL
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_pre_ping: bool = True
+    pool_recycle: int = 1800  # seconds; -1 disables
+    statement_timeout_ms: int = 0  # 0 disables; Postgres only
+    sqlite_busy_timeout_ms: int = 5000
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        # if we're testing, use in-memory DB
+        if os.getenv("TESTING"):
+            url = "sqlite:///:memory:"
+        else:
+            url = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+        return cls(
+            url=url,
+            pool_size=int(os.getenv("DB_POOL_SIZE", cls.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", cls.max_overflow)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", cls.pool_timeout)),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", cls.pool_pre_ping),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", cls.pool_recycle)),
+            statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", cls.statement_timeout_ms)),
+            sqlite_busy_timeout_ms=int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", cls.sqlite_busy_timeout_ms)),
+        )
+
+
+def _sqlite_on_connect(settings: DatabaseSettings, in_memory: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            # readers no longer block the writer, and commits only fsync the WAL
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+        cursor.close()
+
+    return on_connect
+
+
+def create_db_engine(settings: DatabaseSettings) -> Engine:
+    url = make_url(settings.url)
+    if url.get_backend_name() == "sqlite":
+        in_memory = url.database in (None, "", ":memory:")
+        kwargs = {"connect_args": {"check_same_thread": False}}
+        if in_memory:
+            # handlers run on worker threads, so every thread must see the same
+            # in-memory database instead of getting a fresh one per connection
+            kwargs["poolclass"] = StaticPool
+        else:
+            kwargs.update(
+                pool_size=settings.pool_size,
+                max_overflow=settings.max_overflow,
+                pool_timeout=settings.pool_timeout,
+                pool_recycle=settings.pool_recycle,
+            )
+        engine = create_engine(url, **kwargs)
+        event.listen(engine, "connect", _sqlite_on_connect(settings, in_memory))
+        return engine
+
+    connect_args = {}
+    if settings.statement_timeout_ms and url.get_backend_name() == "postgresql":
+        connect_args["options"] = f"-c statement_timeout={int(settings.statement_timeout_ms)}"
+    return create_engine(
+        url,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_pre_ping=settings.pool_pre_ping,
+        pool_recycle=settings.pool_recycle,
+        connect_args=connect_args,
+    )
+
+
+settings = DatabaseSettings.from_env()
+DATABASE_URL = settings.url
+engine = create_db_engine(settings)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
 def get_db():
-    db = SessionLocal()
+    with profile_phase("get_db"):
+        db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        with profile_phase("get_db"):
+            db.close()
+
+
+class GroupCommitter:
+    """Runs small write transactions from concurrent requests as one commit.
+
+    ``execute(db, fn)`` queues ``fn``; a writer thread runs every queued
+    ``fn`` against one session and commits once, and each caller returns only
+    after that commit, so acknowledgements stay durable. While a commit is in
+    flight the next batch accumulates, so batching costs no extra latency
+    when idle; ``window`` optionally waits a little longer to fill a batch.
+
+    If any write in a batch fails, the batch is rolled back and each write is
+    retried in its own transaction, so one duplicate key only fails its own
+    request. This avoids relying on SAVEPOINTs, which the pysqlite driver
+    only supports with a connection-wide workaround.
+
+    When disabled, ``execute`` runs ``fn`` on the request's own session and
+    commits it, exactly as the handlers did before. When enabled, the
+    request's session is closed first: a caller waiting on the writer while
+    holding a pooled connection could otherwise starve the writer of one.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        enabled: bool = False,
+        max_batch: int = 256,
+        window: float = 0.0,
+    ):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.window = window
+        self._pending: List[Tuple[Callable, Future]] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closing = False
+        self._writes = 0
+        self._commits = 0
+        self._retried = 0
+        self._largest_batch = 0
+
+    def execute(self, db: Session, fn: Callable[[Session], T]) -> T:
+        if not self.enabled:
+            try:
+                result = fn(db)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            return result
+        if db is not None:
+            db.close()
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((fn, future))
+            if self._thread is None or not self._thread.is_alive():
+                self._closing = False
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                if self.window:
+                    deadline = time.monotonic() + self.window
+                    while len(self._pending) < self.max_batch and time.monotonic() < deadline:
+                        self._cond.wait(deadline - time.monotonic())
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Callable, Future]]) -> None:
+        try:
+            with self.session_factory() as db:
+                results = [fn(db) for fn, _ in batch]
+                db.commit()
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            logger.debug("Group commit of %d writes failed (%s); retrying one by one", len(batch), e)
+            with self._cond:
+                self._retried += len(batch)
+            for item in batch:
+                self._commit([item])
+            return
+        with self._cond:
+            self._writes += len(batch)
+            self._commits += 1
+            self._largest_batch = max(self._largest_batch, len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def close(self) -> None:
+        """Finish queued writes and stop the writer thread."""
+        with self._cond:
+            thread = self._thread
+            self._closing = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "writes": self._writes,
+                "commits": self._commits,
+                "retried": self._retried,
+                "largest_batch": self._largest_batch,
+            }
+
+
+group_commit = GroupCommitter(
+    SessionLocal,
+    enabled=_env_bool("DB_GROUP_COMMIT", False),
+    max_batch=int(os.getenv("DB_GROUP_COMMIT_MAX_BATCH", "256")),
+    window=float(os.getenv("DB_GROUP_COMMIT_WINDOW_MS", "0")) / 1000,
+)
+
+
+def configure_threadpool(size: int = DB_THREADPOOL_SIZE) -> None:
+    """Bound the threadpool FastAPI uses to run sync handlers and dependencies.
+
+    Must be called from inside the running event loop (e.g. a startup handler).
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+
+
+# Off when a supervisor already set the schema up before starting workers
+DB_INIT_ON_STARTUP = _env_bool("DB_INIT_ON_STARTUP", True)
+
+
+@contextmanager
+def schema_lock(engine: Engine) -> Iterator[Connection]:
+    """A connection in a transaction, held by one process at a time.
+
+    Processes starting together would otherwise all see a table missing and
+    race to create it. PostgreSQL uses a transaction-scoped advisory lock;
+    SQLite files use an flock on a ``.lock`` file next to the database.
+    """
+    url = engine.url
+    if url.get_backend_name() == "postgresql":
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"SELECT pg_advisory_xact_lock({SCHEMA_LOCK_KEY})")
+            yield connection
+        return
+    lock_file = None
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        try:
+            import fcntl
+        except ImportError:  # pragma: no cover - not POSIX
+            fcntl = None
+        if fcntl is not None:
+            lock_file = open(f"{url.database}.lock", "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+    try:
+        with engine.begin() as connection:
+            yield connection
+    finally:
+        if lock_file is not None:
+            lock_file.close()  # releases the flock
+
+
+def upgrade_schema(connection: Connection) -> None:
+    """Bring the schema on ``connection`` up to the current models.
+
+    An empty database is created by ``create_all()`` and stamped at the
+    latest migration. Otherwise the migrations in ``migrations/`` alter the
+    existing tables first. A database without an ``alembic_version`` table
+    predates migrations and is stamped at the baseline before upgrading.
+    ``create_all()`` then adds any table that is new, together with the
+    triggers and backfills attached to it.
+
+    A database already at SCHEMA_REVISION skips alembic, whose import alone
+    adds a couple of hundred milliseconds to every worker start, and its
+    ``create_all()`` finds every table in place and issues no DDL, so
+    starting a worker never touches the triggers other workers rely on.
+    """
+    tables = set(inspect(connection).get_table_names())
+    if "alembic_version" in tables:
+        current = connection.exec_driver_sql("SELECT version_num FROM alembic_version").scalar()
+        if current == SCHEMA_REVISION:
+            Base.metadata.create_all(bind=connection)
+            return
+
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.attributes["connection"] = connection
+    if "calculations" not in tables:
+        Base.metadata.create_all(bind=connection)
+        command.stamp(config, "head")
+        return
+    if "alembic_version" not in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+    Base.metadata.create_all(bind=connection)
 
 
 def init_db():
     # import models so SQLAlchemy registers them
-    from app.models import user, calculation  # noqa: F401
+    from app.models import user, calculation, calculation_stats  # noqa: F401
 
-    print("init_db() called")
-    Base.metadata.create_all(bind=engine)
-    print("Tables after create_all:", Base.metadata.tables.keys())
+    with schema_lock(engine) as connection:
+        upgrade_schema(connection)
+    logger.info("Schema ready: %s", ", ".join(Base.metadata.tables))
@@ -0,0 +1,161 @@
+# app/expressions.py
+"""Safe arithmetic expressions, compiled once and evaluated over NumPy arrays.
+
+Expressions are parsed with :mod:`ast`, checked against a whitelist of node
+types (numbers, variables, + - * / % ** ^, unary +/-, calls to FUNCTIONS) and
+compiled to a code object that only ever sees NumPy arrays and the whitelisted
+functions. Binding every variable to an array evaluates the expression for
+all rows in one pass.
+"""
+import ast
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from types import CodeType
+from typing import FrozenSet, Mapping
+
+import numpy as np
+
+from app.operations import ArrayLike
+
+MAX_EXPRESSION_LENGTH = 1000
+MAX_EXPRESSION_NODES = 200
+EXPRESSION_CACHE_SIZE = int(os.getenv("EXPRESSION_CACHE_SIZE", "1024"))
+
+FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "min": np.minimum,
+    "max": np.maximum,
+    "pow": np.power,
+}
+# functions not listed take exactly one argument
+ARITY = {"min": 2, "max": 2, "pow": 2}
+CONSTANTS = {"pi": np.pi, "e": np.e}
+
+_BINARY_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+
+
+class ExpressionError(ValueError):
+    """Raised for expressions that cannot be parsed, compiled or evaluated."""
+
+
+class _Checker(ast.NodeTransformer):
+    def __init__(self):
+        self.variables = set()
+        self.literals = {}
+
+    def visit_Expression(self, node):
+        return self.generic_visit(node)
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BINARY_OPS):
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        return self.generic_visit(node)
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARY_OPS):
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        return self.generic_visit(node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"Unsupported literal: {node.value!r}")
+        # literals become NumPy floats so constant-only sub-expressions get the
+        # same overflow / divide-by-zero semantics as arrays (and 9**9**9 can't
+        # turn into an unbounded integer computation)
+        try:
+            value = np.float64(node.value)
+        except (OverflowError, ValueError) as e:
+            raise ExpressionError("Literal is too large") from e
+        name = f"_k{len(self.literals)}"
+        self.literals[name] = value
+        return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+
+    def visit_Name(self, node):
+        if node.id.startswith("_"):
+            raise ExpressionError(f"Invalid variable name: {node.id}")
+        if node.id in FUNCTIONS:
+            raise ExpressionError(f"Function used as a value: {node.id}")
+        if node.id not in CONSTANTS:
+            self.variables.add(node.id)
+        return node
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            name = getattr(node.func, "id", "?")
+            raise ExpressionError(f"Unknown function: {name}")
+        if node.keywords:
+            raise ExpressionError("Keyword arguments are not supported")
+        expected = ARITY.get(node.func.id, 1)
+        if len(node.args) != expected:
+            raise ExpressionError(f"{node.func.id}() takes {expected} argument(s)")
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.operator, ast.unaryop)):
+            raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+        return super().generic_visit(node)
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    source: str
+    variables: FrozenSet[str]
+    literals: Mapping[str, np.float64]
+    code: CodeType
+
+    def evaluate(self, bindings: Mapping[str, ArrayLike]) -> np.ndarray:
+        """Evaluate against scalar or array bindings (broadcast together).
+
+        Division by zero and domain errors yield inf/NaN elements instead of
+        raising, so one bad row does not fail a whole vector.
+        """
+        missing = self.variables - bindings.keys()
+        if missing:
+            raise ExpressionError(f"Missing variables: {', '.join(sorted(missing))}")
+        namespace = {name: np.asarray(bindings[name], dtype=float) for name in self.variables}
+        namespace.update(FUNCTIONS)
+        namespace.update(CONSTANTS)
+        namespace.update(self.literals)
+        try:
+            with np.errstate(all="ignore"):
+                result = eval(self.code, {"__builtins__": {}}, namespace)
+        except (TypeError, ValueError) as e:
+            raise ExpressionError(str(e)) from e
+        return np.asarray(result, dtype=float)
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(source: str) -> CompiledExpression:
+    """Parse and compile ``source``; repeated formulas come from the LRU cache."""
+    if len(source) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError("Expression is too long")
+    try:
+        # calculator convention: ^ is power, with power's precedence
+        tree = ast.parse(source.strip().replace("^", "**"), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}") from e
+    except ValueError as e:
+        raise ExpressionError(f"Invalid expression: {e}") from e
+    except RecursionError as e:
+        raise ExpressionError("Expression is too complex") from e
+    if sum(1 for _ in ast.walk(tree)) > MAX_EXPRESSION_NODES:
+        raise ExpressionError("Expression is too complex")
+    checker = _Checker()
+    try:
+        tree = ast.fix_missing_locations(checker.visit(tree))
+        code = compile(tree, "<expression>", "eval")
+    except RecursionError as e:
+        raise ExpressionError("Expression is too complex") from e
+    return CompiledExpression(source, frozenset(checker.variables), checker.literals, code)
@@ -1,13 +1,66 @@
+import os
+from typing import Sequence, Union
+
+import numpy as np
+
+from app.cache import ResultCache, redis_backend
 from app.models.calculation import CalculationType
-from app.operations import add, subtract, multiply, divide
+from app.operations import ArrayLike, add, subtract, multiply, divide
+
+OPERATIONS = {
+    CalculationType.Add: add,
+    CalculationType.Subtract: subtract,
+    CalculationType.Multiply: multiply,
+    CalculationType.Divide: divide,
+}
 
 def compute(type: CalculationType, a: float, b: float) -> float:
-    if type == CalculationType.Add:
-        return add(a, b)
-    if type == CalculationType.Subtract:
-        return subtract(a, b)
-    if type == CalculationType.Multiply:
-        return multiply(a, b)
-    if type == CalculationType.Divide:
-        return divide(a, b)
-    raise ValueError(f"Unsupported calculation type: {type}")
+    try:
+        operation = OPERATIONS[type]
+    except KeyError:
+        raise ValueError(f"Unsupported calculation type: {type}")
+    return operation(a, b)
+
+# Memoizes compute(); RESULT_CACHE_SIZE=0 disables it. RESULT_CACHE_REDIS_URL
+# adds a shared tier so all workers benefit from each other's results.
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "0")) or None
+RESULT_CACHE_REDIS_URL = os.getenv("RESULT_CACHE_REDIS_URL")
+
+result_cache = ResultCache(
+    maxsize=RESULT_CACHE_SIZE,
+    ttl=RESULT_CACHE_TTL,
+    shared=redis_backend(RESULT_CACHE_REDIS_URL) if RESULT_CACHE_REDIS_URL else None,
+)
+
+def compute_cached(type: CalculationType, a: float, b: float) -> float:
+    return result_cache.get_or_compute(type, a, b, lambda a, b: compute(type, a, b))
+
+def compute_many(
+    types: Union[np.ndarray, Sequence[CalculationType]], a: ArrayLike, b: ArrayLike
+) -> np.ma.MaskedArray:
+    """Evaluate a mixed-type batch with one vectorized call per calculation type.
+
+    ``types`` may be CalculationType members, their string values, or a NumPy
+    string array of values. ``types``, ``a`` and ``b`` are broadcast together.
+    The result is masked where an item failed (division by zero).
+    """
+    if isinstance(types, np.ndarray) and types.dtype.kind == "U":
+        codes = types
+    else:
+        codes = np.array([CalculationType(t).value for t in types])
+    codes, a, b = np.broadcast_arrays(codes, np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    data = np.full(codes.shape, np.nan)
+    mask = np.zeros(codes.shape, dtype=bool)
+    handled = np.zeros(codes.shape, dtype=bool)
+    for type, operation in OPERATIONS.items():
+        selected = codes == type.value
+        if not selected.any():
+            continue
+        handled |= selected
+        result = operation(a[selected], b[selected])
+        data[selected] = np.ma.getdata(result)
+        mask[selected] = np.ma.getmaskarray(result)
+    if not handled.all():
+        raise ValueError(f"Unsupported calculation type: {codes[~handled][0]}")
+    return np.ma.masked_array(data, mask=mask)
@@ -0,0 +1,354 @@
+# app/importer.py
+"""Bulk import of calculations from CSV or NDJSON.
+
+The input is read in chunks of ``chunk_size`` rows, so memory stays bounded
+however large the file is. Each chunk is validated column-wise with NumPy
+instead of one pydantic model per row, its results come from a single
+``compute_many`` call, and it is inserted with COPY on PostgreSQL or one
+``executemany`` elsewhere, in its own transaction.
+
+CSV needs a header row naming ``a``, ``b`` and ``type``; other columns are
+ignored, so files produced by ``GET /calculations/export`` import as-is.
+NDJSON lines are objects with the same keys. An optional ``created_at``
+(ISO 8601, naive values taken as UTC) keeps the original timestamp; rows
+without one get the time of import.
+
+Rows that fail validation are skipped and reported with their line number;
+they never abort the import.
+"""
+import csv
+import io
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.factory.calculation_factory import compute_many
+from app.models.calculation import Calculation, CalculationType
+from app.models.calculation_stats import add_to_rollup, bump_version, deferred_rollup
+from app.pagination import as_utc
+
+try:  # optional: orjson parses NDJSON lines several times faster
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "20000"))
+# rejects reported individually per import; later ones are only counted
+IMPORT_MAX_REJECTS = int(os.getenv("IMPORT_MAX_REJECTS", "1000"))
+
+_TYPES = np.array([t.value for t in CalculationType])
+_COLUMNS = ("user_id", "a", "b", "type", "result", "created_at")
+# both raise a ValueError subclass on invalid input
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+class ImportFormatError(ValueError):
+    """Raised when the input as a whole cannot be read (format, CSV header)."""
+
+
+@dataclass
+class Reject:
+    line: int
+    error: str
+
+
+@dataclass
+class RawChunk:
+    """Unvalidated column values of up to ``chunk_size`` input rows."""
+
+    lines: List[int] = field(default_factory=list)
+    a: list = field(default_factory=list)
+    b: list = field(default_factory=list)
+    type: list = field(default_factory=list)
+    created_at: list = field(default_factory=list)
+    # rows that could not even be split into columns (invalid JSON)
+    rejects: List[Reject] = field(default_factory=list)
+
+
+@dataclass
+class ImportProgress:
+    """Running totals after a chunk, with that chunk's reported rejects."""
+
+    rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    rejects: List[Reject] = field(default_factory=list)
+
+    def totals(self) -> dict:
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "seconds": round(self.elapsed, 3),
+        }
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        return "ndjson"
+    return None
+
+
+def read_chunks(stream: BinaryIO, format: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[RawChunk]:
+    """Split a binary stream into RawChunks.
+
+    The CSV header is checked here, before the first chunk is requested, so
+    a caller can refuse a malformed file before it starts reporting progress.
+    """
+    # utf-8-sig drops the BOM spreadsheet exports start with; undecodable
+    # bytes become U+FFFD and fail validation on their own row
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    if format == "csv":
+        reader = csv.reader(text)
+        header = [name.strip() for name in next(reader, [])]
+        missing = [name for name in ("a", "b", "type") if name not in header]
+        if missing:
+            raise ImportFormatError(f"CSV header is missing column(s): {', '.join(missing)}")
+        return _csv_chunks(reader, header, chunk_size)
+    if format == "ndjson":
+        return _ndjson_chunks(text, chunk_size)
+    raise ImportFormatError(f"Unsupported import format: {format}")
+
+
+def _csv_chunks(reader, header: List[str], chunk_size: int) -> Iterator[RawChunk]:
+    a_at, b_at, type_at = header.index("a"), header.index("b"), header.index("type")
+    created_at = header.index("created_at") if "created_at" in header else None
+    width = max(a_at, b_at, type_at, -1 if created_at is None else created_at) + 1
+    while True:
+        chunk = RawChunk()
+        for row in islice(reader, chunk_size):
+            if not row:
+                continue
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            chunk.lines.append(reader.line_num)
+            chunk.a.append(row[a_at])
+            chunk.b.append(row[b_at])
+            chunk.type.append(row[type_at].strip())
+            chunk.created_at.append(row[created_at] if created_at is not None else None)
+        if not chunk.lines:
+            return
+        yield chunk
+
+
+def _ndjson_chunks(text, chunk_size: int) -> Iterator[RawChunk]:
+    numbered = enumerate(text, start=1)
+    while True:
+        chunk = RawChunk()
+        seen = 0
+        for line_number, line in islice(numbered, chunk_size):
+            seen += 1
+            if not line.strip():
+                continue
+            try:
+                record = _loads(line)
+            except ValueError:
+                chunk.rejects.append(Reject(line_number, "Invalid JSON"))
+                continue
+            if not isinstance(record, dict):
+                chunk.rejects.append(Reject(line_number, "Expected a JSON object"))
+                continue
+            chunk.lines.append(line_number)
+            chunk.a.append(record.get("a"))
+            chunk.b.append(record.get("b"))
+            chunk.type.append(record.get("type"))
+            chunk.created_at.append(record.get("created_at"))
+        if not seen:
+            return
+        yield chunk
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _floats(values: list) -> np.ndarray:
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        # something in the chunk is not a number: find out which, row by row
+        return np.array([_to_float(v) for v in values], dtype=float)
+
+
+def _timestamps(values: list, now: np.datetime64):
+    """``created_at`` values as naive-UTC datetime64, and which ones parsed."""
+    stamps = np.full(len(values), now)
+    parsed = np.ones(len(values), dtype=bool)
+    for index, value in enumerate(values):
+        if value is None or value == "":
+            continue
+        try:
+            stamp = as_utc(datetime.fromisoformat(value))
+        except (TypeError, ValueError):
+            parsed[index] = False
+        else:
+            stamps[index] = np.datetime64(stamp.replace(tzinfo=None), "us")
+    return stamps, parsed
+
+
+@dataclass
+class ValidRows:
+    """Validated columns of one chunk; ``created_at`` is naive UTC datetime64[us]."""
+
+    a: np.ndarray
+    b: np.ndarray
+    type: np.ndarray
+    result: np.ndarray
+    created_at: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.a)
+
+
+def validate(chunk: RawChunk, now: datetime) -> Tuple[ValidRows, List[Reject]]:
+    """Rows ready to insert, plus rejects, for one chunk.
+
+    Operands must be finite numbers, ``type`` a CalculationType value and
+    ``created_at`` a valid timestamp; division by zero and results that are
+    not finite are rejected the way POST /calculations/batch reports them.
+    """
+    rejects = list(chunk.rejects)
+    a, b = _floats(chunk.a), _floats(chunk.b)
+    types = np.array([t if isinstance(t, str) else "" for t in chunk.type], dtype=str)
+    now = np.datetime64(as_utc(now).replace(tzinfo=None), "us")
+    if any(value is not None for value in chunk.created_at):
+        created_at, dated = _timestamps(chunk.created_at, now)
+    else:
+        created_at, dated = np.full(len(chunk.lines), now), np.ones(len(chunk.lines), dtype=bool)
+
+    known_type = np.isin(types, _TYPES)
+    finite = np.isfinite(a) & np.isfinite(b)
+    ok = known_type & finite & dated
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        results = compute_many(types[ok], a[ok], b[ok])
+    zero_divisor = np.zeros(len(ok), dtype=bool)
+    zero_divisor[np.flatnonzero(ok)] = np.ma.getmaskarray(results)
+    computed = ~np.ma.getmaskarray(results) & np.isfinite(np.ma.getdata(results))
+    ok[np.flatnonzero(ok)[~computed]] = False
+
+    for index in np.flatnonzero(~ok).tolist():
+        if not known_type[index]:
+            error = "Unsupported calculation type"
+        elif not finite[index]:
+            error = "a and b must be finite numbers"
+        elif not dated[index]:
+            error = "Invalid created_at"
+        elif zero_divisor[index]:
+            error = "Cannot divide by zero!"
+        else:
+            # overflow, e.g. 1e308 * 10
+            error = "Result is not a finite number"
+        rejects.append(Reject(chunk.lines[index], error))
+    rejects.sort(key=lambda reject: reject.line)
+
+    rows = ValidRows(
+        a=a[ok], b=b[ok], type=types[ok], result=np.ma.getdata(results)[computed], created_at=created_at[ok]
+    )
+    return rows, rejects
+
+
+def _sqlite_timestamps(created_at: np.ndarray) -> List[str]:
+    # SQLAlchemy's SQLite DateTime storage format; imports mostly share a
+    # handful of timestamps, so format each distinct one once
+    distinct, inverse = np.unique(created_at, return_inverse=True)
+    formatted = np.char.replace(np.datetime_as_string(distinct, unit="us"), "T", " ")
+    return formatted[inverse].tolist()
+
+
+def insert_rows(db: Session, user_id: int, rows: ValidRows) -> None:
+    """Insert validated rows through ``db``'s connection, without committing.
+
+    The batch's calculation_stats rollup and the owner's version bump are
+    applied once each, and the per-row triggers are skipped while the rows
+    go in.
+    """
+    if not len(rows):
+        return
+    connection = db.connection()
+    columns = (
+        [user_id] * len(rows), rows.a.tolist(), rows.b.tolist(), rows.type.tolist(), rows.result.tolist(),
+    )
+    add_to_rollup(connection, user_id, rows.type, rows.created_at, rows.result)
+    bump_version(connection, user_id)
+    with deferred_rollup(connection):
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            _copy_rows(connection, zip(*columns, (str(ts) + "+00" for ts in rows.created_at)))
+        elif dialect == "sqlite":
+            # straight to cursor.executemany(), skipping per-row bind processing
+            connection.exec_driver_sql(
+                f"INSERT INTO calculations ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                list(zip(*columns, _sqlite_timestamps(rows.created_at))),
+            )
+        else:
+            created_at = [ts.replace(tzinfo=timezone.utc) for ts in rows.created_at.astype(object)]
+            connection.execute(
+                insert(Calculation.__table__), [dict(zip(_COLUMNS, row)) for row in zip(*columns, created_at)]
+            )
+
+
+def _copy_rows(connection, rows: Iterable[tuple]) -> None:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    sql = f"COPY calculations ({', '.join(_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = connection.connection.driver_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buf.seek(0)
+            cursor.copy_expert(sql, buf)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buf.getvalue())
+    finally:
+        cursor.close()
+
+
+def run_import(
+    session_factory: Callable[[], Session],
+    user_id: int,
+    chunks: Iterator[RawChunk],
+    max_rejects: int = IMPORT_MAX_REJECTS,
+) -> Iterator[ImportProgress]:
+    """Validate and insert ``chunks`` for ``user_id``, yielding after each.
+
+    Every chunk commits on its own, so an import that fails part-way keeps
+    the chunks already reported as imported. Only the first ``max_rejects``
+    rejects are reported individually.
+    """
+    progress = ImportProgress()
+    reported = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        rows, rejects = validate(chunk, datetime.now(timezone.utc))
+        with session_factory() as db:
+            insert_rows(db, user_id, rows)
+            db.commit()
+        listed = rejects[: max(0, max_rejects - reported)]
+        reported += len(listed)
+        progress = ImportProgress(
+            rows=progress.rows + len(rows) + len(rejects),
+            imported=progress.imported + len(rows),
+            rejected=progress.rejected + len(rejects),
+            chunks=progress.chunks + 1,
+            elapsed=time.perf_counter() - start,
+            rejects=listed,
+        )
+        yield progress
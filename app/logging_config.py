@@ -0,0 +1,173 @@
+# app/logging_config.py
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Tuple
+
+# LOG_MODE controls per-calculation logging in app.operations:
+#   off     - only warnings and errors
+#   sampled - roughly LOG_SAMPLE_RATE of INFO records are kept
+#   full    - every INFO record
+LOG_MODE = os.getenv("LOG_MODE", "sampled")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+
+HOT_PATH_LOGGERS = ("app.operations",)
+STRUCTURED_FIELDS = ("op", "a", "b", "result")
+
+
+# Fraction of hot-path INFO records to keep; set by configure_logging
+_sample_rate = 1.0
+
+
+def keep_sample() -> bool:
+    """Decide whether a hot-path INFO record should be emitted.
+
+    Called before the record is built, so dropped samples cost almost nothing.
+    """
+    return _sample_rate >= 1.0 or random.random() < _sample_rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Enqueue records untouched so formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class DeferredQueueListener(QueueListener):
+    """Builds the records ``log_info`` enqueued as tuples, then handles them.
+
+    Those records all share level, process and source fields, so each one
+    starts as a copy of a template made once, instead of going through
+    ``LogRecord.__init__``.
+    """
+
+    _template: Optional[dict] = None
+
+    def prepare(self, record):
+        if not isinstance(record, tuple):
+            return record
+        name, created, thread, msg, args, extra = record
+        if self._template is None:
+            self._template = vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None))
+        prepared = logging.LogRecord.__new__(logging.LogRecord)
+        fields = prepared.__dict__
+        fields.update(self._template)
+        # when and where the call happened, not when the listener got to it
+        fields.update(
+            name=name, msg=msg, args=args, created=created,
+            msecs=int((created - int(created)) * 1000) + 0.0,
+            relativeCreated=(created - logging._startTime) * 1000,
+            thread=thread, threadName=None,
+        )
+        fields.update(extra)
+        return prepared
+
+
+# the handler configure_logging installed, while it is the only one on root
+_queue_handler: Optional[DeferredQueueHandler] = None
+
+
+def log_info(logger: logging.Logger, msg: str, args: Tuple, extra: dict) -> None:
+    """Emit a hot-path INFO record; the caller has done the level and sampling checks.
+
+    Building a LogRecord (caller lookup, process and thread names) costs far
+    more than the queue put, so while configure_logging's queue is the only
+    place records go, the caller enqueues a tuple and the listener thread
+    builds the record. Anything else attached (a test's capture handler,
+    say) gets the record through ``logger.info`` as usual.
+    """
+    handler = _queue_handler
+    if handler is not None and not logger.handlers and logging.root.handlers == [handler]:
+        handler.queue.put_nowait((logger.name, time.time(), threading.get_ident(), msg, args, extra))
+    else:
+        logger.info(msg, *args, extra=extra, stacklevel=3)
+
+
+def configure_logging(
+    mode: str = LOG_MODE,
+    sample_rate: float = LOG_SAMPLE_RATE,
+    fmt: str = LOG_FORMAT,
+    stream=None,
+) -> QueueListener:
+    """Route root logging through a queue drained by a background thread.
+
+    Request threads only pay for an enqueue; the listener formats and writes.
+    Returns the started listener; call ``stop()`` on it at shutdown to flush.
+    """
+    global _sample_rate, _queue_handler
+    if mode not in ("off", "sampled", "full"):
+        raise ValueError(f"Unsupported log mode: {mode}")
+
+    handler = logging.StreamHandler(stream)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    _remove_queue_handlers(root)
+    _queue_handler = DeferredQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(logging.INFO)
+
+    for name in HOT_PATH_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING if mode == "off" else logging.INFO)
+    _sample_rate = sample_rate if mode == "sampled" else 1.0
+
+    listener = DeferredQueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def _remove_queue_handlers(root: logging.Logger) -> None:
+    global _queue_handler
+    for existing in [h for h in root.handlers if isinstance(h, DeferredQueueHandler)]:
+        root.removeHandler(existing)
+    _queue_handler = None
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    """Configure logging from the environment, unless it already is."""
+    global _listener
+    if _listener is None:
+        _listener = configure_logging()
+
+
+def shutdown_logging() -> None:
+    """Flush and stop the listener, and detach its queue from the root logger.
+
+    Without the handler gone, records logged after shutdown would pile up in
+    a queue nobody drains. ``setup_logging()`` starts a fresh pair.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _remove_queue_handlers(logging.getLogger())
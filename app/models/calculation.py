@@ -1,6 +1,7 @@
 # app/models/calculation.py
 import enum
-from sqlalchemy import Column, Integer, Enum, Float, DateTime, func
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, Enum, Float, DateTime, ForeignKey, Index, func
 from app.db import Base
 
 
@@ -11,13 +12,29 @@ class CalculationType(str, enum.Enum):
     Divide = "Divide"
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Calculation(Base):
     __tablename__ = "calculations"
 
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
     a = Column(Float, nullable=False)
     b = Column(Float, nullable=False)
     type = Column(Enum(CalculationType), nullable=False)
     result = Column(Float, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    # Optional relationship to User could go here (user_id)
+    # set client-side (microsecond precision) so keyset cursors compare exactly
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now())
+    # NULL until the row is first updated; with created_at it versions the
+    # row for ETags
+    updated_at = Column(DateTime(timezone=True), onupdate=_utcnow)
+
+    # back keyset pagination on (created_at, id), optionally filtered by type,
+    # within a single user's rows
+    __table_args__ = (
+        Index("ix_calculations_user_created_id", "user_id", "created_at", "id"),
+        Index("ix_calculations_user_type_created_id", "user_id", "type", "created_at", "id"),
+    )
+
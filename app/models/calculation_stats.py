@@ -0,0 +1,378 @@
+# app/models/calculation_stats.py
+"""Hourly per-user, per-type rollup of calculation results.
+
+The rollup is maintained by database triggers on ``calculations``, so every
+write path (single inserts, batches, write-behind flushes, group commits,
+updates, deletes) keeps it current inside the same statement, and the write
+endpoints stay single-statement.
+
+Count and total are adjusted incrementally. Removing a row that held its
+bucket's min or max recomputes that one bucket from ``calculations`` (an
+index range scan over one user/type/hour); removing the last row deletes the
+bucket.
+
+The same triggers count every change to a user's calculations in
+``calculation_versions``, which ETags for calculation collections derive
+from; a user without a row there has no calculations and is at version 0.
+
+Bulk loaders can fold a whole batch in with one ``add_to_rollup`` upsert and
+one ``bump_version``, and insert the rows under ``deferred_rollup``, skipping
+the per-row trigger work.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+import numpy as np
+from sqlalchemy import Column, DateTime, Enum, Float, ForeignKey, Integer, event, func
+from sqlalchemy.engine import Connection
+
+from app.db import Base
+from app.models.calculation import CalculationType
+
+_TYPE_VALUES = sorted(t.value for t in CalculationType)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class CalculationStat(Base):
+    __tablename__ = "calculation_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    type = Column(Enum(CalculationType), primary_key=True)
+    # start of the UTC hour
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False)
+    min_result = Column(Float, nullable=False)
+    max_result = Column(Float, nullable=False)
+
+
+class CalculationVersion(Base):
+    __tablename__ = "calculation_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+# --- SQLite ---------------------------------------------------------------
+
+_SQLITE_BUCKET = "strftime('%Y-%m-%d %H:00:00.000000', {row}.created_at)"
+_SQLITE_BUCKET_RANGE = (
+    "created_at >= strftime('%Y-%m-%d %H:00:00', {row}.created_at) "
+    "AND created_at < strftime('%Y-%m-%d %H:00:00', {row}.created_at, '+1 hour')"
+)
+
+
+def _sqlite_add(row: str) -> str:
+    return f"""
+    INSERT INTO calculation_stats (user_id, type, bucket, count, total, min_result, max_result)
+    VALUES ({row}.user_id, {row}.type, {_SQLITE_BUCKET.format(row=row)}, 1, {row}.result, {row}.result, {row}.result)
+    ON CONFLICT (user_id, type, bucket) DO UPDATE SET
+        count = count + 1,
+        total = total + excluded.total,
+        min_result = min(min_result, excluded.min_result),
+        max_result = max(max_result, excluded.max_result);
+    """
+
+
+def _sqlite_remove(row: str) -> str:
+    where = (
+        f"user_id = {row}.user_id AND type = {row}.type "
+        f"AND bucket = {_SQLITE_BUCKET.format(row=row)}"
+    )
+    same_bucket = (
+        f"FROM calculations WHERE user_id = {row}.user_id AND type = {row}.type "
+        f"AND {_SQLITE_BUCKET_RANGE.format(row=row)}"
+    )
+    return f"""
+    UPDATE calculation_stats SET
+        count = count - 1,
+        total = total - {row}.result,
+        min_result = CASE WHEN {row}.result > min_result THEN min_result
+                          ELSE coalesce((SELECT min(result) {same_bucket}), min_result) END,
+        max_result = CASE WHEN {row}.result < max_result THEN max_result
+                          ELSE coalesce((SELECT max(result) {same_bucket}), max_result) END
+    WHERE {where};
+    DELETE FROM calculation_stats WHERE {where} AND count <= 0;
+    """
+
+
+def _sqlite_bump(row: str) -> str:
+    return f"""
+    INSERT INTO calculation_versions (user_id, version) VALUES ({row}.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    """
+
+
+# removals only touch existing counters: a user being deleted must not get a
+# new one, and any user with rows already has one
+_SQLITE_BUMP_EXISTING = "UPDATE calculation_versions SET version = version + 1 WHERE user_id = {row}.user_id;"
+
+# (name, event, condition, body); updates are split in two so each half can
+# skip rows without an owner
+_SQLITE_TRIGGERS = [
+    ("calculation_stats_insert", "INSERT", "NEW.user_id IS NOT NULL", _sqlite_add("NEW")),
+    ("calculation_stats_delete", "DELETE", "OLD.user_id IS NOT NULL", _sqlite_remove("OLD")),
+    ("calculation_stats_update_old", "UPDATE OF user_id, type, result, created_at", "OLD.user_id IS NOT NULL",
+     _sqlite_remove("OLD")),
+    ("calculation_stats_update_new", "UPDATE OF user_id, type, result, created_at", "NEW.user_id IS NOT NULL",
+     _sqlite_add("NEW")),
+    # every column counts for the version, so these fire on any update
+    ("calculation_versions_insert", "INSERT", "NEW.user_id IS NOT NULL", _sqlite_bump("NEW")),
+    ("calculation_versions_delete", "DELETE", "OLD.user_id IS NOT NULL", _SQLITE_BUMP_EXISTING.format(row="OLD")),
+    ("calculation_versions_update_old", "UPDATE", "OLD.user_id IS NOT NULL AND OLD.user_id IS NOT NEW.user_id",
+     _SQLITE_BUMP_EXISTING.format(row="OLD")),
+    ("calculation_versions_update_new", "UPDATE", "NEW.user_id IS NOT NULL", _sqlite_bump("NEW")),
+]
+
+# deferred_rollup's switch: a row here turns every trigger off. Only the
+# transaction that writes it ever sees it (a trigger on a main table may not
+# read a TEMP one), and removing it again is plain DML, unlike dropping the
+# triggers, which would invalidate every other connection's statements.
+_SQLITE_DEFERRED = "calculation_stats_deferred"
+
+# each trigger is dropped first, so install_triggers() replaces an older
+# definition
+_SQLITE_DDL = [f"CREATE TABLE IF NOT EXISTS {_SQLITE_DEFERRED} (deferred INTEGER PRIMARY KEY)"] + [
+    statement
+    for name, when, condition, body in _SQLITE_TRIGGERS
+    for statement in (
+        f"DROP TRIGGER IF EXISTS {name}",
+        f"""
+        CREATE TRIGGER {name} AFTER {when} ON calculations
+        WHEN {condition} AND NOT EXISTS (SELECT 1 FROM {_SQLITE_DEFERRED})
+        BEGIN {body} END
+        """,
+    )
+]
+
+_SQLITE_BACKFILL = f"""
+INSERT INTO calculation_stats (user_id, type, bucket, count, total, min_result, max_result)
+SELECT user_id, type, {_SQLITE_BUCKET.format(row="calculations")}, count(*), sum(result), min(result), max(result)
+FROM calculations WHERE user_id IS NOT NULL
+GROUP BY 1, 2, 3
+"""
+
+# --- PostgreSQL -----------------------------------------------------------
+
+_PG_BUCKET = "(date_trunc('hour', {row}.created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC')"
+
+_PG_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION calculation_stats_maintain() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.user_id IS NOT NULL THEN
+            UPDATE calculation_stats s SET
+                count = s.count - 1,
+                total = s.total - OLD.result,
+                min_result = CASE WHEN OLD.result > s.min_result THEN s.min_result ELSE coalesce(
+                    (SELECT min(c.result) FROM calculations c
+                     WHERE c.user_id = OLD.user_id AND c.type = OLD.type
+                       AND c.created_at >= s.bucket AND c.created_at < s.bucket + interval '1 hour'),
+                    s.min_result) END,
+                max_result = CASE WHEN OLD.result < s.max_result THEN s.max_result ELSE coalesce(
+                    (SELECT max(c.result) FROM calculations c
+                     WHERE c.user_id = OLD.user_id AND c.type = OLD.type
+                       AND c.created_at >= s.bucket AND c.created_at < s.bucket + interval '1 hour'),
+                    s.max_result) END
+            WHERE s.user_id = OLD.user_id AND s.type = OLD.type AND s.bucket = {_PG_BUCKET.format(row="OLD")};
+            DELETE FROM calculation_stats
+            WHERE user_id = OLD.user_id AND type = OLD.type
+              AND bucket = {_PG_BUCKET.format(row="OLD")} AND count <= 0;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.user_id IS NOT NULL THEN
+            INSERT INTO calculation_stats (user_id, type, bucket, count, total, min_result, max_result)
+            VALUES (NEW.user_id, NEW.type, {_PG_BUCKET.format(row="NEW")}, 1, NEW.result, NEW.result, NEW.result)
+            ON CONFLICT (user_id, type, bucket) DO UPDATE SET
+                count = calculation_stats.count + 1,
+                total = calculation_stats.total + EXCLUDED.total,
+                min_result = LEAST(calculation_stats.min_result, EXCLUDED.min_result),
+                max_result = GREATEST(calculation_stats.max_result, EXCLUDED.max_result);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS calculation_stats_maintain ON calculations",
+    """
+    CREATE TRIGGER calculation_stats_maintain
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, type, result, created_at ON calculations
+    FOR EACH ROW
+    WHEN (current_setting('calculation_stats.deferred', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION calculation_stats_maintain()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION calculation_versions_bump() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE calculation_versions SET version = version + 1 WHERE user_id = OLD.user_id;
+            RETURN NULL;
+        END IF;
+        IF TG_OP = 'UPDATE' THEN
+            IF OLD.user_id IS DISTINCT FROM NEW.user_id THEN
+                UPDATE calculation_versions SET version = version + 1 WHERE user_id = OLD.user_id;
+            END IF;
+        END IF;
+        IF NEW.user_id IS NOT NULL THEN
+            INSERT INTO calculation_versions (user_id, version) VALUES (NEW.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET version = calculation_versions.version + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS calculation_versions_bump ON calculations",
+    """
+    CREATE TRIGGER calculation_versions_bump
+    AFTER INSERT OR DELETE OR UPDATE ON calculations
+    FOR EACH ROW
+    WHEN (current_setting('calculation_stats.deferred', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION calculation_versions_bump()
+    """,
+]
+
+_PG_BACKFILL = f"""
+INSERT INTO calculation_stats (user_id, type, bucket, count, total, min_result, max_result)
+SELECT user_id, type, {_PG_BUCKET.format(row="calculations")}, count(*), sum(result), min(result), max(result)
+FROM calculations WHERE user_id IS NOT NULL
+GROUP BY 1, 2, 3
+"""
+
+_PG_DEFER = "SELECT set_config('calculation_stats.deferred', %s, true)"
+
+_DIALECTS = {"sqlite": (_SQLITE_DDL, _SQLITE_BACKFILL), "postgresql": (_PG_DDL, _PG_BACKFILL)}
+
+_VERSIONS_BACKFILL = """
+INSERT INTO calculation_versions (user_id, version)
+SELECT DISTINCT user_id, 1 FROM calculations WHERE user_id IS NOT NULL
+"""
+
+
+def install_triggers(connection: Connection) -> None:
+    """(Re)create the rollup and version triggers on ``calculations``.
+
+    Runs when ``create_all()`` creates the tables involved, and from the
+    migration that last changed the definitions. Never on a plain startup:
+    replacing the triggers locks ``calculations`` and, until they are back,
+    lets other workers' writes skip the rollup.
+    """
+    ddl = _DIALECTS.get(connection.dialect.name)
+    if ddl is None:
+        return
+    for statement in ddl[0]:
+        connection.exec_driver_sql(statement)
+
+
+_TRIGGER_TABLES = {"calculations", "calculation_stats", "calculation_versions"}
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_triggers(metadata, connection, tables=(), **kw):
+    ddl = _DIALECTS.get(connection.dialect.name)
+    if ddl is None or not _TRIGGER_TABLES & {table.name for table in tables}:
+        return
+    backfill = ddl[1]
+    # new tables next to existing history: seed them before the triggers
+    # start counting
+    if CalculationStat.__table__ in tables:
+        connection.exec_driver_sql(backfill)
+    if CalculationVersion.__table__ in tables:
+        connection.exec_driver_sql(_VERSIONS_BACKFILL)
+    install_triggers(connection)
+
+
+# --- bulk loads -----------------------------------------------------------
+
+@contextmanager
+def deferred_rollup(connection: Connection) -> Iterator[None]:
+    """Skip the per-row triggers for inserts made inside the block.
+
+    The caller must ``add_to_rollup`` the same rows and ``bump_version``
+    their owner in the same transaction, and must only insert. Other writers
+    are unaffected: PostgreSQL scopes the switch to this transaction, and
+    SQLite sets it with a row that is gone again before the transaction
+    commits, which nobody else can observe as SQLite allows one writer at a
+    time and readers see the last commit.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.exec_driver_sql(_PG_DEFER, ("on",))
+        yield
+        connection.exec_driver_sql(_PG_DEFER, ("off",))
+    elif dialect == "sqlite":
+        connection.exec_driver_sql(f"INSERT INTO {_SQLITE_DEFERRED} VALUES (1)")
+        try:
+            yield
+        finally:
+            # a committed flag would switch the triggers off for everyone
+            connection.exec_driver_sql(f"DELETE FROM {_SQLITE_DEFERRED}")
+    else:
+        yield
+
+
+def _upsert(connection: Connection):
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    return upsert
+
+
+def bump_version(connection: Connection, user_id: int) -> None:
+    """Count a change to ``user_id``'s calculations made with the triggers deferred."""
+    stmt = _upsert(connection)(CalculationVersion).values(user_id=user_id, version=1)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[CalculationVersion.__table__.c.user_id],
+        set_={"version": CalculationVersion.__table__.c.version + 1},
+    ))
+
+
+def add_to_rollup(
+    connection: Connection, user_id: int, types: np.ndarray, created_at: np.ndarray, results: np.ndarray
+) -> None:
+    """Fold a batch of rows into the rollup with one upsert.
+
+    ``types`` holds CalculationType values, ``created_at`` naive UTC
+    datetime64 values and ``results`` floats, one entry per row.
+    """
+    if not len(results):
+        return
+    type_codes = np.searchsorted(_TYPE_VALUES, types)
+    hours = created_at.astype("datetime64[h]").astype(np.int64)
+    keys, inverse = np.unique(hours * len(_TYPE_VALUES) + type_codes, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+    ordered = results[order]
+    rows = [
+        {
+            "user_id": user_id,
+            "type": _TYPE_VALUES[key % len(_TYPE_VALUES)],
+            "bucket": _EPOCH + timedelta(hours=key // len(_TYPE_VALUES)),
+            "count": count,
+            "total": total,
+            "min_result": low,
+            "max_result": high,
+        }
+        for key, count, total, low, high in zip(
+            keys.tolist(),
+            np.bincount(inverse).tolist(),
+            np.bincount(inverse, weights=results).tolist(),
+            np.minimum.reduceat(ordered, starts).tolist(),
+            np.maximum.reduceat(ordered, starts).tolist(),
+        )
+    ]
+    if connection.dialect.name == "postgresql":
+        least, greatest = func.least, func.greatest
+    else:
+        least, greatest = func.min, func.max
+    stmt = _upsert(connection)(CalculationStat).values(rows)
+    table = CalculationStat.__table__.c
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[table.user_id, table.type, table.bucket],
+        set_={
+            "count": table.count + stmt.excluded.count,
+            "total": table.total + stmt.excluded.total,
+            "min_result": least(table.min_result, stmt.excluded.min_result),
+            "max_result": greatest(table.max_result, stmt.excluded.max_result),
+        },
+    ))
@@ -1,30 +1,73 @@
-from typing import Union
+from typing import Sequence, Union
 import logging
 
+import numpy as np
+
+from app.logging_config import keep_sample, log_info
+
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
 
 Number = Union[int, float]
+# Anything np.asarray accepts: ndarrays, lists, array.array, memoryviews, ...
+ArrayLike = Union[Number, np.ndarray, Sequence[Number]]
+
+
+def _as_arrays(a, b):
+    """Return ``(a, b)`` as float arrays if either operand is array-like, else None."""
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return None
+    return np.asarray(a, dtype=float), np.asarray(b, dtype=float)
 
-def add(a: Number, b: Number) -> Number:
+
+def _log(op: str, symbol: str, a, b, result) -> None:
+    # level and sampling checks run before anything is built; the record
+    # itself is built and formatted on the logging listener thread
+    if logger.isEnabledFor(logging.INFO) and keep_sample():
+        log_info(
+            logger, "%s: %s %s %s = %s", (op, a, symbol, b, result),
+            {"op": op, "a": a, "b": b, "result": result},
+        )
+
+def add(a: ArrayLike, b: ArrayLike) -> ArrayLike:
+    arrays = _as_arrays(a, b)
+    if arrays is not None:
+        return np.add(*arrays)
     result = a + b
-    logger.info(f"add: {a} + {b} = {result}")
+    _log("add", "+", a, b, result)
     return result
 
-def subtract(a: Number, b: Number) -> Number:
+def subtract(a: ArrayLike, b: ArrayLike) -> ArrayLike:
+    arrays = _as_arrays(a, b)
+    if arrays is not None:
+        return np.subtract(*arrays)
     result = a - b
-    logger.info(f"subtract: {a} - {b} = {result}")
+    _log("subtract", "-", a, b, result)
     return result
 
-def multiply(a: Number, b: Number) -> Number:
+def multiply(a: ArrayLike, b: ArrayLike) -> ArrayLike:
+    arrays = _as_arrays(a, b)
+    if arrays is not None:
+        return np.multiply(*arrays)
     result = a * b
-    logger.info(f"multiply: {a} * {b} = {result}")
+    _log("multiply", "*", a, b, result)
     return result
 
-def divide(a: Number, b: Number) -> float:
+def divide(a: ArrayLike, b: ArrayLike) -> Union[float, np.ma.MaskedArray]:
+    """Divide ``a`` by ``b``.
+
+    Scalars raise ValueError on division by zero. Array-like operands are
+    broadcast and return a masked array whose mask marks the zero divisors.
+    """
+    arrays = _as_arrays(a, b)
+    if arrays is not None:
+        a, b = np.broadcast_arrays(*arrays)
+        zero = b == 0
+        result = np.divide(a, b, out=np.full(a.shape, np.nan), where=~zero)
+        return np.ma.masked_array(result, mask=zero)
     if b == 0:
-        logger.error(f"divide: attempt to divide {a} by zero")
+        logger.error("divide: attempt to divide %s by zero", a)
         raise ValueError("Cannot divide by zero!")
     result = a / b
-    logger.info(f"divide: {a} / {b} = {result}")
+    _log("divide", "/", a, b, result)
     return result
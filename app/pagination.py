@@ -0,0 +1,43 @@
+# app/pagination.py
+import base64
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = f"{created_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(id)
+    except ValueError as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalise a user-supplied timestamp to UTC (naive values are taken as UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def after_cursor(created_at_col, id_col, cursor: Tuple[datetime, int]):
+    """Rows strictly after ``cursor`` in (created_at, id) order.
+
+    The leading ``created_at >=`` term gives the planner an index range to
+    seek to; a bare OR of the two cases makes SQLite scan from the start.
+    """
+    created_at, id = cursor
+    return and_(created_at_col >= created_at, or_(created_at_col > created_at, id_col > id))
@@ -0,0 +1,363 @@
+# app/profiling.py
+"""Opt-in, request-scoped profiling.
+
+A profiled request gets a ``Profile`` in a context variable (which follows it
+into the threadpool). Instrumented code adds time to named phases; the
+middleware reports them as a ``Server-Timing`` header or, when a stack sample
+was requested, replaces the body with a speedscope JSON file.
+
+Unprofiled requests pay one context-variable lookup per instrumented point.
+"""
+import asyncio
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Honour the X-Profile request header ("timing" or "speedscope"). Off by
+# default: a stack sample costs real CPU, so don't expose it to everyone.
+PROFILE_ALLOW_HEADER = os.getenv("PROFILE_ALLOW_HEADER", "0").lower() in ("1", "true", "yes", "on")
+# Fraction of requests that get a Server-Timing header without being asked.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+
+PHASE_DESCRIPTIONS = {
+    "resolve": "body parsing, validation and dependencies",
+    "get_db": "session setup and teardown",
+    "auth": "get_current_user",
+    "handler": "handler body",
+    "db": "SQL execution",
+    "hash": "bcrypt",
+    "render": "response validation and serialization",
+    "total": "route total",
+}
+
+_current: ContextVar[Optional["Profile"]] = ContextVar("profile", default=None)
+
+
+class Profile:
+    def __init__(self, name: str, sample_stacks: bool = False):
+        self.name = name
+        self.sample_stacks = sample_stacks
+        self.phases: Dict[str, float] = {}
+        self.threads = set()
+        self._lock = threading.Lock()
+        self._sampler: Optional[StackSampler] = None
+        self.route_start = 0.0
+        self._handler_end = 0.0
+        self._get_db_at_handler_end = 0.0
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def enter_thread(self) -> None:
+        """Include the calling thread in the stack sample."""
+        self.threads.add(threading.get_ident())
+
+    def start(self) -> None:
+        self.enter_thread()
+        if self.sample_stacks:
+            self._sampler = StackSampler(self.threads, PROFILE_INTERVAL)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            f'{phase};dur={seconds * 1000:.3f};desc="{PHASE_DESCRIPTIONS.get(phase, phase)}"'
+            for phase, seconds in self.phases.items()
+        )
+
+    def speedscope(self) -> dict:
+        return self._sampler.speedscope(self.name) if self._sampler else StackSampler.empty(self.name)
+
+
+def current_profile() -> Optional[Profile]:
+    return _current.get()
+
+
+@contextmanager
+def profile_phase(phase: str):
+    """Add the block's wall time to ``phase`` of the current profile, if any."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(phase, time.perf_counter() - start)
+
+
+def profiled(phase: str):
+    """Decorator form of ``profile_phase`` for plain (non-generator) functions."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_phase(phase):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.add(phase, seconds)
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of a set of threads every ``interval`` seconds."""
+
+    def __init__(self, threads, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.threads = threads
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._frames: Dict[tuple, int] = {}
+        self._samples: List[List[int]] = []
+        self._weights: List[float] = []
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._samples.append(self._stack(frame))
+                    self._weights.append(now - last)
+            last = now
+
+    def _stack(self, frame) -> List[int]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, frame.f_lineno)
+            stack.append(self._frames.setdefault(key, len(self._frames)))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def speedscope(self, name: str) -> dict:
+        document = self.empty(name)
+        document["shared"]["frames"] = [
+            {"name": fn, "file": filename, "line": line} for fn, filename, line in self._frames
+        ]
+        profile = document["profiles"][0]
+        profile["samples"] = self._samples
+        profile["weights"] = self._weights
+        profile["endValue"] = sum(self._weights)
+        return document
+
+    @staticmethod
+    def empty(name: str) -> dict:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "calculator-profiler",
+            "shared": {"frames": []},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": 0,
+                    "samples": [],
+                    "weights": [],
+                }
+            ],
+        }
+
+
+def _time_endpoint(call):
+    if getattr(call, "__profiled__", False):
+        return call
+
+    def before():
+        profile = _current.get()
+        if profile is not None:
+            profile.enter_thread()
+            profile.add("resolve", time.perf_counter() - profile.route_start)
+        return profile, time.perf_counter()
+
+    def after(profile, start):
+        if profile is not None:
+            profile._handler_end = time.perf_counter()
+            profile._get_db_at_handler_end = profile.phases.get("get_db", 0.0)
+            profile.add("handler", profile._handler_end - start)
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def wrapper(*args, **kwargs):
+            profile, start = before()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                after(profile, start)
+    else:
+        @functools.wraps(call)
+        def wrapper(*args, **kwargs):
+            profile, start = before()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                after(profile, start)
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that times dependency resolution, the handler and rendering.
+
+    Set as ``app.router.route_class`` before routes are declared.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # the request handler reads dependant.call per request
+        self.dependant.call = _time_endpoint(self.dependant.call)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request):
+            profile = _current.get()
+            if profile is None:
+                return await handler(request)
+            profile.route_start = time.perf_counter()
+            profile._handler_end = 0.0
+            try:
+                return await handler(request)
+            finally:
+                end = time.perf_counter()
+                profile.add("total", end - profile.route_start)
+                if profile._handler_end:
+                    # get_db closes after the handler; that time is already its own phase
+                    teardown = profile.phases.get("get_db", 0.0) - profile._get_db_at_handler_end
+                    profile.add("render", max(0.0, end - profile._handler_end - teardown))
+
+        return profiled_handler
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware deciding which requests are profiled and reporting the result."""
+
+    def __init__(self, app, allow_header: Optional[bool] = None, sample_rate: Optional[float] = None):
+        self.app = app
+        self.allow_header = allow_header
+        self.sample_rate = sample_rate
+
+    def _mode(self, scope) -> Optional[str]:
+        allow_header = PROFILE_ALLOW_HEADER if self.allow_header is None else self.allow_header
+        if allow_header:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-profile":
+                    return "speedscope" if value.lower() == b"speedscope" else "timing"
+        sample_rate = PROFILE_SAMPLE_RATE if self.sample_rate is None else self.sample_rate
+        if sample_rate > 0 and random.random() < sample_rate:
+            return "timing"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        mode = self._mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(f"{scope['method']} {scope['path']}", sample_stacks=mode == "speedscope")
+        token = _current.set(profile)
+        profile.start()
+        try:
+            if mode == "timing":
+                await self.app(scope, receive, self._with_server_timing(profile, send))
+            else:
+                await self._speedscope(profile, scope, receive, send)
+        finally:
+            profile.stop()
+            _current.reset(token)
+
+    @staticmethod
+    def _with_server_timing(profile: Profile, send):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"server-timing", profile.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        return send_wrapper
+
+    async def _speedscope(self, profile: Profile, scope, receive, send):
+        status_code = 500
+
+        async def discard(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        await self.app(scope, receive, discard)
+        profile.stop()
+        body = json.dumps(profile.speedscope()).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"content-disposition", b'attachment; filename="profile.speedscope.json"'),
+                    (b"server-timing", profile.server_timing().encode("latin-1")),
+                    (b"x-profiled-status", str(status_code).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def profile_engine(engine: Engine) -> None:
+    """Attribute SQL execution time to the ``db`` phase of the current profile."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profile_start", []).append((context, time.perf_counter()))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        starts = conn.info.get("profile_start")
+        if profile is not None and starts:
+            profile.add("db", time.perf_counter() - starts.pop()[1])
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # failed statements skip after_cursor_execute; see app.metrics
+        conn = exception_context.connection
+        starts = conn.info.get("profile_start") if conn is not None else None
+        if starts and starts[-1][0] is exception_context.execution_context:
+            starts.pop()
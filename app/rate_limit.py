@@ -0,0 +1,418 @@
+# app/rate_limit.py
+"""Per-client rate limits and overload shedding, applied before routing.
+
+Requests are keyed by the user in a valid bearer token (checked by its
+signature alone, no database lookup) or else by client address, and charged
+against the budget of the first ``RouteRule`` that matches their method and
+path, or the default budget. Each key/rule pair gets its own budget.
+
+Budgets live in a backend:
+
+* ``MemoryBackend`` - token buckets in this process (the default). With N
+  workers a client gets up to N times the budget.
+* ``CounterBackend`` - sliding-window counters in a Redis-style store shared
+  by every worker (``RATE_LIMIT_REDIS_URL``). A failing store lets requests
+  through rather than rejecting them.
+
+Independently of any budget, requests are shed with a 503 while the event
+loop lags or requests wait for a database connection longer than the
+configured thresholds, so an overloaded worker turns work away in
+microseconds instead of queueing it until it times out.
+
+Behind a reverse proxy, run uvicorn with ``--forwarded-allow-ips`` so the
+client address is the real client and not the proxy.
+"""
+import asyncio
+import logging
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Pattern, Protocol
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+
+from app.cache import TTLCache
+from app.security import InvalidToken, decode_access_token
+
+logger = logging.getLogger(__name__)
+
+# "<requests>/<period>", e.g. "100/s", "10/m", "500/5m"; empty disables
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "")
+# "<METHOD> <path>=<limit>" rules separated by ";", e.g.
+# "POST /users/login=10/m; GET /calculations/{calc_id}=50/s"
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# shed when the event loop runs this late / a connection checkout waits this
+# long; 0 disables
+SHED_LOOP_LAG_MS = float(os.getenv("SHED_LOOP_LAG_MS", "0"))
+SHED_POOL_WAIT_MS = float(os.getenv("SHED_POOL_WAIT_MS", "0"))
+
+# never limited or shed: liveness checks and scrapes must see the worker
+EXEMPT_PATHS = ("/health", "/metrics")
+
+_UNITS = {"": 1.0, "s": 1.0, "m": 60.0, "h": 3600.0}
+_LIMIT = re.compile(r"^\s*(\d+)\s*/\s*(\d*\.?\d*)\s*([smh]?)\s*$")
+
+
+@dataclass(frozen=True)
+class Limit:
+    """``requests`` per ``period`` seconds, all of which may come in a burst."""
+
+    requests: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.period
+
+
+def parse_limit(spec: str) -> Limit:
+    match = _LIMIT.match(spec)
+    if not match or not int(match.group(1)):
+        raise ValueError(f"Invalid rate limit {spec!r}; expected e.g. '100/s', '10/m' or '500/5m'")
+    requests, amount, unit = match.groups()
+    period = float(amount or 1) * _UNITS[unit]
+    if period <= 0:
+        raise ValueError(f"Invalid rate limit {spec!r}: period must be positive")
+    return Limit(int(requests), period)
+
+
+@dataclass(frozen=True)
+class RouteRule:
+    method: str  # "*" matches any method
+    path: str  # a route template such as /calculations/{calc_id}
+    limit: Limit
+    regex: Pattern = field(compare=False, repr=False, default=None)
+
+    def __post_init__(self):
+        if self.regex is None:
+            object.__setattr__(self, "regex", compile_path(self.path)[0])
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+    def matches(self, method: str, path: str) -> bool:
+        return self.method in ("*", method) and self.regex.match(path) is not None
+
+
+def parse_rules(spec: str) -> List[RouteRule]:
+    rules = []
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        target, _, limit = entry.rpartition("=")
+        method, _, path = target.strip().partition(" ")
+        if not method or not path.strip().startswith("/"):
+            raise ValueError(f"Invalid rate limit rule {entry!r}; expected '<METHOD> <path>=<limit>'")
+        rules.append(RouteRule(method.upper(), path.strip(), parse_limit(limit)))
+    return rules
+
+
+# --- budgets --------------------------------------------------------------
+
+class RateLimitBackend(Protocol):
+    async def hit(self, key: str, limit: Limit) -> float:
+        """Charge one request to ``key``; 0 if allowed, else seconds until it would be."""
+
+
+class MemoryBackend:
+    """Token buckets in this process.
+
+    Idle buckets expire once they would have refilled, so memory follows the
+    number of recently active clients; ``maxsize`` bounds it outright.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self._buckets = TTLCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (limit.requests, now))
+            tokens = min(limit.requests, tokens + (now - stamp) * limit.rate)
+            allowed = tokens >= 1
+            self._buckets.set(key, (tokens - 1 if allowed else tokens, now), ttl=limit.period)
+        return 0.0 if allowed else (1 - tokens) / limit.rate
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class CounterStore(Protocol):
+    """The async Redis commands ``CounterBackend`` needs."""
+
+    async def incr(self, key: str) -> int: ...
+
+    async def expire(self, key: str, seconds: int) -> Any: ...
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+
+class LocalCounterStore:
+    """In-process stand-in for a Redis server, for tests and single-node setups."""
+
+    def __init__(self):
+        self._counts = TTLCache(maxsize=1_000_000)
+        self._lock = threading.Lock()
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            count, expires_at = self._counts.get(key, (0, None))
+            self._set(key, count + 1, expires_at)
+        return count + 1
+
+    async def expire(self, key: str, seconds: int) -> None:
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is not None:
+                self._set(key, entry[0], time.monotonic() + seconds)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._counts.get(key)
+        return None if entry is None else str(entry[0]).encode()
+
+    def _set(self, key: str, count: int, expires_at: Optional[float]) -> None:
+        # INCR keeps a key's expiry, so carry it over to the new entry
+        ttl = None if expires_at is None else max(expires_at - time.monotonic(), 0.0)
+        self._counts.set(key, (count, expires_at), ttl=ttl)
+
+
+class CounterBackend:
+    """Sliding-window counters in a store shared by every worker.
+
+    Each key counts requests per fixed window with one atomic INCR; the
+    previous window's count is weighted by how much of it still overlaps the
+    sliding window. Rejected requests count too, so a client that keeps
+    hammering stays limited.
+    """
+
+    def __init__(self, store: CounterStore):
+        self.store = store
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        position = time.time() / limit.period
+        window = int(position)
+        elapsed = position - window
+        current_key = f"ratelimit:{key}:{window}"
+        count = await self.store.incr(current_key)
+        if count == 1:
+            await self.store.expire(current_key, math.ceil(2 * limit.period))
+        previous = int(await self.store.get(f"ratelimit:{key}:{window - 1}") or 0)
+        if previous * (1 - elapsed) + count <= limit.requests:
+            return 0.0
+        if count > limit.requests or not previous:
+            # over budget until this window becomes the previous one
+            return (1 - elapsed) * limit.period
+        # until enough of the previous window has slid out
+        return max(1 - (limit.requests - count) / previous - elapsed, 0.0) * limit.period
+
+
+def redis_counter_store(url: str) -> CounterStore:
+    """Connect to a Redis-protocol server; requires the optional ``redis`` package."""
+    try:
+        import redis.asyncio
+    except ImportError as e:
+        raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the 'redis' package is not installed") from e
+    return redis.asyncio.Redis.from_url(url)
+
+
+# --- overload signals -----------------------------------------------------
+
+class LoopLagMonitor:
+    """How late the event loop runs a timer, sampled every ``interval`` seconds.
+
+    A spike decays by half per sample instead of vanishing with the next
+    one, so the backlog that built up while the loop was blocked is shed too.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lag = 0.0
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(loop.time() - start - self.interval, self.lag / 2)
+
+
+class PoolWaitMonitor:
+    """How long requests wait to check a connection out of ``engine``'s pool.
+
+    ``wait()`` is the longest checkout still waiting, or the last finished
+    one if it ended within ``window`` seconds, so the signal clears on its
+    own once shedding has drained the queue.
+    """
+
+    def __init__(self, engine: Engine, window: float = 1.0):
+        self.window = window
+        self._waiting: Dict[int, float] = {}
+        self._last = (0.0, float("-inf"))  # (wait, finished at)
+        self._lock = threading.Lock()
+        self._instrument(engine)
+        # dispose() replaces the pool
+        event.listen(engine, "engine_disposed", self._instrument)
+
+    def _instrument(self, engine: Engine) -> None:
+        pool = engine.pool
+        connect = pool.connect
+
+        def timed_connect():
+            start = time.monotonic()
+            token = id(threading.current_thread())
+            with self._lock:
+                self._waiting[token] = start
+            try:
+                return connect()
+            finally:
+                end = time.monotonic()
+                with self._lock:
+                    self._waiting.pop(token, None)
+                    self._last = (end - start, end)
+
+        pool.connect = timed_connect
+
+    def wait(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            oldest = min(self._waiting.values(), default=now)
+            last, finished = self._last
+        return max(now - oldest, last if now - finished <= self.window else 0.0)
+
+
+# --- limiter --------------------------------------------------------------
+
+class RateLimiter:
+    def __init__(
+        self,
+        rules: Optional[List[RouteRule]] = None,
+        default: Optional[Limit] = None,
+        backend: Optional[RateLimitBackend] = None,
+        loop_lag: Optional[LoopLagMonitor] = None,
+        pool_wait: Optional[PoolWaitMonitor] = None,
+        shed_loop_lag: float = 0.0,
+        shed_pool_wait: float = 0.0,
+    ):
+        self.rules = rules or []
+        self.default = default
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.loop_lag = loop_lag
+        self.pool_wait = pool_wait
+        self.shed_loop_lag = shed_loop_lag
+        self.shed_pool_wait = shed_pool_wait
+        # token -> key, so a client's signature is checked once, not per request;
+        # a revoked token keeps its key, which only decides whose budget pays
+        self._token_keys = TTLCache(maxsize=10_000, ttl=60)
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(("allowed", "limited", "shed_loop_lag", "shed_pool_wait", "backend_errors"), 0)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _rule(self, method: str, path: str):
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule.name, rule.limit
+        return "default", self.default
+
+    def client_key(self, scope) -> str:
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme == "Bearer":
+                    key = self._token_keys.get(token)
+                    if key is not None:
+                        return key
+                    try:
+                        key = f"user:{decode_access_token(token)['sub']}"
+                    except InvalidToken:
+                        pass
+                    else:
+                        self._token_keys.set(token, key)
+                        return key
+                break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def _overloaded(self) -> Optional[str]:
+        if self.shed_loop_lag and self.loop_lag is not None and self.loop_lag.lag > self.shed_loop_lag:
+            return "shed_loop_lag"
+        if self.shed_pool_wait and self.pool_wait is not None and self.pool_wait.wait() > self.shed_pool_wait:
+            return "shed_pool_wait"
+        return None
+
+    async def check(self, scope) -> Optional[JSONResponse]:
+        """The response to reject this request with, or None to let it through."""
+        reason = self._overloaded()
+        if reason is not None:
+            self._count(reason)
+            return JSONResponse(
+                status_code=503, content={"error": "Server overloaded, retry shortly"}, headers={"Retry-After": "1"}
+            )
+        name, limit = self._rule(scope["method"], scope["path"])
+        if limit is None:
+            return None
+        try:
+            retry_after = await self.backend.hit(f"{name}:{self.client_key(scope)}", limit)
+        except Exception:
+            logger.warning("rate limit backend unavailable", exc_info=True)
+            self._count("backend_errors")
+            return None
+        if not retry_after:
+            self._count("allowed")
+            return None
+        self._count("limited")
+        return JSONResponse(
+            status_code=429,
+            content={"error": "Too many requests"},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rules or self.default or self.shed_loop_lag or self.shed_pool_wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counts)
+        stats["loop_lag_seconds"] = self.loop_lag.lag if self.loop_lag is not None else 0.0
+        stats["pool_wait_seconds"] = self.pool_wait.wait() if self.pool_wait is not None else 0.0
+        return stats
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware that rejects limited or shed requests before routing."""
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+        response = await self.limiter.check(scope)
+        if response is None:
+            await self.app(scope, receive, send)
+        else:
+            await response(scope, receive, send)
+
+
+def limiter_from_env(engine: Engine) -> RateLimiter:
+    return RateLimiter(
+        rules=parse_rules(RATE_LIMIT_ROUTES),
+        default=parse_limit(RATE_LIMIT_DEFAULT) if RATE_LIMIT_DEFAULT.strip() else None,
+        backend=CounterBackend(redis_counter_store(RATE_LIMIT_REDIS_URL)) if RATE_LIMIT_REDIS_URL else None,
+        loop_lag=LoopLagMonitor(),
+        pool_wait=PoolWaitMonitor(engine),
+        shed_loop_lag=SHED_LOOP_LAG_MS / 1000,
+        shed_pool_wait=SHED_POOL_WAIT_MS / 1000,
+    )
@@ -0,0 +1,100 @@
+# app/responses.py
+import hashlib
+import json
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Optional
+
+from fastapi.responses import Response
+
+try:  # optional: orjson is several times faster than the stdlib encoder
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+# Opt-in: return pre-built dicts/rows directly instead of running them through
+# response_model validation and FastAPI's jsonable_encoder.
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "").strip().lower() in ("1", "true", "yes", "on")
+
+CALCULATION_FIELDS = ("id", "a", "b", "type", "result", "created_at")
+
+# clients may keep responses but must revalidate them (If-None-Match) first
+CACHE_CONTROL = "private, no-cache"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _finite(value: Any) -> Any:
+    """``value`` with NaN and infinities replaced by None, as orjson writes them."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded in one step, with orjson when it is installed."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+        # allow_nan=False: bare NaN/Infinity tokens are not JSON
+        return json.dumps(_finite(content), separators=(",", ":"), default=_default, allow_nan=False).encode()
+
+
+def calculation_dict(row) -> dict:
+    """Plain dict for a calculation ORM object, a ``Row`` or a mapping of CALCULATION_FIELDS."""
+    if isinstance(row, dict):
+        return {field: row.get(field) for field in CALCULATION_FIELDS}
+    return {field: getattr(row, field) for field in CALCULATION_FIELDS}
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _micros(value: datetime) -> int:
+    # SQLite hands back naive UTC values
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def calculation_etag(calc_id: int, updated_at: Optional[datetime], created_at: datetime) -> str:
+    """Strong ETag of one calculation: changes whenever the row is updated."""
+    return f'"{calc_id}.{_micros(updated_at or created_at)}"'
+
+
+def collection_etag(user_id: int, version: int, query: str) -> str:
+    """Strong ETag of a listing of ``user_id``'s calculations at ``version``.
+
+    The query string is part of the tag so that different pages and filters
+    over the same data never share one.
+    """
+    digest = hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+    return f'"{user_id}.{version}.{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match semantics: any listed tag, weak or strong, or ``*``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
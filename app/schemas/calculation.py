@@ -1,14 +1,20 @@
 # app/schemas/calculation.py
 from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel, Field, model_validator
 from app.models.calculation import CalculationType
 
+# Upper bound on items accepted by POST /calculations/batch
+BATCH_MAX_ITEMS = 10_000
 
-class CalculationCreate(BaseModel):
+
+class CalculationBase(BaseModel):
     a: float = Field(..., description="First operand")
     b: float = Field(..., description="Second operand")
     type: CalculationType
 
+
+class CalculationCreate(CalculationBase):
     @model_validator(mode="after")
     def no_zero_divide(self):
         if self.type == CalculationType.Divide and self.b == 0:
@@ -30,3 +36,32 @@ class CalculationRead(BaseModel):
     created_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+# Batch items skip the divide-by-zero validator: a bad item is reported in
+# the response instead of rejecting the whole batch.
+class CalculationBatchCreate(BaseModel):
+    items: List[CalculationBase] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class CalculationBatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    result: Optional[float] = None
+    error: Optional[str] = None
+
+
+class CalculationBatchResult(BaseModel):
+    created: int
+    failed: int
+    items: List[CalculationBatchItemResult]
+
+
+class CalculationStatsRead(BaseModel):
+    bucket: Optional[datetime] = Field(None, description="Bucket start (UTC); null for bucket=all")
+    type: CalculationType
+    count: int
+    sum: float
+    min: float
+    max: float
+    mean: float
@@ -0,0 +1,25 @@
+# app/schemas/expression.py
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, model_validator
+from app.expressions import MAX_EXPRESSION_LENGTH
+from app.schemas.calculation import BATCH_MAX_ITEMS
+
+
+class EvaluateRequest(BaseModel):
+    expression: str = Field(..., min_length=1, max_length=MAX_EXPRESSION_LENGTH, description="e.g. 2*x^2 + sqrt(y)")
+    variables: Dict[str, float] = Field(default_factory=dict, description="Single set of variable values")
+    bindings: Optional[List[Dict[str, float]]] = Field(
+        None, min_length=1, max_length=BATCH_MAX_ITEMS, description="Evaluate once per entry, vectorized"
+    )
+
+    @model_validator(mode="after")
+    def one_mode(self):
+        if self.variables and self.bindings is not None:
+            raise ValueError("Provide either variables or bindings, not both")
+        return self
+
+
+class EvaluateResponse(BaseModel):
+    result: Optional[float] = None
+    # one entry per binding; null where the result is not a finite number
+    results: Optional[List[Optional[float]]] = None
@@ -1,12 +1,241 @@
 # app/security.py
-from passlib.context import CryptContext
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.cache import SharedBackend, TTLCache, redis_backend
+from app.db import DB_THREADPOOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+# passlib (and the bcrypt backend behind it) is imported on the first hash or
+# verify rather than at startup; token checks never need it.
+_pwd_context = None
+_pwd_context_lock = threading.Lock()
+
+
+def _get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        with _pwd_context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+
+                _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+# bcrypt runs on a dedicated pool so a burst of logins cannot tie up the
+# threads that serve every other endpoint. Admission is bounded: once
+# HASH_POOL_MAX_QUEUE jobs are waiting, new ones are rejected immediately.
+# Every admitted job, running or queued, still blocks the handler thread that
+# waits for it, so by default admission is capped at a quarter of
+# DB_THREADPOOL_SIZE and a login burst leaves the rest to other endpoints.
+HASH_POOL_KIND = os.getenv("HASH_POOL_KIND", "thread")  # "thread" or "process"
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_POOL_MAX_QUEUE = int(os.getenv("HASH_POOL_MAX_QUEUE", str(max(0, DB_THREADPOOL_SIZE // 4 - HASH_POOL_WORKERS))))
+
+
+class HashPoolSaturated(RuntimeError):
+    """Raised when the hashing pool has no room for another job."""
+
+
+class HashPool:
+    def __init__(self, workers: int, max_queue: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported hash pool kind: {kind}")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._observers = []
+
+    def add_observer(self, fn) -> None:
+        """Call ``fn(elapsed_seconds)`` after every completed job."""
+        self._observers.append(fn)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix="hash"
+                        )
+        return self._executor
+
+    def run(self, fn, *args):
+        """Run ``fn(*args)`` on the pool and wait for the result."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashPoolSaturated("Password hashing capacity exhausted")
+        start = time.perf_counter()
+        with self._lock:
+            self._submitted += 1
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            elapsed = time.perf_counter() - start
+            self._slots.release()
+            with self._lock:
+                self._completed += 1
+                self._latency_total += elapsed
+                self._latency_max = max(self._latency_max, elapsed)
+            for observer in self._observers:
+                observer(elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._submitted - self._completed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": in_flight,
+                "queue_depth": max(0, in_flight - self.workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "latency_seconds_total": self._latency_total,
+                "latency_seconds_max": self._latency_max,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+hash_pool = HashPool(HASH_POOL_WORKERS, HASH_POOL_MAX_QUEUE, HASH_POOL_KIND)
+
+
+def _hash(password: str) -> str:
+    return _get_pwd_context().hash(password)
+
+
+def _verify(plain: str, hashed: str) -> bool:
+    return _get_pwd_context().verify(plain, hashed)
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_pool.run(_hash, password)
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return hash_pool.run(_verify, plain, hashed)
+
+
+# Access tokens: HMAC-SHA256 signed, expiring, verifiable without the DB.
+# There is no production default: anyone who knows the key can sign a token
+# for any user, so a missing SECRET_KEY stops the app from starting.
+SECRET_KEY = os.getenv("SECRET_KEY") or ("testing-only-secret-key" if os.getenv("TESTING") else "")
+if not SECRET_KEY:
+    raise RuntimeError("SECRET_KEY is not set; refusing to sign tokens with a guessable key")
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "3600"))
+# share revocations across workers; without it a logout only reaches the
+# worker that served it
+REVOCATION_REDIS_URL = os.getenv("REVOCATION_REDIS_URL")
+
+
+class RevocationList:
+    """Ids of tokens revoked before their expiry.
+
+    Revocations are kept in-process and, when ``shared`` is given, in a store
+    every worker reads. A failing store is logged and treated as "not
+    revoked" on lookup, so an outage does not lock every user out, and on
+    revocation, which then only holds in this worker.
+    """
+
+    def __init__(self, shared: SharedBackend | None = None):
+        self.local = TTLCache(maxsize=100_000)
+        self.shared = shared
+
+    def add(self, jti: str, expires_at: float) -> None:
+        ttl = max(0.0, expires_at - time.time())
+        self.local.set(jti, True, ttl=ttl)
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(f"revoked:{jti}", b"1", ex=max(1, math.ceil(ttl)))
+        except Exception:
+            logger.warning("token revocation store unavailable; revoked in this worker only", exc_info=True)
+
+    def contains(self, jti: str, expires_at: float) -> bool:
+        if self.local.get(jti):
+            return True
+        if self.shared is None:
+            return False
+        try:
+            revoked = self.shared.get(f"revoked:{jti}") is not None
+        except Exception:
+            logger.warning("token revocation store unavailable", exc_info=True)
+            return False
+        if revoked:
+            self.local.set(jti, True, ttl=max(0.0, expires_at - time.time()))
+        return revoked
+
+
+_revoked = RevocationList(redis_backend(REVOCATION_REDIS_URL, "REVOCATION_REDIS_URL") if REVOCATION_REDIS_URL else None)
+
+
+class InvalidToken(ValueError):
+    """Raised when a token is malformed, forged, expired or revoked."""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SECRET_KEY.encode(), payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def create_access_token(user_id: int, username: str, ttl: int = ACCESS_TOKEN_TTL) -> str:
+    now = int(time.time())
+    claims = {"sub": user_id, "usr": username, "iat": now, "exp": now + ttl, "jti": secrets.token_hex(8)}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_access_token(token: str) -> dict:
+    """Return the token's claims, or raise InvalidToken."""
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+            raise InvalidToken("Invalid token")
+        claims = json.loads(_b64decode(payload))
+        expires_at, jti = claims["exp"], claims["jti"]
+    except InvalidToken:
+        raise
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidToken("Invalid token") from e
+    if expires_at <= time.time():
+        raise InvalidToken("Token expired")
+    if _revoked.contains(jti, expires_at):
+        raise InvalidToken("Token revoked")
+    return claims
+
+
+def revoke_token(token: str) -> None:
+    claims = decode_access_token(token)
+    _revoked.add(claims["jti"], claims["exp"])
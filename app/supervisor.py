@@ -0,0 +1,313 @@
+# app/supervisor.py
+"""Multi-process serving: one supervisor, N uvicorn workers.
+
+The supervisor binds the listening socket and sets the schema up once, then
+spawns workers that all accept on the inherited socket. Each worker
+publishes a heartbeat from its event loop into a table in shared memory, so
+a worker whose loop is blocked looks as dead as one that exited; the
+supervisor replaces both.
+
+SIGHUP upgrades the schema to the code on disk, then replaces the workers
+one at a time: each replacement must publish its first heartbeat before the
+worker it replaces is asked to drain (SIGTERM, which uvicorn turns into a
+graceful shutdown), so serving capacity never drops during a deploy. SIGTERM or SIGINT drains every worker and exits.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from app.metrics import http_requests_in_flight, http_requests_total
+
+logger = logging.getLogger(__name__)
+
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "1"))
+# seconds without a heartbeat (or, while starting, since spawn) before a
+# worker is killed and replaced
+WORKER_TIMEOUT = float(os.getenv("WORKER_TIMEOUT", "30"))
+# how long a draining worker may finish in-flight requests
+WORKER_GRACEFUL_TIMEOUT = float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+# consecutive workers dying before their first heartbeat before giving up
+MAX_STARTUP_FAILURES = 3
+# what a rolling restart runs, in a fresh interpreter, before replacing anyone
+_SCHEMA_SETUP = "from app.db import init_db; init_db()"
+
+_FIELDS = ("pid", "started", "heartbeat", "requests", "in_flight")
+_spawn = multiprocessing.get_context("spawn")
+
+
+class WorkerTable:
+    """Per-worker stats in shared memory, one slot per process.
+
+    The supervisor claims and frees slots; only the worker in a slot writes
+    its heartbeat and load, so no lock is needed.
+    """
+
+    def __init__(self, slots: int, array=None):
+        self.slots = slots
+        self._array = array if array is not None else _spawn.RawArray("d", slots * len(_FIELDS))
+
+    def write(self, slot: int, **values: float) -> None:
+        base = slot * len(_FIELDS)
+        for name, value in values.items():
+            self._array[base + _FIELDS.index(name)] = value
+
+    def read(self, slot: int) -> dict:
+        base = slot * len(_FIELDS)
+        return dict(zip(_FIELDS, self._array[base: base + len(_FIELDS)]))
+
+    def clear(self, slot: int) -> None:
+        self.write(slot, **dict.fromkeys(_FIELDS, 0.0))
+
+    def free_slot(self) -> Optional[int]:
+        return next((slot for slot in range(self.slots) if not self.read(slot)["pid"]), None)
+
+    def describe(self, slot: int, now: Optional[float] = None) -> dict:
+        now = time.time() if now is None else now
+        entry = self.read(slot)
+        since = now - (entry["heartbeat"] or entry["started"])
+        return {
+            "slot": slot,
+            "pid": int(entry["pid"]),
+            "state": "serving" if entry["heartbeat"] else "starting",
+            "healthy": since <= WORKER_TIMEOUT,
+            "uptime": round(now - entry["started"], 3),
+            "heartbeat_age": round(now - entry["heartbeat"], 3) if entry["heartbeat"] else None,
+            "requests": int(entry["requests"]),
+            "in_flight": int(entry["in_flight"]),
+        }
+
+    def snapshot(self) -> List[dict]:
+        now = time.time()
+        return [self.describe(slot, now) for slot in range(self.slots) if self.read(slot)["pid"]]
+
+
+# --- worker side ----------------------------------------------------------
+
+_table: Optional[WorkerTable] = None
+_slot: Optional[int] = None
+
+
+def attach(table: WorkerTable, slot: int) -> None:
+    global _table, _slot
+    _table, _slot = table, slot
+
+
+def supervised() -> bool:
+    return _table is not None
+
+
+def publish() -> None:
+    if _table is not None:
+        _table.write(
+            _slot,
+            heartbeat=time.time(),
+            requests=http_requests_total.total(),
+            in_flight=http_requests_in_flight.value(),
+        )
+
+
+async def heartbeat(interval: float = WORKER_HEARTBEAT_INTERVAL) -> None:
+    """Publish liveness and load until cancelled, from the event loop itself."""
+    while True:
+        publish()
+        await asyncio.sleep(interval)
+
+
+def worker_health() -> dict:
+    if _table is None:
+        return {"supervised": False, "worker": {"pid": os.getpid()}}
+    return {"supervised": True, "worker": _table.describe(_slot), "workers": _table.snapshot()}
+
+
+def _serve_worker(app: str, config: dict, sock: socket.socket, array, slots: int, slot: int) -> None:
+    import uvicorn
+
+    attach(WorkerTable(slots, array), slot)
+    uvicorn.Server(uvicorn.Config(app, **config)).run(sockets=[sock])
+
+
+# --- supervisor side ------------------------------------------------------
+
+@dataclass
+class _Worker:
+    process: multiprocessing.Process
+    slot: int
+
+
+class Supervisor:
+    def __init__(
+        self,
+        app: str = "main:app",
+        workers: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        timeout: float = WORKER_TIMEOUT,
+        graceful_timeout: float = WORKER_GRACEFUL_TIMEOUT,
+        heartbeat_interval: float = WORKER_HEARTBEAT_INTERVAL,
+        **uvicorn_options,
+    ):
+        self.app = app
+        self.size = workers or os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.graceful_timeout = graceful_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.uvicorn_options = uvicorn_options
+        # one spare slot for the replacement during a rolling restart
+        self.table = WorkerTable(self.size + 1)
+        self.workers: List[_Worker] = []
+        self._signals: List[int] = []
+        self._stopping = False
+        self._startup_failures = 0
+        self._sock: Optional[socket.socket] = None
+
+    def run(self) -> int:
+        import uvicorn
+
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, **self.uvicorn_options)
+        self._sock = config.bind_socket()
+        self._setup_schema()
+        for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(sig, lambda signum, frame: self._signals.append(signum))
+        logger.info("Supervisor %s starting %d worker(s) on %s:%s", os.getpid(), self.size, self.host, self.port)
+        try:
+            for _ in range(self.size):
+                self._spawn()
+            while not self._stopping:
+                time.sleep(self.heartbeat_interval)
+                self._handle_signals()
+                if not self._stopping:
+                    self._check_workers()
+        finally:
+            self._stop_all()
+            self._sock.close()
+        logger.info("Supervisor %s stopped", os.getpid())
+        return 1 if self._startup_failures >= MAX_STARTUP_FAILURES else 0
+
+    def _setup_schema(self) -> None:
+        from app.db import engine, init_db
+
+        init_db()
+        engine.dispose()
+        # workers inherit the environment at spawn
+        os.environ["DB_INIT_ON_STARTUP"] = "0"
+
+    def _upgrade_schema(self) -> bool:
+        """Apply the schema changes of the code now on disk; False if that failed.
+
+        This process still runs the release it started with, whose models and
+        SCHEMA_REVISION may be older than the replacements', so the upgrade
+        runs in a new interpreter. ``init_db`` holds ``schema_lock`` while it
+        works, as on startup.
+        """
+        from app.db import BASE_DIR
+
+        result = subprocess.run([sys.executable, "-c", _SCHEMA_SETUP], cwd=BASE_DIR)
+        return result.returncode == 0
+
+    def _uvicorn_config(self) -> dict:
+        return {**self.uvicorn_options, "timeout_graceful_shutdown": self.graceful_timeout}
+
+    def _spawn(self) -> _Worker:
+        slot = self.table.free_slot()
+        # claim the slot before the worker can write to it
+        self.table.clear(slot)
+        self.table.write(slot, pid=-1, started=time.time())
+        process = _spawn.Process(
+            target=_serve_worker,
+            args=(self.app, self._uvicorn_config(), self._sock, self.table._array, self.table.slots, slot),
+            name=f"worker-{slot}",
+        )
+        process.start()
+        self.table.write(slot, pid=process.pid)
+        worker = _Worker(process, slot)
+        self.workers.append(worker)
+        logger.info("Started worker %s in slot %d", process.pid, slot)
+        return worker
+
+    def _retire(self, worker: _Worker, graceful: bool = True) -> None:
+        process = worker.process
+        if graceful and process.is_alive():
+            process.terminate()
+            process.join(self.graceful_timeout + 5)
+        if process.is_alive():
+            process.kill()
+        process.join()
+        self.table.clear(worker.slot)
+        self.workers.remove(worker)
+
+    def _handle_signals(self) -> None:
+        while self._signals:
+            signum = self._signals.pop(0)
+            if signum == signal.SIGHUP:
+                self.rolling_restart()
+            else:
+                logger.info("Received %s, draining workers", signal.Signals(signum).name)
+                self._stopping = True
+
+    def _check_workers(self) -> None:
+        now = time.time()
+        for worker in list(self.workers):
+            entry = self.table.read(worker.slot)
+            if not worker.process.is_alive():
+                logger.warning(
+                    "Worker %s exited with code %s; replacing it", worker.process.pid, worker.process.exitcode
+                )
+                self._startup_failures = 0 if entry["heartbeat"] else self._startup_failures + 1
+            elif now - (entry["heartbeat"] or entry["started"]) > self.timeout:
+                logger.error(
+                    "Worker %s sent no heartbeat for %.0fs; killing it", worker.process.pid, self.timeout
+                )
+            else:
+                continue
+            self._retire(worker, graceful=False)
+            if self._startup_failures >= MAX_STARTUP_FAILURES:
+                logger.error("%d workers in a row failed to start; giving up", self._startup_failures)
+                self._stopping = True
+                return
+            self._spawn()
+
+    def _wait_ready(self, worker: _Worker) -> bool:
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline and worker.process.is_alive():
+            if self.table.read(worker.slot)["heartbeat"]:
+                return True
+            if signal.SIGINT in self._signals or signal.SIGTERM in self._signals:
+                return False
+            time.sleep(0.05)
+        return False
+
+    def rolling_restart(self) -> None:
+        """Replace every worker, bringing each replacement up before its predecessor drains.
+
+        The schema is brought up to date first, so a deploy that adds a
+        migration never starts replacements on the old schema.
+        """
+        logger.info("Rolling restart of %d worker(s)", len(self.workers))
+        if not self._upgrade_schema():
+            logger.error("Schema upgrade failed; keeping the current workers")
+            return
+        for old in list(self.workers):
+            new = self._spawn()
+            if not self._wait_ready(new):
+                logger.error("Replacement worker %s did not become ready; aborting the restart", new.process.pid)
+                self._retire(new, graceful=False)
+                return
+            self._retire(old)
+        logger.info("Rolling restart complete")
+
+    def _stop_all(self) -> None:
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        for worker in list(self.workers):
+            self._retire(worker)
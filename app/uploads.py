@@ -0,0 +1,169 @@
+# app/uploads.py
+"""Consume a request body in a worker thread while the response streams.
+
+``StreamingResponse`` listens for the client's disconnect by reading the
+request channel, which would swallow any body still in flight, so an
+endpoint that wants to answer while it is still reading the upload has to
+buffer the whole body first. ``DuplexResponse`` instead hands the body to a
+blocking producer as a file and streams the lines it yields back, with both
+directions running at once:
+
+- the event loop feeds body chunks into an ``UploadPipe`` (a bounded queue,
+  so a slow producer stops the loop reading from the socket),
+- a worker thread runs the producer over that pipe,
+- the event loop sends each line the producer yields as it arrives.
+
+Nothing touches the disk, and the producer sees the first bytes as soon as
+they arrive.
+"""
+import io
+import logging
+from typing import Callable, Generator, Optional, Tuple, Type
+
+import anyio
+import anyio.from_thread
+import anyio.to_thread
+from fastapi import HTTPException
+from fastapi.responses import Response
+from starlette.requests import ClientDisconnect, Request
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# body chunks queued for the producer (uvicorn delivers them in up to 64 KB)
+PIPE_MAX_CHUNKS = 16
+
+
+class UploadAborted(RuntimeError):
+    """The client went away before the upload was complete."""
+
+
+class UploadPipe(io.RawIOBase):
+    """Request body chunks, readable as a blocking file from a worker thread."""
+
+    def __init__(self, max_chunks: int = PIPE_MAX_CHUNKS):
+        self._send, self._receive = anyio.create_memory_object_stream(max_chunks)
+        self._pending = memoryview(b"")
+        self._finished = False
+        self._aborted = False
+
+    async def send(self, data: bytes) -> None:
+        await self._send.send(data)
+
+    def finish(self, aborted: bool = False) -> None:
+        """End the body; readers get EOF, or UploadAborted if ``aborted``."""
+        if not self._finished:
+            self._finished = True
+            self._aborted = aborted
+            self._send.close()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = memoryview(anyio.from_thread.run(self._receive.receive))
+            except anyio.EndOfStream:
+                if self._aborted:
+                    raise UploadAborted("Client disconnected during the upload") from None
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class DuplexResponse(Response):
+    """Stream ``produce(body)``'s lines while the request body is still arriving.
+
+    ``produce`` is a generator function; it runs in a worker thread and
+    reads the body as a binary file.
+    An exception from ``client_errors`` raised before its first line turns
+    into a 400 with the exception's message; the status line goes out with
+    the first line, so anything after that has to be reported in-band.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        produce: Callable[[io.BufferedReader], Generator[str, None, None]],
+        media_type: Optional[str] = None,
+        client_errors: Tuple[Type[Exception], ...] = (),
+    ):
+        self.request = request
+        self.produce = produce
+        self.client_errors = client_errors
+        self.status_code = 200
+        self.media_type = self.media_type if media_type is None else media_type
+        self.background = None
+        self.init_headers(None)
+        self._started = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        pipe = UploadPipe()
+        # bounded too: a client reading slowly holds the producer back
+        lines_send, lines_receive = anyio.create_memory_object_stream(PIPE_MAX_CHUNKS)
+        rejected = []
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(self._feed, receive, pipe, task_group.cancel_scope)
+            task_group.start_soon(self._run, pipe, lines_send, rejected)
+            try:
+                await self._respond(send, lines_receive, rejected)
+            finally:
+                # a producer still running stops at its next line
+                lines_receive.close()
+                task_group.cancel_scope.cancel()
+        if rejected:
+            if not self._started:
+                raise HTTPException(status_code=400, detail=str(rejected[0]))
+            logger.warning("Rejected after the response started: %s", rejected[0])
+
+    async def _feed(self, receive: Receive, pipe: UploadPipe, cancel_scope: anyio.CancelScope) -> None:
+        try:
+            async for data in self.request.stream():
+                if data:
+                    await pipe.send(data)
+        except ClientDisconnect:
+            return
+        else:
+            pipe.finish()
+        finally:
+            # no-op after a complete body
+            pipe.finish(aborted=True)
+        # the body is in; the channel now only reports the client going away
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        cancel_scope.cancel()
+
+    async def _run(self, pipe: UploadPipe, lines_send, rejected: list) -> None:
+        with lines_send:
+            try:
+                await anyio.to_thread.run_sync(self._pump, pipe, lines_send)
+            except self.client_errors as e:
+                rejected.append(e)
+
+    def _pump(self, pipe: UploadPipe, lines_send) -> None:
+        lines = self.produce(io.BufferedReader(pipe))
+        try:
+            for line in lines:
+                anyio.from_thread.run(lines_send.send, line)
+        except anyio.BrokenResourceError:
+            pass  # the response is over: the client went away
+        finally:
+            lines.close()
+
+    async def _start(self, send: Send) -> None:
+        self._started = True
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+    async def _respond(self, send: Send, lines_receive, rejected: list) -> None:
+        async for line in lines_receive:
+            if not self._started:
+                await self._start(send)
+            await send({"type": "http.response.body", "body": line.encode(self.charset), "more_body": True})
+        if rejected and not self._started:
+            return
+        if not self._started:
+            await self._start(send)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
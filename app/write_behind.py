@@ -0,0 +1,164 @@
+# app/write_behind.py
+"""Buffered, batched persistence for calculation rows.
+
+Requests hand their row to a ``WriteBehindBuffer`` instead of running their
+own transaction; a background thread inserts whatever has accumulated in one
+multi-row INSERT and one commit, once ``batch_size`` rows are waiting or the
+oldest has waited ``interval`` seconds.
+
+Durability is chosen per buffer:
+
+* ``sync``  - no buffering, each request commits its own row (the default).
+* ``group`` - the request waits until the batch holding its row commits, so
+  it still gets a real id, but concurrent writers share one commit.
+* ``async`` - the request returns as soon as the row is queued. Rows still
+  queued when the process dies are lost.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.calculation import Calculation
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_MODES = ("sync", "group", "async")
+WRITE_BEHIND_MODE = os.getenv("WRITE_BEHIND_MODE", "sync")
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_INTERVAL_MS = float(os.getenv("WRITE_BEHIND_INTERVAL_MS", "20"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+# how long a request may wait for buffer space before it is turned away
+WRITE_BEHIND_ENQUEUE_TIMEOUT_MS = float(os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT_MS", "100"))
+
+
+class WriteBehindFull(RuntimeError):
+    """Raised when the buffer stays full for longer than the enqueue timeout."""
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        mode: str = "group",
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        interval: float = WRITE_BEHIND_INTERVAL_MS / 1000,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        enqueue_timeout: float = WRITE_BEHIND_ENQUEUE_TIMEOUT_MS / 1000,
+    ):
+        if mode not in WRITE_BEHIND_MODES:
+            raise ValueError(f"Unsupported write-behind mode: {mode}")
+        self.session_factory = session_factory
+        self.mode = mode
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self._pending: List[Tuple[dict, Future]] = []
+        self._oldest = 0.0
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closing = False
+        self._flushed = 0
+        self._batches = 0
+        self._failed = 0
+        self._rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "sync"
+
+    def submit(self, row: dict) -> Future:
+        """Queue ``row`` for insertion; the future resolves to its new id.
+
+        Blocks for up to ``enqueue_timeout`` while the buffer is full, then
+        raises WriteBehindFull.
+        """
+        future: Future = Future()
+        deadline = time.monotonic() + self.enqueue_timeout
+        with self._cond:
+            while len(self._pending) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if len(self._pending) >= self.max_pending:
+                        self._rejected += 1
+                        raise WriteBehindFull("Write buffer is full")
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((row, future))
+            self._ensure_thread()
+            self._cond.notify_all()
+        return future
+
+    def _ensure_thread(self) -> None:
+        # called with the condition held; restarts after close()
+        if self._thread is None or not self._thread.is_alive():
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closing and not self._ready():
+                    timeout = self.interval - (time.monotonic() - self._oldest) if self._pending else None
+                    self._cond.wait(timeout)
+                if not self._pending and self._closing:
+                    return
+                batch = self._pending[: self.batch_size]
+                del self._pending[: self.batch_size]
+                self._oldest = time.monotonic()
+                # wake producers blocked on a full buffer
+                self._cond.notify_all()
+            self._write(batch)
+
+    def _ready(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.batch_size or time.monotonic() - self._oldest >= self.interval
+        )
+
+    def _write(self, batch: List[Tuple[dict, Future]]) -> None:
+        rows = [row for row, _ in batch]
+        try:
+            with self.session_factory() as db:
+                ids = db.execute(
+                    insert(Calculation).returning(Calculation.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+                db.commit()
+        except Exception as e:
+            with self._cond:
+                self._failed += len(batch)
+            logger.exception("Write-behind flush of %d calculation(s) failed", len(batch))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._cond:
+            self._flushed += len(batch)
+            self._batches += 1
+        for (_, future), calc_id in zip(batch, ids):
+            future.set_result(calc_id)
+
+    def close(self) -> None:
+        """Flush everything still queued and stop the writer thread."""
+        with self._cond:
+            thread = self._thread
+            self._closing = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "max_pending": self.max_pending,
+                "flushed": self._flushed,
+                "batches": self._batches,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
@@ -0,0 +1,49 @@
+"""Calls per second of app.operations.add at each LOG_MODE.
+
+Records are written to /dev/null through the same queue pipeline main.py
+installs. "calls/s" is the producer-side cost a request thread pays;
+"drained/s" also waits for the listener thread to write every record, the
+whole-process cost.
+
+    python benchmarks/bench_logging.py --calls 200000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.logging_config import configure_logging  # noqa: E402
+from app.operations import add  # noqa: E402
+
+
+def calls_per_second(mode, calls, sample_rate, fmt, sink):
+    listener = configure_logging(mode=mode, sample_rate=sample_rate, fmt=fmt, stream=sink)
+    try:
+        start = time.perf_counter()
+        for i in range(calls):
+            add(i, 1.5)
+        produced = time.perf_counter()
+    finally:
+        listener.stop()
+    return calls / (produced - start), calls / (time.perf_counter() - start)
+
+
+def main(args):
+    with open(os.devnull, "w") as sink:
+        print(f"{'mode':>8} {'calls/s':>12} {'drained/s':>12}")
+        for mode in ("off", "sampled", "full"):
+            rate, drained = calls_per_second(mode, args.calls, args.sample_rate, args.format, sink)
+            print(f"{mode:>8} {rate:>12,.0f} {drained:>12,.0f}")
+    logging.getLogger().handlers.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    main(parser.parse_args())
@@ -0,0 +1,108 @@
+"""Page-fetch latency for keyset vs. OFFSET pagination over a large table.
+
+Seeds ``--rows`` calculations spread over ``--users`` users into a scratch
+SQLite file (reused on later runs), then times fetching one page at
+increasing depths. Keyset pages should cost the same at any depth; OFFSET
+pages grow linearly with it.
+
+    python benchmarks/bench_pagination.py --rows 10000000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, func, insert, select  # noqa: E402
+
+from app.db import Base  # noqa: E402
+from app.models.calculation import Calculation, CalculationType  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.pagination import after_cursor  # noqa: E402
+
+CHUNK = 50_000
+
+
+def seed(engine, rows, users):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(Calculation)).scalar()
+        if existing >= rows:
+            return
+        if not conn.execute(select(func.count()).select_from(User)).scalar():
+            conn.execute(insert(User), [
+                {"id": i, "username": f"u{i}", "email": f"u{i}@x.com", "password_hash": "x"}
+                for i in range(1, users + 1)
+            ])
+    types = list(CalculationType)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rng = random.Random(0)
+    for offset in range(existing, rows, CHUNK):
+        batch = [
+            {
+                "user_id": (i % users) + 1,
+                "a": 1.0,
+                "b": 2.0,
+                "type": types[rng.randrange(4)],
+                "result": 3.0,
+                "created_at": start + timedelta(milliseconds=i),
+            }
+            for i in range(offset, min(rows, offset + CHUNK))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(Calculation), batch)
+        print(f"\rseeded {offset + len(batch):,}/{rows:,}", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+
+def page_query(user_id, type=None):
+    query = select(Calculation.id, Calculation.created_at).where(Calculation.user_id == user_id)
+    if type is not None:
+        query = query.where(Calculation.type == type)
+    return query.order_by(Calculation.created_at, Calculation.id)
+
+
+def timed(conn, stmt, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(stmt).all()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, rows
+
+
+def main(args):
+    engine = create_engine(f"sqlite:///{args.db}")
+    seed(engine, args.rows, args.users)
+    per_user = args.rows // args.users
+    depths = [d for d in (0, 1_000, 10_000, 100_000, 1_000_000, per_user - args.limit) if 0 <= d < per_user]
+
+    print(f"{'depth':>10} {'keyset ms':>10} {'keyset+type ms':>15} {'offset ms':>10}")
+    with engine.connect() as conn:
+        for depth in depths:
+            # locate the cursor row once, outside the timed section
+            row = conn.execute(page_query(1).offset(max(depth - 1, 0)).limit(1)).one()
+            anchor = (row.created_at, row.id)
+            keyset = page_query(1).limit(args.limit)
+            typed = page_query(1, CalculationType.Add).limit(args.limit)
+            if depth:
+                keyset = keyset.where(after_cursor(Calculation.created_at, Calculation.id, anchor))
+                typed = typed.where(after_cursor(Calculation.created_at, Calculation.id, anchor))
+            keyset_ms, _ = timed(conn, keyset, args.repeat)
+            typed_ms, _ = timed(conn, typed, args.repeat)
+            offset_ms, _ = timed(conn, page_query(1).offset(depth).limit(args.limit), args.repeat)
+            print(f"{depth:>10,} {keyset_ms:>10.2f} {typed_ms:>15.2f} {offset_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="bench_pagination.db")
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+"""Throughput of the validated response path vs. FAST_RESPONSES.
+
+Endpoint-level runs cover a 1-row calculator response, a single calculation
+and a full 1000-row page. A render-only run compares encoding 10k rows via
+response_model validation + jsonable_encoder against FastJSONResponse.
+
+    python benchmarks/bench_serialization.py
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("TESTING", "1")
+os.environ.setdefault("LOG_MODE", "off")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+import main  # noqa: E402
+from app.db import SessionLocal  # noqa: E402
+from app.models.calculation import Calculation, CalculationType  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.responses import FastJSONResponse  # noqa: E402
+from app.schemas.calculation import CalculationRead  # noqa: E402
+
+
+def rate(fn, seconds):
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def seed(rows):
+    with SessionLocal() as db:
+        user_id = db.execute(select(User.id).where(User.username == "serbench")).scalar_one()
+        db.execute(insert(Calculation), [
+            {"user_id": user_id, "a": i, "b": 2.0, "type": CalculationType.Multiply, "result": i * 2.0}
+            for i in range(rows)
+        ])
+        db.commit()
+
+
+def run(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    with TestClient(main.app) as client:
+        client.post("/users/register", json={"username": "serbench", "email": "serbench@example.com", "password": "password123"})
+        token = client.post("/users/login", json={"username_or_email": "serbench", "password": "password123"}).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        seed(args.rows)
+        first_id = client.get("/calculations", params={"limit": 1}, headers=headers).json()[0]["id"]
+
+        cases = {
+            "POST /multiply (1 row)": lambda: client.post("/multiply", json={"a": 6, "b": 7}),
+            "GET /calculations/{id} (1 row)": lambda: client.get(f"/calculations/{first_id}", headers=headers),
+            "GET /calculations (1000 rows)": lambda: client.get("/calculations", params={"limit": 1000}, headers=headers),
+        }
+        print(f"{'case':<34} {'validated req/s':>16} {'fast req/s':>12} {'speedup':>8}")
+        for name, call in cases.items():
+            main.FAST_RESPONSES = False
+            slow = rate(call, args.seconds)
+            main.FAST_RESPONSES = True
+            fast = rate(call, args.seconds)
+            print(f"{name:<34} {slow:>16,.0f} {fast:>12,.0f} {fast / slow:>7.1f}x")
+
+    with SessionLocal() as db:
+        rows = db.execute(select(*main.CALCULATION_COLUMNS).limit(10_000)).all()
+    adapter = TypeAdapter(List[CalculationRead])
+
+    def validated():
+        models = adapter.validate_python(rows, from_attributes=True)
+        return JSONResponse(jsonable_encoder(adapter.dump_python(models))).body
+
+    def fast():
+        return FastJSONResponse([row._asdict() for row in rows]).body
+
+    slow, quick = rate(validated, args.seconds), rate(fast, args.seconds)
+    print(f"{f'render {len(rows)} rows':<34} {slow:>16,.1f} {quick:>12,.1f} {quick / slow:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    run(parser.parse_args())
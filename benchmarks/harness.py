@@ -0,0 +1,171 @@
+"""Timing, result files and regression comparison shared by the benchmark suite.
+
+A result file is JSON of the form::
+
+    {"meta": {...machine and commit...},
+     "results": {"name": {"value": 1234.5, "unit": "ns/op",
+                          "higher_is_better": false, ...extra stats...}}}
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def calibrate(fn: Callable[[], object], min_time: float) -> int:
+    """Loop count whose run takes at least ``min_time`` seconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 10_000_000:
+            return number
+        # extrapolate from the last run rather than stepping blindly
+        estimate = int(number * min_time / elapsed * 1.2) if elapsed > 0 else number * 10
+        number = max(number * 2, min(estimate, number * 100))
+
+
+def measure(fn: Callable[[], object], repeats: int = 5, min_time: float = 0.2) -> dict:
+    """Best ns per call over ``repeats`` calibrated runs.
+
+    Noise from GC pauses and other processes only ever adds time, so the
+    fastest run is the most stable estimate of the code's own cost; the
+    median and stdev are kept to show how noisy the machine was.
+    """
+    fn()  # warm caches and lazy imports
+    number = calibrate(fn, min_time)
+    runs: List[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter_ns() - start) / number)
+    return {
+        "value": min(runs),
+        "unit": "ns/op",
+        "higher_is_better": False,
+        "median": statistics.median(runs),
+        "stdev": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+        "loops": number,
+        "runs": runs,
+    }
+
+
+def _git(*args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+
+
+def _git_commit() -> str:
+    """Short HEAD, with "-dirty" when tracked files differ from it."""
+    try:
+        commit = _git("rev-parse", "--short", "HEAD")
+        return commit + "-dirty" if _git("status", "--porcelain", "--untracked-files=no") else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _cpu_model() -> str:
+    # platform.processor() is empty on most Linux systems
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def metadata() -> dict:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": _cpu_model(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(results: Dict[str, dict], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {"meta": metadata(), "results": results}
+    path.write_text(json.dumps(document, indent=2, sort_keys=True) + "\n")
+
+
+def load(path: Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def _separated(old: dict, new: dict) -> bool:
+    """True when every current run is worse than every baseline run.
+
+    Without per-run samples there is nothing to judge the noise by, so the
+    threshold alone decides.
+    """
+    if not old.get("runs") or not new.get("runs"):
+        return True
+    if old.get("higher_is_better"):
+        return max(new["runs"]) < min(old["runs"])
+    return min(new["runs"]) > max(old["runs"])
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """One row per benchmark present in both files.
+
+    ``change`` is positive when the benchmark got worse, whichever direction
+    its unit runs in. A row regresses when that exceeds ``threshold`` and the
+    two sets of runs do not overlap; a slowdown within the run-to-run spread
+    is reported as noise instead.
+    """
+    rows = []
+    for name in sorted(set(baseline["results"]) & set(current["results"])):
+        old = baseline["results"][name]
+        new = current["results"][name]
+        if old["value"] == 0:
+            continue
+        ratio = new["value"] / old["value"]
+        if old.get("higher_is_better"):
+            change = 1 / ratio - 1 if ratio else float("inf")
+        else:
+            change = ratio - 1
+        slower = change > threshold
+        rows.append({
+            "name": name,
+            "unit": new["unit"],
+            "baseline": old["value"],
+            "current": new["value"],
+            "change": change,
+            "regressed": slower and _separated(old, new),
+            "noisy": slower and not _separated(old, new),
+        })
+    return rows
+
+
+def format_value(value: float, unit: str) -> str:
+    if unit == "ns/op":
+        for scale, suffix in ((1e9, "s"), (1e6, "ms"), (1e3, "us")):
+            if value >= scale:
+                return f"{value / scale:.2f} {suffix}"
+        return f"{value:.0f} ns"
+    return f"{value:.2f} {unit}"
@@ -0,0 +1,86 @@
+"""Latency vs. concurrency for DB-bound endpoints, run in-process.
+
+Every SQL statement is delayed by ``--query-latency-ms`` to emulate a network
+round trip to the database. With DB work dispatched to the threadpool the p99
+should stay close to the single-request latency as concurrency grows, as long
+as the threadpool is at least as large as the concurrency level and the
+process is not CPU-bound (watch the req/s column: once it stops growing, the
+extra latency is queueing for the interpreter, not for the database).
+
+    python benchmarks/load_concurrency.py --levels 1 10 50 100 200
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("TESTING", "1")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import anyio  # noqa: E402
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from harness import percentile  # noqa: E402
+from app.db import configure_threadpool, engine, init_db  # noqa: E402
+from main import app  # noqa: E402
+
+
+async def run_level(client, headers, concurrency, requests_per_worker):
+    latencies = []
+
+    async def worker():
+        for _ in range(requests_per_worker):
+            start = time.perf_counter()
+            r = await client.get("/calculations", headers=headers)
+            latencies.append(time.perf_counter() - start)
+            assert r.status_code == 200, r.text
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(concurrency):
+            tg.start_soon(worker)
+    return latencies
+
+
+async def main(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    configure_threadpool(max(args.levels))
+    init_db()
+
+    def _sleep(*_):
+        time.sleep(args.query_latency_ms / 1000)
+
+    event.listen(engine, "before_cursor_execute", _sleep)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post(
+            "/users/register",
+            json={"username": "bench", "email": "bench@example.com", "password": "password123"},
+        )
+        r = await client.post(
+            "/users/login", json={"username_or_email": "bench", "password": "password123"}
+        )
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+
+        print(f"{'concurrency':>11} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for level in args.levels:
+            start = time.perf_counter()
+            latencies = await run_level(client, headers, level, args.requests)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{level:>11} {len(latencies):>9} {len(latencies) / elapsed:>8.0f} "
+                f"{statistics.median(latencies) * 1000:>8.1f} "
+                f"{percentile(latencies, 99) * 1000:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--requests", type=int, default=10, help="requests per concurrent worker")
+    parser.add_argument("--query-latency-ms", type=float, default=20.0)
+    anyio.run(main, parser.parse_args())
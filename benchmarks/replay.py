@@ -0,0 +1,235 @@
+"""Replay captured traffic against the app with open-loop scheduling.
+
+Input is JSON Lines, one request per line::
+
+    {"method": "POST", "path": "/add", "json": {"a": 1, "b": 2}}
+    {"method": "GET", "path": "/calculations?limit=20", "user": "alice", "t": 0.25}
+
+``t`` is the request's offset in seconds from the start of the capture;
+``user`` makes the request authenticated as that user (registered and
+logged in before the replay starts); ``headers`` and ``json`` are passed
+through. Lines missing ``method`` or ``path`` are skipped and counted, so a
+file in some other format fails loudly rather than silently doing nothing.
+
+Scheduling is open-loop: each request is sent at its planned time whether or
+not earlier ones have finished, and latency is measured from the planned
+time, so a stalled server shows up as latency instead of quietly lowering
+the offered load (coordinated omission).
+
+    python benchmarks/replay.py benchmarks/traffic/mixed.jsonl --rate 200
+    python benchmarks/replay.py capture.jsonl --speed 2           # recorded offsets, 2x faster
+    python benchmarks/replay.py capture.jsonl --max-rate --concurrency 32
+    python benchmarks/replay.py capture.jsonl --rate 50 --base-url http://localhost:8000
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench-replay-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_DIR.name}/replay.db")
+os.environ.setdefault("LOG_MODE", "off")
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import anyio  # noqa: E402
+import httpx  # noqa: E402
+
+from harness import percentile  # noqa: E402
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+@dataclass
+class Replayed:
+    method: str
+    path: str
+    json: Optional[object] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    user: Optional[str] = None
+    offset: Optional[float] = None
+
+
+@dataclass
+class Stats:
+    latencies: List[float] = field(default_factory=list)
+    service_times: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+
+def endpoint(method: str, path: str) -> str:
+    """Group requests by route shape: drop the query string, collapse ids."""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])}"
+
+
+def read_capture(path: Path, skipped: Counter) -> Iterator[Replayed]:
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                yield Replayed(
+                    method=entry["method"].upper(),
+                    path=entry["path"],
+                    json=entry.get("json"),
+                    headers=dict(entry.get("headers") or {}),
+                    user=entry.get("user"),
+                    offset=float(entry["t"]) if "t" in entry else None,
+                )
+            except (ValueError, KeyError, TypeError, AttributeError):
+                skipped["lines"] += 1
+
+
+async def login_users(client, path: Path) -> Dict[str, str]:
+    skipped: Counter = Counter()
+    tokens = {}
+    for user in sorted({r.user for r in read_capture(path, skipped) if r.user}):
+        credentials = {"username": user, "email": f"{user}@example.com", "password": "replay-password"}
+        await client.post("/users/register", json=credentials)
+        r = await client.post(
+            "/users/login", json={"username_or_email": user, "password": credentials["password"]}
+        )
+        r.raise_for_status()
+        tokens[user] = r.json()["token"]
+    return tokens
+
+
+async def send(client, request: Replayed, tokens, planned: float, stats: Dict[str, Stats]):
+    headers = dict(request.headers)
+    if request.user:
+        headers["Authorization"] = f"Bearer {tokens[request.user]}"
+    entry = stats[endpoint(request.method, request.path)]
+    sent = time.perf_counter()
+    try:
+        r = await client.request(request.method, request.path, json=request.json, headers=headers)
+        status = r.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    done = time.perf_counter()
+    entry.latencies.append(done - planned)
+    entry.service_times.append(done - sent)
+    entry.statuses[status] += 1
+    if not isinstance(status, int) or status >= 400:
+        entry.errors += 1
+
+
+async def replay_open_loop(client, requests, tokens, args, stats) -> None:
+    start = time.perf_counter() + 0.05
+    limiter = anyio.CapacityLimiter(args.max_in_flight)
+
+    async def limited(request, planned):
+        # waiting here still counts against latency: it is measured from `planned`
+        async with limiter:
+            await send(client, request, tokens, planned, stats)
+
+    async with anyio.create_task_group() as tg:
+        for index, request in enumerate(requests):
+            if args.rate:
+                planned = start + index / args.rate
+            elif request.offset is not None:
+                planned = start + request.offset / args.speed
+            else:
+                raise SystemExit(f"request {index} has no 't' offset; pass --rate or --max-rate")
+            delay = planned - time.perf_counter()
+            if delay > 0:
+                await anyio.sleep(delay)
+            tg.start_soon(limited, request, planned)
+
+
+async def replay_closed_loop(client, requests, tokens, args, stats) -> None:
+    """--max-rate: N workers back to back; latency here is service time."""
+    iterator = iter(requests)
+
+    async def worker():
+        for request in iterator:
+            await send(client, request, tokens, time.perf_counter(), stats)
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(args.concurrency):
+            tg.start_soon(worker)
+
+
+def report(stats: Dict[str, Stats], elapsed: float, skipped: Counter) -> None:
+    """Latency columns run from the planned send time; ``svc p99`` from the
+    actual send, so a wide gap between them means requests queued client-side."""
+    header = f"{'endpoint':<32} {'count':>7} {'err %':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'svc p99':>8}"
+    print(header)
+    every = Stats()
+    for name in sorted(stats):
+        entry = stats[name]
+        every.latencies += entry.latencies
+        every.service_times += entry.service_times
+        every.statuses.update(entry.statuses)
+        every.errors += entry.errors
+        _row(name, entry, elapsed)
+    if stats:
+        print("-" * len(header))
+        _row("all", every, elapsed)
+    print(f"statuses: {dict(every.statuses)}; elapsed {elapsed:.2f}s")
+    if skipped["lines"]:
+        print(f"skipped {skipped['lines']} line(s) without a usable method/path")
+
+
+def _row(name: str, entry: Stats, elapsed: float) -> None:
+    latencies = entry.latencies
+    count = len(latencies)
+    print(
+        f"{name:<32} {count:>7} {entry.errors / count * 100:>6.1f} {count / elapsed:>8.1f} "
+        f"{statistics.median(latencies) * 1000:>8.1f} {percentile(latencies, 90) * 1000:>8.1f} "
+        f"{percentile(latencies, 99) * 1000:>8.1f} {max(latencies) * 1000:>8.1f} "
+        f"{percentile(entry.service_times, 99) * 1000:>8.1f}"
+    )
+
+
+async def main(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from app.db import configure_threadpool, init_db
+        from main import app
+
+        configure_threadpool()
+        init_db()
+        # server errors become 500s, as they would over the network
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        base_url = "http://replay"
+
+    limits = httpx.Limits(max_connections=args.max_in_flight)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        tokens = await login_users(client, args.capture)
+        skipped: Counter = Counter()
+        requests = read_capture(args.capture, skipped)
+        stats: Dict[str, Stats] = defaultdict(Stats)
+        start = time.perf_counter()
+        if args.max_rate:
+            await replay_closed_loop(client, requests, tokens, args, stats)
+        else:
+            await replay_open_loop(client, requests, tokens, args, stats)
+        report(stats, time.perf_counter() - start, skipped)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", type=Path, help="JSON Lines capture to replay")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--rate", type=float, help="fixed request rate per second, ignoring recorded offsets")
+    pacing.add_argument("--max-rate", action="store_true", help="closed loop: as fast as --concurrency workers allow")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale for recorded offsets (2 = twice as fast)")
+    parser.add_argument("--concurrency", type=int, default=16, help="workers for --max-rate")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="cap on outstanding requests")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--base-url", help="replay against a running server instead of in-process")
+    anyio.run(main, parser.parse_args())
@@ -0,0 +1,140 @@
+"""Cold-start budget: time from process launch to the first served response.
+
+Each run starts ``uvicorn main:app`` in a fresh interpreter against a new
+SQLite file (so schema creation is included) and polls ``GET /health`` until
+it answers. The import-time profile comes from ``python -X importtime`` and
+attributes every module's own import time to its top-level package, so the
+rows add up to the total.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 5 --budget 2.5 --top 20
+
+Exits with status 1 when the median cold start exceeds ``--budget`` seconds,
+so it can gate CI next to ``suite.py compare``. Like the suite, the budget
+only means something on the machine it was set for.
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# cold start to first response, seconds (median of --runs)
+DEFAULT_BUDGET = 2.5
+
+
+def _env(db_dir: str, name: str) -> dict:
+    env = dict(os.environ)
+    env.update(DATABASE_URL=f"sqlite:///{db_dir}/{name}.db", LOG_MODE="off")
+    env.setdefault("SECRET_KEY", "benchmark-only-secret-key")
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _answers(port: int) -> bool:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+    try:
+        conn.request("GET", "/health")
+        return conn.getresponse().status == 200
+    except OSError:
+        return False
+    finally:
+        conn.close()
+
+
+def cold_start(db_dir: str, name: str, timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn to the first 200 from /health."""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=_env(db_dir, name), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode} before serving")
+            if _answers(port):
+                return time.perf_counter() - start
+            time.sleep(0.005)
+        raise RuntimeError(f"no response within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_seconds(db_dir: str, module: str = "main") -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=_env(db_dir, "import"),
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def import_profile(db_dir: str, module: str = "main") -> Tuple[int, Dict[str, int]]:
+    """Total and per-top-level-package self import time of ``module``, in µs."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=_env(db_dir, "profile"),
+        capture_output=True, text=True, check=True,
+    )
+    lines = [line for line in out.stderr.splitlines() if line.startswith("import time:")][1:]
+    rows = [line.split("|") for line in lines]
+    # the module's own line closes its subtree: everything before it that
+    # is not an interpreter-startup import (site) belongs to it
+    end = next(i for i, row in enumerate(rows) if row[2].strip() == module)
+    start = max((i for i in range(end) if row_depth(rows[i]) <= row_depth(rows[end])), default=-1) + 1
+    by_package: Dict[str, int] = defaultdict(int)
+    for row in rows[start:end + 1]:
+        by_package[row[2].strip().split(".")[0]] += int(row[0].split(":")[1])
+    return int(rows[end][1]), dict(by_package)
+
+
+def row_depth(row: List[str]) -> int:
+    name = row[2].rstrip()
+    return len(name) - len(name.lstrip())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds, median cold start")
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the import profile")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as db_dir:
+        total, by_package = import_profile(db_dir)
+        print(f"import main: {total / 1000:.0f} ms cumulative (-X importtime)")
+        for package, micros in sorted(by_package.items(), key=lambda item: -item[1])[: args.top]:
+            print(f"  {package:<24} {micros / 1000:8.1f} ms  {micros / total:6.1%}")
+
+        imports = [import_seconds(db_dir) for _ in range(args.runs)]
+        starts = [cold_start(db_dir, f"run{i}") for i in range(args.runs)]
+
+    median = statistics.median(starts)
+    print(f"import main:          median {statistics.median(imports) * 1000:.0f} ms over {args.runs} runs")
+    print(f"cold start to /health: median {median * 1000:.0f} ms, "
+          f"min {min(starts) * 1000:.0f} ms, max {max(starts) * 1000:.0f} ms")
+    if median > args.budget:
+        print(f"FAIL: over the {args.budget:.2f}s budget", file=sys.stderr)
+        return 1
+    print(f"OK: within the {args.budget:.2f}s budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
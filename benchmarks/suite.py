@@ -0,0 +1,297 @@
+"""Reproducible benchmark suite with JSON baselines and regression checks.
+
+Microbenchmarks cover app.operations, the calculation factory, the schema
+validators, app.security, the expression compiler and the import parser.
+API benchmarks drive the ASGI app in-process (httpx.ASGITransport, no
+sockets) at fixed concurrency levels and record throughput and latency
+percentiles.
+
+    python benchmarks/suite.py run --output benchmarks/results/current.json
+    python benchmarks/suite.py run --filter ops. --filter security.
+    python benchmarks/suite.py compare benchmarks/baselines/default.json \\
+        benchmarks/results/current.json --threshold 0.10
+
+``compare`` exits with status 1 when any benchmark got worse by more than
+the threshold and every current run is worse than every baseline run, so it
+can gate CI without failing on run-to-run noise. Compare results from the same machine
+only; refresh the baseline with ``run --output benchmarks/baselines/default.json``.
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# A throwaway file database: the in-memory test database shares one
+# connection between threads and cannot take concurrent writes.
+_DB_DIR = tempfile.TemporaryDirectory(prefix="bench-suite-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_DIR.name}/suite.db")
+os.environ.setdefault("LOG_MODE", "off")
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import anyio  # noqa: E402
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+
+import harness  # noqa: E402
+from app import operations  # noqa: E402
+from app.db import configure_threadpool, init_db  # noqa: E402
+from app.expressions import compile_expression  # noqa: E402
+from app.factory.calculation_factory import compute, compute_cached, compute_many, result_cache  # noqa: E402
+from app.importer import read_chunks, validate  # noqa: E402
+from app.models.calculation import CalculationType  # noqa: E402
+from app.schemas.calculation import CalculationBatchCreate, CalculationCreate  # noqa: E402
+from app.schemas.user import UserCreate  # noqa: E402
+from app import security  # noqa: E402
+
+# name -> (factory returning the callable to time, measure() overrides)
+MICRO: Dict[str, Tuple[Callable[[], Callable[[], object]], dict]] = {}
+
+
+def micro(name: str, **options):
+    def register(factory):
+        MICRO[name] = (factory, options)
+        return factory
+
+    return register
+
+
+@micro("ops.add.scalar")
+def _():
+    return lambda: operations.add(3.0, 4.0)
+
+
+@micro("ops.divide.scalar")
+def _():
+    return lambda: operations.divide(3.0, 4.0)
+
+
+@micro("ops.divide.array_10k")
+def _():
+    a, b = np.arange(10_000, dtype=float), np.arange(10_000, dtype=float)
+    return lambda: operations.divide(a, b)
+
+
+@micro("factory.compute")
+def _():
+    return lambda: compute(CalculationType.Multiply, 6.0, 7.0)
+
+
+@micro("factory.compute_cached.hit")
+def _():
+    result_cache.clear()
+    compute_cached(CalculationType.Multiply, 6.0, 7.0)
+    return lambda: compute_cached(CalculationType.Multiply, 6.0, 7.0)
+
+
+@micro("factory.compute_many_10k")
+def _():
+    types = [CalculationType.Add, CalculationType.Subtract, CalculationType.Multiply, CalculationType.Divide]
+    types = np.array([t.value for t in types] * 2_500)
+    a, b = np.arange(10_000, dtype=float), np.arange(1, 10_001, dtype=float)
+    return lambda: compute_many(types, a, b)
+
+
+@micro("schemas.calculation_create")
+def _():
+    payload = {"a": 10, "b": 5, "type": "Divide"}
+    return lambda: CalculationCreate.model_validate(payload)
+
+
+@micro("schemas.calculation_batch_1k")
+def _():
+    payload = {"items": [{"a": i, "b": 2, "type": "Add"} for i in range(1_000)]}
+    return lambda: CalculationBatchCreate.model_validate(payload)
+
+
+@micro("schemas.user_create")
+def _():
+    payload = {"username": "bench", "email": "bench@example.com", "password": "password123"}
+    return lambda: UserCreate.model_validate(payload)
+
+
+@micro("security.hash_password", repeats=3, min_time=0.5)
+def _():
+    return lambda: security.hash_password("password123")
+
+
+@micro("security.verify_password", repeats=3, min_time=0.5)
+def _():
+    hashed = security.hash_password("password123")
+    return lambda: security.verify_password("password123", hashed)
+
+
+@micro("security.create_access_token")
+def _():
+    return lambda: security.create_access_token(1, "bench")
+
+
+@micro("security.decode_access_token")
+def _():
+    token = security.create_access_token(1, "bench")
+    return lambda: security.decode_access_token(token)
+
+
+@micro("expressions.compile.uncached")
+def _():
+    source = "sqrt(x^2 + y^2) * sin(x) / (1 + abs(y))"
+    return lambda: compile_expression.__wrapped__(source)
+
+
+@micro("expressions.evaluate")
+def _():
+    compiled = compile_expression("sqrt(x^2 + y^2) * sin(x) / (1 + abs(y))")
+    return lambda: compiled.evaluate({"x": 3.0, "y": 4.0})
+
+
+@micro("importer.parse_validate_csv_20k")
+def _():
+    types = ["Add", "Subtract", "Multiply", "Divide"]
+    data = ("a,b,type\n" + "".join(f"{i * 0.5},{i % 7},{types[i % 4]}\n" for i in range(20_000))).encode()
+    now = datetime.now(timezone.utc)
+
+    def parse_and_validate():
+        for chunk in read_chunks(io.BytesIO(data), "csv", 20_000):
+            validate(chunk, now)
+
+    return parse_and_validate
+
+
+# name -> (method, path, json body, needs auth)
+API = {
+    "api.add": ("POST", "/add", {"a": 6, "b": 7}, False),
+    "api.create_calculation": ("POST", "/calculations", {"a": 6, "b": 7, "type": "Multiply"}, True),
+    "api.list_calculations": ("GET", "/calculations?limit=50", None, True),
+}
+
+
+async def run_round(name, client, headers, concurrency, total):
+    method, path, body, auth = API[name]
+    request_headers = headers if auth else {}
+    latencies: List[float] = []
+    per_worker = max(1, total // concurrency)
+
+    async def worker():
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            r = await client.request(method, path, json=body, headers=request_headers)
+            latencies.append(time.perf_counter() - start)
+            assert r.status_code < 400, r.text
+
+    start = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for _ in range(concurrency):
+            tg.start_soon(worker)
+    return latencies, time.perf_counter() - start
+
+
+async def run_api(name, client, headers, concurrency, total, rounds) -> Dict[str, dict]:
+    """Best of ``rounds`` for throughput and per-round latency percentiles."""
+    throughputs, p50s, p99s = [], [], []
+    for _ in range(rounds):
+        latencies, elapsed = await run_round(name, client, headers, concurrency, total)
+        throughputs.append(len(latencies) / elapsed)
+        p50s.append(statistics.median(latencies) * 1000)
+        p99s.append(harness.percentile(latencies, 99) * 1000)
+
+    key = f"{name}.c{concurrency}"
+    return {
+        f"{key}.throughput": {"value": max(throughputs), "unit": "req/s", "higher_is_better": True, "runs": throughputs},
+        f"{key}.p50": {"value": min(p50s), "unit": "ms", "higher_is_better": False, "runs": p50s},
+        f"{key}.p99": {"value": min(p99s), "unit": "ms", "higher_is_better": False, "runs": p99s},
+    }
+
+
+async def run_api_suite(names, levels, total, rounds) -> Dict[str, dict]:
+    configure_threadpool(max(40, max(levels)))
+    init_db()
+    from main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post(
+            "/users/register",
+            json={"username": "suite", "email": "suite@example.com", "password": "password123"},
+        )
+        r = await client.post("/users/login", json={"username_or_email": "suite", "password": "password123"})
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+        for name in names:
+            for level in levels:
+                # one untimed pass so the first level doesn't pay for warm-up
+                await run_round(name, client, headers, level, min(total, 50))
+                results.update(await run_api(name, client, headers, level, total, rounds))
+    return results
+
+
+def selected(names, filters):
+    return [n for n in names if not filters or any(f in n for f in filters)]
+
+
+def run(args) -> int:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results: Dict[str, dict] = {}
+    for name in selected(MICRO, args.filter):
+        factory, options = MICRO[name]
+        options = {"repeats": args.repeats, "min_time": args.min_time, **options}
+        results[name] = harness.measure(factory(), **options)
+        print(f"{name:<45} {harness.format_value(results[name]['value'], 'ns/op'):>12}")
+
+    api_names = selected(API, args.filter)
+    if api_names:
+        api_results = anyio.run(run_api_suite, api_names, args.levels, args.requests, args.repeats)
+        for name, result in api_results.items():
+            print(f"{name:<45} {harness.format_value(result['value'], result['unit']):>12}")
+        results.update(api_results)
+
+    if args.output:
+        harness.save(results, Path(args.output))
+        print(f"wrote {len(results)} results to {args.output}")
+    return 0
+
+
+def compare(args) -> int:
+    rows = harness.compare(harness.load(args.baseline), harness.load(args.current), args.threshold)
+    print(f"{'benchmark':<45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else "  (noise)" if row["noisy"] else ""
+        print(
+            f"{row['name']:<45} {harness.format_value(row['baseline'], row['unit']):>12} "
+            f"{harness.format_value(row['current'], row['unit']):>12} {row['change']:>+8.1%}{flag}"
+        )
+    regressions = [row for row in rows if row["regressed"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print(f"no regressions above {args.threshold:.0%} across {len(rows)} benchmarks")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run benchmarks and optionally save results")
+    run_parser.add_argument("--output", help="write results JSON here")
+    run_parser.add_argument("--filter", action="append", default=[], help="only names containing this (repeatable)")
+    run_parser.add_argument("--repeats", type=int, default=5, help="runs per benchmark (rounds for API benchmarks)")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="seconds per microbenchmark repeat")
+    run_parser.add_argument("--levels", type=int, nargs="+", default=[1, 16], help="API concurrency levels")
+    run_parser.add_argument("--requests", type=int, default=200, help="API requests per round")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, e.g. 0.10 = 10%%")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
@@ -0,0 +1,73 @@
+"""Bulk-import calculations from a CSV or NDJSON file into the database.
+
+The command-line counterpart of ``POST /calculations/import``, run against
+DATABASE_URL directly:
+
+    python import_calculations.py history.csv --user alice
+    python import_calculations.py - --user alice --format ndjson < history.ndjson
+    python import_calculations.py history.csv --user alice --rejects rejects.ndjson
+
+Progress goes to stderr; rejected rows go to ``--rejects`` as NDJSON (or
+stderr when it is not given).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app.db import SessionLocal, init_db
+from app.importer import IMPORT_CHUNK_SIZE, ImportFormatError, read_chunks, run_import
+from app.models.user import User
+
+_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", help="file to import, or - for stdin")
+    parser.add_argument("--user", required=True, help="username that will own the rows")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="rows per transaction")
+    parser.add_argument("--rejects", type=Path, help="write rejected rows here as NDJSON")
+    args = parser.parse_args(argv)
+
+    format = args.format or _EXTENSIONS.get(Path(args.file).suffix.lower())
+    if format is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+
+    init_db()
+    with SessionLocal() as db:
+        user_id = db.query(User.id).filter(User.username == args.user).scalar()
+    if user_id is None:
+        print(f"No such user: {args.user}", file=sys.stderr)
+        return 1
+
+    source = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    rejects = open(args.rejects, "w") if args.rejects else sys.stderr
+    try:
+        chunks = read_chunks(source, format, args.chunk_size)
+        progress = None
+        for progress in run_import(SessionLocal, user_id, chunks, max_rejects=sys.maxsize):
+            for reject in progress.rejects:
+                rejects.write(json.dumps({"line": reject.line, "error": reject.error}) + "\n")
+            rate = progress.rows / progress.elapsed if progress.elapsed else 0
+            print(
+                f"{progress.rows} rows: {progress.imported} imported, {progress.rejected} rejected "
+                f"({rate:,.0f} rows/s)",
+                file=sys.stderr,
+            )
+    except ImportFormatError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if rejects is not sys.stderr:
+            rejects.close()
+    if progress is None:
+        print("Nothing to import", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,148 @@
+import asyncio
+import csv
+import io
+import json
 import logging
-import uvicorn
-from fastapi import FastAPI, HTTPException, Request, Depends, Header
-from fastapi.responses import JSONResponse, HTMLResponse, Response
+import math
+import os
+import time
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Depends, Header, Query
+from fastapi.responses import JSONResponse, HTMLResponse, Response, StreamingResponse
 from fastapi import status
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel, Field, field_validator
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+from sqlalchemy import delete, insert, or_, select, text, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app.operations import add, subtract, multiply, divide
-from app.db import get_db, init_db
+from app.db import DB_INIT_ON_STARTUP, SessionLocal, engine, get_db, group_commit, init_db, configure_threadpool
 from app.models.user import User
 from app.models.calculation import Calculation as CalculationModel, CalculationType
+from app.models.calculation_stats import CalculationStat, CalculationVersion
 from app.schemas.user import UserCreate, UserRead
-from app.schemas.calculation import CalculationCreate, CalculationRead
-from app.security import hash_password, verify_password
+from app.schemas.calculation import (
+    CalculationCreate,
+    CalculationRead,
+    CalculationBatchCreate,
+    CalculationBatchItemResult,
+    CalculationBatchResult,
+    CalculationStatsRead,
+)
+from app.expressions import ExpressionError, compile_expression
+from app.schemas.expression import EvaluateRequest, EvaluateResponse
+from app.factory.calculation_factory import compute_cached, compute_many, result_cache
+from app.cache import TTLCache
+from app.responses import (
+    CACHE_CONTROL, CALCULATION_FIELDS, FAST_RESPONSES, FastJSONResponse, calculation_dict, calculation_etag,
+    collection_etag, etag_matches, not_modified,
+)
+from app.logging_config import setup_logging, shutdown_logging
+from app.metrics import (
+    MetricsMiddleware, Gauge, instrument_engine, password_hash_duration_seconds, registry, stats_metrics,
+)
+from app.profiling import ProfiledRoute, ProfilingMiddleware, profile_engine, profiled, record_phase
+from app.write_behind import WRITE_BEHIND_MODE, WriteBehindBuffer, WriteBehindFull
+from app.supervisor import heartbeat, supervised, worker_health
+from app.importer import IMPORT_CHUNK_SIZE, ImportFormatError, ImportProgress, detect_format, read_chunks, run_import
+from app.rate_limit import RateLimitMiddleware, limiter_from_env
+from app.uploads import DuplexResponse, UploadAborted
+from app.pagination import InvalidCursor, after_cursor, as_utc, decode_cursor, encode_cursor
+from app.security import (
+    hash_password,
+    verify_password,
+    hash_pool,
+    HashPoolSaturated,
+    create_access_token,
+    decode_access_token,
+    revoke_token,
+    InvalidToken,
+)
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
+# Must be set before any route is declared; costs nothing unless a request is profiled.
+app.router.route_class = ProfiledRoute
+app.add_middleware(ProfilingMiddleware)
+# RATE_LIMIT_* / SHED_* settings; inside MetricsMiddleware so rejections are counted
+rate_limiter = limiter_from_env(engine)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+app.add_middleware(MetricsMiddleware)
+
+# Metrics owned by other components are read only when /metrics is scraped.
+instrument_engine(engine)
+hash_pool.add_observer(password_hash_duration_seconds.observe)
+profile_engine(engine)
+hash_pool.add_observer(lambda elapsed: record_phase("hash", elapsed))
+
+
+def _collect_component_metrics():
+    metrics = stats_metrics(
+        "hash_pool", hash_pool.stats(), "Password hash pool",
+        counters=("completed", "rejected", "latency_seconds_total"),
+    )
+    metrics += stats_metrics(
+        "result_cache", result_cache.stats(), "Calculation result cache",
+        counters=("hits", "shared_hits", "misses", "shared_errors"),
+    )
+    metrics += stats_metrics(
+        "write_behind", write_buffer.stats(), "Write-behind buffer",
+        counters=("flushed", "batches", "failed", "rejected"),
+    )
+    metrics += stats_metrics(
+        "group_commit", group_commit.stats(), "Group commit", counters=("writes", "commits", "retried"),
+    )
+    metrics += stats_metrics(
+        "rate_limit", rate_limiter.stats(), "Rate limiting and load shedding",
+        counters=("allowed", "limited", "shed_loop_lag", "shed_pool_wait", "backend_errors"),
+    )
+    checked_out = getattr(engine.pool, "checkedout", None)
+    if checked_out is not None:
+        gauge = Gauge("db_pool_checked_out", "Database connections currently checked out.")
+        gauge.set(checked_out())
+        metrics.append(gauge)
+    return metrics
+
+
+registry.add_collector(_collect_component_metrics)
+
+# WRITE_BEHIND_MODE=group|async batches calculation inserts; "sync" (the
+# default) keeps one transaction per request.
+write_buffer = WriteBehindBuffer(SessionLocal, mode=WRITE_BEHIND_MODE)
 
 @app.on_event("startup")
 def startup():
-    print("Startup handler running")
-    init_db()
+    # paired with shutdown_logging(), so a restarted app logs again
+    setup_logging()
+    configure_threadpool()
+    if DB_INIT_ON_STARTUP:
+        init_db()
+
+_heartbeat_task = None
+_loop_lag_task = None
+
+@app.on_event("startup")
+async def start_heartbeat():
+    # under serve.py the supervisor watches this to tell a live worker from a hung one
+    global _heartbeat_task, _loop_lag_task
+    if supervised():
+        _heartbeat_task = asyncio.create_task(heartbeat())
+    if rate_limiter.shed_loop_lag:
+        _loop_lag_task = asyncio.create_task(rate_limiter.loop_lag.run())
+
+@app.on_event("shutdown")
+def shutdown():
+    for task in (_heartbeat_task, _loop_lag_task):
+        if task is not None:
+            task.cancel()
+    write_buffer.close()
+    group_commit.close()
+    hash_pool.shutdown()
+    shutdown_logging()
 
 @app.get("/", response_class=HTMLResponse)
 def homepage():
@@ -84,22 +202,55 @@ class OperationResponse(BaseModel):
 class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error message")
 
+def _operation_response(result: float):
+    if FAST_RESPONSES:
+        return FastJSONResponse({"result": result})
+    return OperationResponse(result=result)
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     logger.error(f"HTTPException on {request.url.path}: {exc.detail}")
     return JSONResponse(status_code=exc.status_code, content={"error": exc.detail})
 
+@app.exception_handler(HashPoolSaturated)
+async def hash_pool_saturated_handler(request: Request, exc: HashPoolSaturated):
+    logger.error(f"HashPoolSaturated on {request.url.path}: {exc}")
+    return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(WriteBehindFull)
+async def write_behind_full_handler(request: Request, exc: WriteBehindFull):
+    logger.error(f"WriteBehindFull on {request.url.path}: {exc}")
+    return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": "1"})
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     error_messages = "; ".join(f"{err['loc'][-1]}: {err['msg']}" for err in exc.errors())
     logger.error(f"ValidationError on {request.url.path}: {error_messages}")
     return JSONResponse(status_code=400, content={"error": error_messages})
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/health", include_in_schema=False)
+def health(db: Session = Depends(get_db)):
+    # sync on purpose: answering at all proves the threadpool and pool have room
+    body = {"status": "ok", **worker_health()}
+    try:
+        db.execute(text("SELECT 1"))
+    except SQLAlchemyError:
+        logger.exception("Health check could not reach the database")
+        return JSONResponse(status_code=503, content={**body, "status": "database unavailable"})
+    return body
+
 # Simple calculator routes
+# Results are memoized per (type, a, b); the module-level operation is passed
+# in so it is only called on a cache miss.
 @app.post("/add", response_model=OperationResponse, responses={400: {"model": ErrorResponse}})
 async def add_route(operation: OperationRequest):
     try:
-        return OperationResponse(result=add(operation.a, operation.b))
+        result = result_cache.get_or_compute(CalculationType.Add, operation.a, operation.b, add)
+        return _operation_response(result)
     except Exception as e:
         logger.error(f"Add Operation Error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -107,7 +258,8 @@ async def add_route(operation: OperationRequest):
 @app.post("/subtract", response_model=OperationResponse, responses={400: {"model": ErrorResponse}})
 async def subtract_route(operation: OperationRequest):
     try:
-        return OperationResponse(result=subtract(operation.a, operation.b))
+        result = result_cache.get_or_compute(CalculationType.Subtract, operation.a, operation.b, subtract)
+        return _operation_response(result)
     except Exception as e:
         logger.error(f"Subtract Operation Error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -115,7 +267,8 @@ async def subtract_route(operation: OperationRequest):
 @app.post("/multiply", response_model=OperationResponse, responses={400: {"model": ErrorResponse}})
 async def multiply_route(operation: OperationRequest):
     try:
-        return OperationResponse(result=multiply(operation.a, operation.b))
+        result = result_cache.get_or_compute(CalculationType.Multiply, operation.a, operation.b, multiply)
+        return _operation_response(result)
     except Exception as e:
         logger.error(f"Multiply Operation Error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -123,7 +276,8 @@ async def multiply_route(operation: OperationRequest):
 @app.post("/divide", response_model=OperationResponse, responses={400: {"model": ErrorResponse}})
 async def divide_route(operation: OperationRequest):
     try:
-        return OperationResponse(result=divide(operation.a, operation.b))
+        result = result_cache.get_or_compute(CalculationType.Divide, operation.a, operation.b, divide)
+        return _operation_response(result)
     except ValueError as e:
         logger.error(f"Divide Operation Error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -131,124 +285,445 @@ async def divide_route(operation: OperationRequest):
         logger.error(f"Divide Operation Internal Error: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+# Expression evaluation
+@app.post("/evaluate", response_model=EvaluateResponse, response_model_exclude_none=True, responses={400: {"model": ErrorResponse}})
+def evaluate_expression(payload: EvaluateRequest):
+    try:
+        expression = compile_expression(payload.expression)
+        if payload.bindings is None:
+            result = float(expression.evaluate(payload.variables))
+            if not math.isfinite(result):
+                raise ExpressionError("Expression result is not a finite number")
+            return EvaluateResponse(result=result)
+        columns = {}
+        for name in expression.variables:
+            try:
+                columns[name] = np.fromiter((b[name] for b in payload.bindings), float, len(payload.bindings))
+            except KeyError:
+                raise ExpressionError(f"Missing variables: {name}")
+        values = np.broadcast_to(expression.evaluate(columns), (len(payload.bindings),))
+        finite = np.isfinite(values)
+        return EvaluateResponse(results=[float(v) if ok else None for v, ok in zip(values, finite)])
+    except ExpressionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # User endpoints
+# DB-bound handlers are plain `def` so FastAPI runs them in the bounded
+# threadpool (see app.db.configure_threadpool) instead of on the event loop.
 class UserLoginRequest(BaseModel):
     username_or_email: str = Field(..., description="Username or email")
     password: str = Field(..., min_length=8)
 
 @app.post("/users/register", response_model=UserRead, responses={400: {"model": ErrorResponse}})
-async def register_user(payload: UserCreate, db: Session = Depends(get_db)):
-    exists = db.query(User).filter(
-        (User.username == payload.username) | (User.email == payload.email)
+def register_user(payload: UserCreate, db: Session = Depends(get_db)):
+    # an index-only lookup spares a duplicate the bcrypt hash; the unique
+    # constraints still catch a duplicate registered in between
+    taken = db.execute(
+        select(User.id).where(or_(User.username == payload.username, User.email == payload.email)).limit(1)
     ).first()
-    if exists:
+    if taken:
         raise HTTPException(status_code=400, detail="Username or email already registered")
-    user = User(
-        username=payload.username,
-        email=payload.email,
-        password_hash=hash_password(payload.password),
+    # one INSERT ... RETURNING, no refresh afterwards
+    stmt = (
+        insert(User)
+        .values(
+            username=payload.username,
+            email=payload.email,
+            password_hash=hash_password(payload.password),
+        )
+        .returning(User.id, User.username, User.email, User.created_at)
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return UserRead.from_orm(user)
+    try:
+        user = group_commit.execute(db, lambda session: session.execute(stmt).one())
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Username or email already registered")
+    return UserRead.model_validate(user)
 
 @app.post("/users/login")
-async def login_user(payload: UserLoginRequest, db: Session = Depends(get_db)):
+def login_user(payload: UserLoginRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(
         (User.username == payload.username_or_email) |
         (User.email == payload.username_or_email)
     ).first()
     if not user or not verify_password(payload.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    token = user.username
+    token = create_access_token(user.id, user.username)
     return {"token": token}
 
 # Auth dependency
-async def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)) -> User:
+# token -> detached User; entries never outlive the token they were resolved
+# from, and a logout served by another worker is seen once they expire
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+principal_cache = TTLCache(maxsize=10_000, ttl=PRINCIPAL_CACHE_TTL)
+
+def _bearer_token(authorization: str) -> str:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
-    token = authorization.split(" ", 1)[1]
-    user = db.query(User).filter(User.username == token).first()
+    return authorization.split(" ", 1)[1]
+
+@profiled("auth")
+def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db)) -> User:
+    token = _bearer_token(authorization)
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+    try:
+        claims = decode_access_token(token)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    user = db.get(User, claims["sub"])
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
+    db.expunge(user)
+    principal_cache.set(token, user, ttl=min(principal_cache.ttl, claims["exp"] - time.time()))
     return user
 
+@app.post("/users/logout", status_code=status.HTTP_204_NO_CONTENT, responses={401: {"model": ErrorResponse}})
+def logout_user(authorization: str = Header(None)):
+    token = _bearer_token(authorization)
+    try:
+        revoke_token(token)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    principal_cache.pop(token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 # Calculation CRUD endpoints (BREAD)
-@app.get("/calculations", response_model=List[CalculationRead], responses={401: {"model": ErrorResponse}})
-async def browse_calculations(
+CALCULATION_COLUMNS = tuple(getattr(CalculationModel, f) for f in CALCULATION_FIELDS)
+
+def _calculation_response(calc):
+    if FAST_RESPONSES:
+        return FastJSONResponse(calculation_dict(calc))
+    return calc
+
+@app.get("/calculations", response_model=List[CalculationRead], responses={304: {"description": "Not modified (If-None-Match)"}, 401: {"model": ErrorResponse}})
+def browse_calculations(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor"),
+    type: Optional[CalculationType] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return db.query(CalculationModel).all()
+    # read before the rows, so a concurrent write can only make the tag
+    # older than the page (a spurious 200 later), never newer
+    version = db.query(CalculationVersion.version).filter(CalculationVersion.user_id == current_user.id).scalar()
+    etag = collection_etag(current_user.id, version or 0, request.url.query)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    query = db.query(*CALCULATION_COLUMNS).filter(CalculationModel.user_id == current_user.id)
+    if type is not None:
+        query = query.filter(CalculationModel.type == type)
+    if created_after is not None:
+        query = query.filter(CalculationModel.created_at >= as_utc(created_after))
+    if created_before is not None:
+        query = query.filter(CalculationModel.created_at < as_utc(created_before))
+    if cursor is not None:
+        try:
+            position = decode_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(after_cursor(CalculationModel.created_at, CalculationModel.id, position))
+    rows = (
+        query.order_by(CalculationModel.created_at, CalculationModel.id)
+        .limit(limit + 1)
+        .all()
+    )
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    if FAST_RESPONSES:
+        # straight from Row tuples to JSON, skipping per-row model validation
+        return FastJSONResponse([row._asdict() for row in rows], headers=headers)
+    response.headers.update(headers)
+    return rows
 
-@app.post("/calculations", response_model=CalculationRead, responses={400: {"model": ErrorResponse},401: {"model": ErrorResponse}})
-async def create_calculation(
+@app.post("/calculations", response_model=CalculationRead, responses={202: {"description": "Accepted (WRITE_BEHIND_MODE=async); id is null"}, 400: {"model": ErrorResponse},401: {"model": ErrorResponse},503: {"model": ErrorResponse}})
+def create_calculation(
     payload: CalculationCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    if payload.type == CalculationType.Add:
-        result = add(payload.a, payload.b)
-    elif payload.type == CalculationType.Subtract:
-        result = subtract(payload.a, payload.b)
-    elif payload.type == CalculationType.Multiply:
-        result = multiply(payload.a, payload.b)
-    else:
-        result = divide(payload.a, payload.b)
-    calc = CalculationModel(a=payload.a, b=payload.b, type=payload.type, result=result)
-    db.add(calc)
-    db.commit()
-    db.refresh(calc)
-    return calc
+    result = compute_cached(payload.type, payload.a, payload.b)
+    if write_buffer.enabled:
+        # hand the pooled connection back before waiting on the writer thread,
+        # which needs one of its own
+        db.close()
+        row = {
+            "user_id": current_user.id, "a": payload.a, "b": payload.b, "type": payload.type,
+            "result": result, "created_at": datetime.now(timezone.utc),
+        }
+        future = write_buffer.submit(row)
+        if write_buffer.mode == "async":
+            return FastJSONResponse(calculation_dict(row), status_code=status.HTTP_202_ACCEPTED)
+        row["id"] = future.result()
+        return _calculation_response(row)
+    stmt = (
+        insert(CalculationModel)
+        .values(user_id=current_user.id, a=payload.a, b=payload.b, type=payload.type, result=result)
+        .returning(*CALCULATION_COLUMNS)
+    )
+    calc = group_commit.execute(db, lambda session: session.execute(stmt).one())
+    return _calculation_response(calc)
+
+@app.post("/calculations/batch", response_model=CalculationBatchResult, responses={400: {"model": ErrorResponse},401: {"model": ErrorResponse}})
+def create_calculations_batch(
+    payload: CalculationBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    items = payload.items
+    with np.errstate(over="ignore", invalid="ignore"):
+        results = compute_many(
+            [item.type for item in items], [item.a for item in items], [item.b for item in items]
+        )
+    zero_divisor = np.ma.getmaskarray(results)
+    results = np.ma.getdata(results)
+    # overflow (1e308 * 10) gives inf, which no JSON response can carry
+    ok = ~zero_divisor & np.isfinite(results)
+    valid = [i for i in range(len(items)) if ok[i]]
+    ids = []
+    if valid:
+        rows = [
+            {
+                "user_id": current_user.id,
+                "a": items[i].a,
+                "b": items[i].b,
+                "type": items[i].type,
+                "result": float(results[i]),
+            }
+            for i in valid
+        ]
+        # one multi-row INSERT ... RETURNING instead of a commit per item
+        ids = db.execute(
+            insert(CalculationModel).returning(CalculationModel.id, sort_by_parameter_order=True),
+            rows,
+        ).scalars().all()
+        db.commit()
+    ids_by_index = dict(zip(valid, ids))
+    report = [
+        CalculationBatchItemResult(index=i, id=ids_by_index[i], result=float(results[i]))
+        if ok[i]
+        else CalculationBatchItemResult(
+            index=i, error="Cannot divide by zero!" if zero_divisor[i] else "Result is not a finite number"
+        )
+        for i in range(len(items))
+    ]
+    return CalculationBatchResult(created=len(valid), failed=len(items) - len(valid), items=report)
+
+STATS_BUCKETS = {
+    "hour": lambda start: start,
+    "day": lambda start: start.replace(hour=0),
+    "month": lambda start: start.replace(day=1, hour=0),
+    "all": lambda start: None,
+}
+
+@app.get("/calculations/stats", response_model=List[CalculationStatsRead], responses={401: {"model": ErrorResponse}})
+def calculation_stats(
+    bucket: Literal["hour", "day", "month", "all"] = Query("day"),
+    type: Optional[CalculationType] = None,
+    created_after: Optional[datetime] = Query(None, description="Hour precision"),
+    created_before: Optional[datetime] = Query(None, description="Hour precision"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # read from the trigger-maintained hourly rollup: O(hours), not O(rows)
+    query = db.query(
+        CalculationStat.bucket, CalculationStat.type, CalculationStat.count,
+        CalculationStat.total, CalculationStat.min_result, CalculationStat.max_result,
+    ).filter(CalculationStat.user_id == current_user.id)
+    if type is not None:
+        query = query.filter(CalculationStat.type == type)
+    if created_after is not None:
+        start = as_utc(created_after).replace(minute=0, second=0, microsecond=0)
+        query = query.filter(CalculationStat.bucket >= start)
+    if created_before is not None:
+        query = query.filter(CalculationStat.bucket < as_utc(created_before))
+    key_of = STATS_BUCKETS[bucket]
+    groups = {}
+    for hour, calc_type, count, total, low, high in query:
+        key = (key_of(as_utc(hour)), calc_type)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [count, total, low, high]
+        else:
+            group[0] += count
+            group[1] += total
+            group[2] = min(group[2], low)
+            group[3] = max(group[3], high)
+    return [
+        CalculationStatsRead(
+            bucket=key, type=calc_type, count=count, sum=total, min=low, max=high, mean=total / count
+        )
+        for (key, calc_type), (count, total, low, high) in sorted(
+            groups.items(), key=lambda item: (item[0][0] or datetime.min.replace(tzinfo=timezone.utc), item[0][1].value)
+        )
+    ]
+
+EXPORT_CHUNK_SIZE = 1000
 
-@app.get("/calculations/{calc_id}", response_model=CalculationRead, responses={404: {"model": ErrorResponse},401: {"model": ErrorResponse}})
-async def get_calculation(
+def _export_rows(user_id: int, format: str):
+    # the request's own session is closed before the body is streamed, so the
+    # generator opens one for the lifetime of the cursor
+    db = SessionLocal()
+    try:
+        stmt = (
+            select(*CALCULATION_COLUMNS)
+            .where(CalculationModel.user_id == user_id)
+            .order_by(CalculationModel.created_at, CalculationModel.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        result = db.execute(stmt)
+        if format == "csv":
+            yield ",".join(CALCULATION_FIELDS) + "\r\n"
+        for partition in result.partitions():
+            buf = io.StringIO()
+            if format == "csv":
+                writer = csv.writer(buf)
+                for id, a, b, type, res, created_at in partition:
+                    writer.writerow((id, a, b, type.value, res, created_at.isoformat()))
+            else:
+                for id, a, b, type, res, created_at in partition:
+                    buf.write(json.dumps({
+                        "id": id, "a": a, "b": b, "type": type.value,
+                        "result": res, "created_at": created_at.isoformat(),
+                    }))
+                    buf.write("\n")
+            yield buf.getvalue()
+    finally:
+        db.close()
+
+@app.get("/calculations/export", responses={401: {"model": ErrorResponse}})
+def export_calculations(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    current_user: User = Depends(get_current_user),
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(current_user.id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="calculations.{format}"'},
+    )
+
+def _import_events(user_id: int, format: str, body):
+    """NDJSON events for one upload; runs in a worker thread as ``body`` arrives."""
+    progress = ImportProgress()
+    try:
+        # a bad CSV header raises ImportFormatError before the first line: a 400
+        chunks = read_chunks(body, format, IMPORT_CHUNK_SIZE)
+        for progress in run_import(SessionLocal, user_id, chunks):
+            lines = [
+                json.dumps({"event": "reject", "line": reject.line, "error": reject.error})
+                for reject in progress.rejects
+            ]
+            lines.append(json.dumps({"event": "progress", **progress.totals()}))
+            yield "\n".join(lines) + "\n"
+    except UploadAborted:
+        # committed chunks stay; nobody is left to tell about the rest
+        logger.warning("Import for user %s aborted by the client after %d row(s)", user_id, progress.rows)
+        return
+    except ImportFormatError:
+        raise
+    except Exception:
+        # the status line went out with the first chunk: report in-band
+        logger.exception("Import for user %s failed after %d row(s)", user_id, progress.rows)
+        yield json.dumps({"event": "error", "error": "Import failed", **progress.totals()}) + "\n"
+        return
+    yield json.dumps({"event": "done", **progress.totals()}) + "\n"
+
+@app.post("/calculations/import", responses={400: {"model": ErrorResponse}, 401: {"model": ErrorResponse}})
+async def import_calculations(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Defaults from Content-Type"),
+    current_user: User = Depends(get_current_user),
+):
+    format = format or detect_format(request.headers.get("content-type"))
+    if format is None:
+        raise HTTPException(status_code=400, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+    # chunks are imported while the rest of the upload is still arriving
+    user_id = current_user.id
+    return DuplexResponse(
+        request,
+        lambda body: _import_events(user_id, format, body),
+        media_type="application/x-ndjson",
+        client_errors=(ImportFormatError,),
+    )
+
+@app.get("/calculations/{calc_id}", response_model=CalculationRead, responses={304: {"description": "Not modified (If-None-Match)"}, 404: {"model": ErrorResponse},401: {"model": ErrorResponse}})
+def get_calculation(
     calc_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    calc = db.query(CalculationModel).filter(CalculationModel.id == calc_id).first()
+    owned = (CalculationModel.id == calc_id, CalculationModel.user_id == current_user.id)
+    if if_none_match:
+        # revalidation reads only the row's timestamps
+        stamps = db.query(CalculationModel.updated_at, CalculationModel.created_at).filter(*owned).first()
+        if stamps is not None:
+            etag = calculation_etag(calc_id, *stamps)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+    calc = db.query(CalculationModel).filter(*owned).first()
     if not calc:
         raise HTTPException(status_code=404, detail="Calculation not found")
+    headers = {"ETag": calculation_etag(calc.id, calc.updated_at, calc.created_at), "Cache-Control": CACHE_CONTROL}
+    if FAST_RESPONSES:
+        return FastJSONResponse(calculation_dict(calc), headers=headers)
+    response.headers.update(headers)
     return calc
 
 @app.put("/calculations/{calc_id}", response_model=CalculationRead, responses={400: {"model": ErrorResponse},404: {"model": ErrorResponse},401: {"model": ErrorResponse}})
-async def update_calculation(
+def update_calculation(
     calc_id: int,
     payload: CalculationCreate,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    calc = db.query(CalculationModel).filter(CalculationModel.id == calc_id).first()
+    result = compute_cached(payload.type, payload.a, payload.b)
+    calc = db.execute(
+        update(CalculationModel)
+        .where(CalculationModel.id == calc_id, CalculationModel.user_id == current_user.id)
+        .values(a=payload.a, b=payload.b, type=payload.type, result=result)
+        .returning(*CALCULATION_COLUMNS, CalculationModel.updated_at)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
     if not calc:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Calculation not found")
-    calc.a = payload.a
-    calc.b = payload.b
-    calc.type = payload.type
-    if payload.type == CalculationType.Add:
-        calc.result = add(payload.a, payload.b)
-    elif payload.type == CalculationType.Subtract:
-        calc.result = subtract(payload.a, payload.b)
-    elif payload.type == CalculationType.Multiply:
-        calc.result = multiply(payload.a, payload.b)
-    else:
-        calc.result = divide(payload.a, payload.b)
     db.commit()
-    db.refresh(calc)
+    # the new version's tag, so the client can revalidate without a GET first
+    headers = {"ETag": calculation_etag(calc.id, calc.updated_at, calc.created_at), "Cache-Control": CACHE_CONTROL}
+    if FAST_RESPONSES:
+        return FastJSONResponse(calculation_dict(calc), headers=headers)
+    response.headers.update(headers)
     return calc
 
-@app.delete("/calculations/{calc_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_calculation(
+@app.delete("/calculations/{calc_id}", status_code=status.HTTP_204_NO_CONTENT, responses={404: {"model": ErrorResponse},401: {"model": ErrorResponse}})
+def delete_calculation(
     calc_id: int,
     db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
 ):
-    calc = db.query(CalculationModel).filter(CalculationModel.id == calc_id).first()
-    if not calc:
+    deleted = db.execute(
+        delete(CalculationModel)
+        .where(CalculationModel.id == calc_id, CalculationModel.user_id == current_user.id)
+        .execution_options(synchronize_session=False)
+    )
+    if not deleted.rowcount:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Calculation not found")
-    db.delete(calc)
     db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 if __name__ == "__main__":  # pragma: no cover
+    import uvicorn
+
     uvicorn.run(app, host="127.0.0.1", port=8000)
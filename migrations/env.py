@@ -0,0 +1,33 @@
+"""Alembic environment.
+
+Runs on the connection ``app.db.upgrade_schema`` passes in, or, from the
+``alembic`` command line, on app.db's engine (so DATABASE_URL applies).
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.db import Base, engine
+from app.models import calculation, calculation_stats, user  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name)
+
+
+def run_migrations(connection) -> None:
+    # render_as_batch: SQLite can only add columns in place; anything else
+    # (a foreign key, say) copies the table
+    context.configure(connection=connection, target_metadata=Base.metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    # the migrations inspect the live schema before changing it
+    raise SystemExit("Offline (--sql) migrations are not supported")
+if config.attributes.get("connection") is not None:
+    run_migrations(config.attributes["connection"])
+else:
+    with engine.connect() as connection:
+        run_migrations(connection)
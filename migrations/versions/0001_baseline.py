@@ -0,0 +1,46 @@
+"""Baseline: users and calculations as the first release created them
+
+Databases created before migrations existed have no alembic_version table;
+upgrade_schema stamps them at this revision before upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("username", sa.String, nullable=False),
+        sa.Column("email", sa.String, nullable=False),
+        sa.Column("password_hash", sa.String, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_table(
+        "calculations",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("a", sa.Float, nullable=False),
+        sa.Column("b", sa.Float, nullable=False),
+        sa.Column("type", sa.Enum("Add", "Subtract", "Multiply", "Divide", name="calculationtype"), nullable=False),
+        sa.Column("result", sa.Float, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_calculations_id", "calculations", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("calculations")
+    op.drop_table("users")
+    sa.Enum(name="calculationtype").drop(op.get_bind(), checkfirst=True)
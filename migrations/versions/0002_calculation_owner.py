@@ -0,0 +1,45 @@
+"""calculations.user_id and the per-user keyset pagination indexes
+
+Databases that create_all() built after the column was added, but before
+migrations existed, are stamped at the baseline and already have some of
+this, so each step checks first.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:01
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_calculations_user_created_id": ["user_id", "created_at", "id"],
+    "ix_calculations_user_type_created_id": ["user_id", "type", "created_at", "id"],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "user_id" not in {column["name"] for column in inspector.get_columns("calculations")}:
+        # rows imported before ownership existed stay ownerless
+        with op.batch_alter_table("calculations") as batch:
+            batch.add_column(sa.Column(
+                "user_id", sa.Integer,
+                sa.ForeignKey("users.id", name="calculations_user_id_fkey", ondelete="CASCADE"),
+                nullable=True,
+            ))
+    existing = {index["name"] for index in inspector.get_indexes("calculations")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "calculations", columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="calculations")
+    with op.batch_alter_table("calculations") as batch:
+        batch.drop_column("user_id")
@@ -0,0 +1,25 @@
+"""calculations.updated_at, which versions single rows for ETags
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:02
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("calculations")}
+    if "updated_at" not in columns:
+        # NULL until a row is first updated
+        op.add_column("calculations", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("calculations") as batch:
+        batch.drop_column("updated_at")
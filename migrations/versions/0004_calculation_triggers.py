@@ -0,0 +1,31 @@
+"""current rollup and version trigger definitions
+
+Startups no longer reinstall the triggers, so a database created before this
+revision gets today's definitions (the SQLite deferral flag among them) here.
+A later change to the definitions needs its own revision doing the same.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:03
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from app.models.calculation_stats import install_triggers
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    # otherwise create_all() creates them after the migrations and installs
+    # the triggers along with them
+    if {"calculation_stats", "calculation_versions"} <= tables:
+        install_triggers(op.get_bind())
+
+
+def downgrade() -> None:
+    pass  # the previous definitions are not kept
@@ -0,0 +1,47 @@
+"""Production launcher: N uvicorn workers under a supervisor.
+
+    python serve.py --host 0.0.0.0 --port 8000            # one worker per CPU
+    python serve.py --workers 8 --graceful-timeout 60
+
+Schema setup runs once in the supervisor before any worker starts. Send
+SIGHUP for a rolling restart (e.g. after a deploy) and SIGTERM to drain and
+stop; ``GET /health`` on any worker reports every worker's heartbeat and
+load. See app/supervisor.py.
+"""
+import argparse
+import logging
+import os
+import sys
+
+import app.security  # noqa: F401  refuses to start without SECRET_KEY, before any worker spawns
+from app.supervisor import WORKER_GRACEFUL_TIMEOUT, WORKER_TIMEOUT, Supervisor
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1,
+        help="worker processes (default: WEB_CONCURRENCY, else the CPU count)",
+    )
+    parser.add_argument("--timeout", type=float, default=WORKER_TIMEOUT, help="seconds without a heartbeat before a worker is replaced")
+    parser.add_argument("--graceful-timeout", type=float, default=WORKER_GRACEFUL_TIMEOUT, help="seconds a draining worker gets to finish requests")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    supervisor = Supervisor(
+        "main:app",
+        workers=args.workers,
+        host=args.host,
+        port=args.port,
+        timeout=args.timeout,
+        graceful_timeout=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+    return supervisor.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,8 +38,30 @@ def page(browser, fastapi_server):
     yield pg
     pg.close()
 
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    """Memoized results must not leak between tests that patch the operations."""
+    from app.factory.calculation_factory import result_cache
+    result_cache.clear()
+    yield
+
 @pytest.fixture
 def client():
     # TestClient will trigger startup event -> init_db on in-memory DB
     with TestClient(app) as c:
         yield c
+
+@pytest.fixture
+def register_and_login(client):
+    """Register ``name`` (password ``password123``) and return its auth headers."""
+    def register(name):
+        client.post(
+            "/users/register",
+            json={"username": name, "email": f"{name}@example.com", "password": "password123"},
+        )
+        r = client.post(
+            "/users/login",
+            json={"username_or_email": name, "password": "password123"},
+        )
+        return {"Authorization": f"Bearer {r.json()['token']}"}
+    return register
@@ -0,0 +1,57 @@
+# tests/integration/test_calculation_batch.py
+
+
+def test_batch_creates_rows_and_reports_errors(client, register_and_login):
+    headers = register_and_login("batcher")
+    items = [
+        {"a": 2, "b": 3, "type": "Add"},
+        {"a": 1, "b": 0, "type": "Divide"},
+        {"a": 6, "b": 4, "type": "Subtract"},
+        {"a": 6, "b": 4, "type": "Multiply"},
+        {"a": 6, "b": 4, "type": "Divide"},
+    ]
+    r = client.post("/calculations/batch", json={"items": items}, headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["created"] == 4
+    assert body["failed"] == 1
+    assert [i["result"] for i in body["items"]] == [5, None, 2, 24, 1.5]
+    assert body["items"][1]["error"] == "Cannot divide by zero!"
+    assert body["items"][1]["id"] is None
+
+    stored = client.get("/calculations", headers=headers).json()
+    assert [c["id"] for c in stored] == [i["id"] for i in body["items"] if i["id"]]
+    assert [c["result"] for c in stored] == [5, 2, 24, 1.5]
+
+
+def test_batch_reports_overflow_without_storing_it(client, register_and_login):
+    headers = register_and_login("overflower")
+    items = [
+        {"a": 1e308, "b": 10, "type": "Multiply"},
+        {"a": 1e308, "b": 1e308, "type": "Add"},
+        {"a": 2, "b": 3, "type": "Add"},
+    ]
+    r = client.post("/calculations/batch", json={"items": items}, headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert (body["created"], body["failed"]) == (1, 2)
+    assert [i["error"] for i in body["items"]] == ["Result is not a finite number"] * 2 + [None]
+    assert [i["id"] is None for i in body["items"]] == [True, True, False]
+
+    # nothing non-finite went in, so reads keep working
+    r = client.get("/calculations", headers=headers)
+    assert r.status_code == 200
+    assert [c["result"] for c in r.json()] == [5]
+    assert client.get("/calculations/stats", headers=headers).status_code == 200
+
+
+def test_batch_rejects_empty_and_oversized(client, register_and_login):
+    headers = register_and_login("batchlimits")
+    r = client.post("/calculations/batch", json={"items": []}, headers=headers)
+    assert r.status_code == 400
+
+    from app.schemas.calculation import BATCH_MAX_ITEMS
+
+    items = [{"a": 1, "b": 1, "type": "Add"}] * (BATCH_MAX_ITEMS + 1)
+    r = client.post("/calculations/batch", json={"items": items}, headers=headers)
+    assert r.status_code == 400
@@ -3,21 +3,8 @@ import pytest
 from app.models.calculation import CalculationType
 
 
-def register_and_login(client):
-    client.post(
-        "/users/register",
-        json={"username": "u1", "email": "u1@example.com", "password": "password123"},
-    )
-    r = client.post(
-        "/users/login",
-        json={"username_or_email": "u1", "password": "password123"},
-    )
-    token = r.json()["token"]
-    return {"Authorization": f"Bearer {token}"}
-
-
-def test_calculation_crud(client):
-    headers = register_and_login(client)
+def test_calculation_crud(client, register_and_login):
+    headers = register_and_login("u1")
 
     # Create
     r = client.post(
@@ -58,8 +45,8 @@ def test_calculation_crud(client):
     assert r.status_code == 404
 
 
-def test_divide_by_zero_error(client):
-    headers = register_and_login(client)
+def test_divide_by_zero_error(client, register_and_login):
+    headers = register_and_login("u1")
     r = client.post(
         "/calculations",
         json={"a": 1, "b": 0, "type": "Divide"},
@@ -0,0 +1,72 @@
+# tests/integration/test_calculation_etags.py
+import pytest
+
+import main
+
+
+@pytest.fixture(params=[False, True], ids=["models", "fast"])
+def fast_responses(request, monkeypatch):
+    monkeypatch.setattr(main, "FAST_RESPONSES", request.param)
+
+
+def test_get_calculation_revalidates(client, register_and_login, fast_responses):
+    headers = register_and_login("etagget")
+    calc_id = client.post("/calculations", json={"a": 1, "b": 2, "type": "Add"}, headers=headers).json()["id"]
+
+    r = client.get(f"/calculations/{calc_id}", headers=headers)
+    etag = r.headers["ETag"]
+    assert r.headers["Cache-Control"] == "private, no-cache"
+
+    r = client.get(f"/calculations/{calc_id}", headers={**headers, "If-None-Match": f'"stale", W/{etag}'})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["ETag"] == etag
+
+    r = client.put(f"/calculations/{calc_id}", json={"a": 5, "b": 2, "type": "Add"}, headers=headers)
+    new_etag = r.headers["ETag"]
+    assert new_etag != etag
+    assert r.headers["Cache-Control"] == "private, no-cache"
+    r = client.get(f"/calculations/{calc_id}", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["result"] == 7
+    assert r.headers["ETag"] == new_etag
+
+    # the tag from the PUT revalidates straight away
+    r = client.get(f"/calculations/{calc_id}", headers={**headers, "If-None-Match": new_etag})
+    assert r.status_code == 304
+    assert r.headers["ETag"] != etag
+
+    # a tag never reveals another user's row
+    other = register_and_login("etagother")
+    r = client.get(f"/calculations/{calc_id}", headers={**other, "If-None-Match": "*"})
+    assert r.status_code == 404
+
+
+def test_browse_revalidates_until_the_user_writes(client, register_and_login, fast_responses):
+    headers = register_and_login("etaglist")
+    other = register_and_login("etaglistother")
+    calc_id = client.post("/calculations", json={"a": 1, "b": 2, "type": "Add"}, headers=headers).json()["id"]
+
+    etag = client.get("/calculations", headers=headers).headers["ETag"]
+    assert client.get("/calculations", headers={**headers, "If-None-Match": etag}).status_code == 304
+    # other pages, filters and users get their own tags
+    assert client.get("/calculations?limit=1", headers={**headers, "If-None-Match": etag}).status_code == 200
+    assert client.get("/calculations", headers={**other, "If-None-Match": etag}).status_code == 200
+
+    # another user's writes leave this listing's tag alone
+    client.post("/calculations", json={"a": 1, "b": 1, "type": "Add"}, headers=other)
+    assert client.get("/calculations", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    tags = {etag}
+    for change in (
+        lambda: client.post("/calculations/batch", json={"items": [{"a": 2, "b": 2, "type": "Add"}]}, headers=headers),
+        lambda: client.put(f"/calculations/{calc_id}", json={"a": 3, "b": 2, "type": "Add"}, headers=headers),
+        lambda: client.delete(f"/calculations/{calc_id}", headers=headers),
+    ):
+        change()
+        r = client.get("/calculations", headers={**headers, "If-None-Match": etag})
+        assert r.status_code == 200
+        etag = r.headers["ETag"]
+        assert etag not in tags
+        tags.add(etag)
+
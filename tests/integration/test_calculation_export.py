@@ -0,0 +1,41 @@
+# tests/integration/test_calculation_export.py
+import csv
+import io
+import json
+
+
+def test_export_ndjson(client, register_and_login, monkeypatch):
+    import main
+
+    # force several partitions so chunk boundaries are exercised
+    monkeypatch.setattr(main, "EXPORT_CHUNK_SIZE", 2)
+    headers = register_and_login("exporter")
+    other = register_and_login("bystander")
+    client.post("/calculations", json={"a": 9, "b": 9, "type": "Add"}, headers=other)
+    for i in range(5):
+        client.post("/calculations", json={"a": i, "b": 2, "type": "Multiply"}, headers=headers)
+
+    r = client.get("/calculations/export", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["result"] for row in rows] == [0, 2, 4, 6, 8]
+    assert rows[0]["type"] == "Multiply"
+    assert set(rows[0]) == {"id", "a", "b", "type", "result", "created_at"}
+
+
+def test_export_csv(client, register_and_login):
+    headers = register_and_login("csvexporter")
+    client.post("/calculations", json={"a": 1, "b": 4, "type": "Divide"}, headers=headers)
+
+    r = client.get("/calculations/export", params={"format": "csv"}, headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 1
+    assert rows[0]["type"] == "Divide"
+    assert float(rows[0]["result"]) == 0.25
+
+
+def test_export_requires_auth(client):
+    assert client.get("/calculations/export").status_code == 401
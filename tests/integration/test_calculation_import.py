@@ -0,0 +1,53 @@
+# tests/integration/test_calculation_import.py
+import json
+
+
+def events(r):
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def test_import_csv_streams_progress_and_rejects(client, register_and_login, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "IMPORT_CHUNK_SIZE", 2)
+    headers = register_and_login("csvimporter")
+    body = "a,b,type\n1,2,Add\n4,0,Divide\n3,3,Multiply\n"
+    r = client.post(
+        "/calculations/import", content=body, headers={**headers, "Content-Type": "text/csv"}
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = events(r)
+    assert lines[0] == {"event": "reject", "line": 3, "error": "Cannot divide by zero!"}
+    assert [line["rows"] for line in lines if line["event"] == "progress"] == [2, 3]
+    assert lines[-1]["event"] == "done"
+    assert (lines[-1]["imported"], lines[-1]["rejected"]) == (2, 1)
+
+    listed = client.get("/calculations", headers=headers).json()
+    assert sorted(c["result"] for c in listed) == [3, 9]
+    stats = client.get("/calculations/stats", params={"bucket": "all"}, headers=headers).json()
+    assert {(s["type"], s["count"]) for s in stats} == {("Add", 1), ("Multiply", 1)}
+
+
+def test_import_ndjson_round_trips_an_export(client, register_and_login):
+    source = register_and_login("ndjsonsource")
+    target = register_and_login("ndjsontarget")
+    for a in (1, 2):
+        client.post("/calculations", json={"a": a, "b": 5, "type": "Subtract"}, headers=source)
+    exported = client.get("/calculations/export", headers=source).text
+
+    r = client.post("/calculations/import?format=ndjson", content=exported, headers=target)
+    assert events(r)[-1]["imported"] == 2
+    imported = client.get("/calculations", headers=target).json()
+    original = client.get("/calculations", headers=source).json()
+    assert {(c["result"], c["created_at"]) for c in imported} == {(c["result"], c["created_at"]) for c in original}
+
+
+def test_import_refuses_unknown_format_and_bad_header(client, register_and_login):
+    headers = register_and_login("badimporter")
+    r = client.post("/calculations/import", content="a,b\n", headers={**headers, "Content-Type": "text/plain"})
+    assert r.status_code == 400
+    r = client.post("/calculations/import?format=csv", content="a,b\n1,2\n", headers=headers)
+    assert r.status_code == 400
+    assert r.json() == {"error": "CSV header is missing column(s): type"}
+    assert client.post("/calculations/import?format=csv", content="a,b,type\n").status_code == 401
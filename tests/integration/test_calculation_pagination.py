@@ -0,0 +1,61 @@
+# tests/integration/test_calculation_pagination.py
+from datetime import datetime, timedelta, timezone
+
+
+def create(client, headers, a, b, type):
+    r = client.post("/calculations", json={"a": a, "b": b, "type": type}, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def test_keyset_pages_cover_all_rows_in_order(client, register_and_login):
+    headers = register_and_login("pager")
+    ids = [create(client, headers, i, 1, "Add") for i in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/calculations", params=params, headers=headers)
+        assert r.status_code == 200
+        seen.extend(c["id"] for c in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ids
+
+
+def test_filters_by_type_and_date(client, register_and_login):
+    headers = register_and_login("filterer")
+    add_id = create(client, headers, 1, 2, "Add")
+    mul_id = create(client, headers, 3, 4, "Multiply")
+
+    r = client.get("/calculations", params={"type": "Multiply"}, headers=headers)
+    assert [c["id"] for c in r.json()] == [mul_id]
+
+    future = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    r = client.get("/calculations", params={"created_after": future}, headers=headers)
+    assert r.json() == []
+    r = client.get("/calculations", params={"created_before": future}, headers=headers)
+    assert [c["id"] for c in r.json()] == [add_id, mul_id]
+
+
+def test_rows_are_scoped_to_owner(client, register_and_login):
+    owner = register_and_login("owner")
+    other = register_and_login("intruder")
+    calc_id = create(client, owner, 1, 1, "Add")
+
+    assert client.get("/calculations", headers=other).json() == []
+    assert client.get(f"/calculations/{calc_id}", headers=other).status_code == 404
+    r = client.put(f"/calculations/{calc_id}", json={"a": 1, "b": 1, "type": "Add"}, headers=other)
+    assert r.status_code == 404
+    assert client.delete(f"/calculations/{calc_id}", headers=other).status_code == 404
+    assert client.get(f"/calculations/{calc_id}", headers=owner).status_code == 200
+
+
+def test_invalid_cursor(client, register_and_login):
+    headers = register_and_login("badcursor")
+    r = client.get("/calculations", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert r.status_code == 400
+    assert r.json() == {"error": "Invalid cursor"}
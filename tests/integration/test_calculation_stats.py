@@ -0,0 +1,92 @@
+# tests/integration/test_calculation_stats.py
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.db import SessionLocal
+from app.models.calculation import Calculation
+from app.models.calculation_stats import CalculationStat
+
+
+def stats(client, headers, **params):
+    r = client.get("/calculations/stats", params=params, headers=headers)
+    assert r.status_code == 200, r.text
+    return {row["type"]: row for row in r.json()}
+
+
+def test_stats_follow_every_write_path(client, register_and_login):
+    headers = register_and_login("statsuser")
+    other = register_and_login("statsother")
+    client.post("/calculations", json={"a": 100, "b": 1, "type": "Add"}, headers=other)
+
+    ids = [
+        client.post("/calculations", json={"a": a, "b": 1, "type": "Add"}, headers=headers).json()["id"]
+        for a in (1, 5, 9)
+    ]
+    client.post(
+        "/calculations/batch",
+        json={"items": [{"a": 4, "b": 2, "type": "Multiply"}, {"a": 1, "b": 0, "type": "Divide"}]},
+        headers=headers,
+    )
+
+    rows = stats(client, headers, bucket="all")
+    assert set(rows) == {"Add", "Multiply"}
+    assert rows["Add"] == {"bucket": None, "type": "Add", "count": 3, "sum": 18, "min": 2, "max": 10, "mean": 6}
+    assert rows["Multiply"]["count"] == 1
+
+    # dropping the current max recomputes it from the remaining rows
+    assert client.delete(f"/calculations/{ids[2]}", headers=headers).status_code == 204
+    assert stats(client, headers, bucket="all")["Add"] == {
+        "bucket": None, "type": "Add", "count": 2, "sum": 8, "min": 2, "max": 6, "mean": 4,
+    }
+
+    # an update moves the row between types
+    client.put(f"/calculations/{ids[0]}", json={"a": 3, "b": 3, "type": "Multiply"}, headers=headers)
+    rows = stats(client, headers, bucket="all")
+    assert (rows["Add"]["count"], rows["Add"]["min"], rows["Add"]["max"]) == (1, 6, 6)
+    assert (rows["Multiply"]["count"], rows["Multiply"]["sum"], rows["Multiply"]["min"]) == (2, 17, 8)
+
+    # removing the last row of a bucket removes the bucket
+    client.delete(f"/calculations/{ids[1]}", headers=headers)
+    assert set(stats(client, headers, bucket="all")) == {"Multiply"}
+    assert stats(client, headers, type="Multiply", bucket="all")["Multiply"]["count"] == 2
+    assert stats(client, headers, type="Add") == {}
+
+
+def test_stats_buckets_and_range(client, register_and_login):
+    headers = register_and_login("statsbuckets")
+    ids = [
+        client.post("/calculations", json={"a": a, "b": 0, "type": "Add"}, headers=headers).json()["id"]
+        for a in (1, 2, 3)
+    ]
+    base = datetime(2024, 3, 10, 14, 30, tzinfo=timezone.utc)
+    with SessionLocal() as db:
+        for calc_id, moved in zip(ids, (base, base + timedelta(hours=1), base + timedelta(days=1))):
+            db.execute(update(Calculation).where(Calculation.id == calc_id).values(created_at=moved))
+        db.commit()
+
+    r = client.get("/calculations/stats", params={"bucket": "hour"}, headers=headers)
+    assert [(row["bucket"][:13], row["count"]) for row in r.json()] == [
+        ("2024-03-10T14", 1), ("2024-03-10T15", 1), ("2024-03-11T14", 1),
+    ]
+    r = client.get("/calculations/stats", headers=headers)
+    assert [(row["bucket"][:10], row["sum"]) for row in r.json()] == [("2024-03-10", 3), ("2024-03-11", 3)]
+    r = client.get("/calculations/stats", params={"bucket": "month"}, headers=headers)
+    assert [(row["bucket"][:10], row["count"], row["mean"]) for row in r.json()] == [("2024-03-01", 3, 2)]
+
+    # hour precision: created_after rounds down to its hour
+    r = client.get(
+        "/calculations/stats",
+        params={"bucket": "all", "created_after": "2024-03-10T15:45:00Z", "created_before": "2024-03-11T00:00:00Z"},
+        headers=headers,
+    )
+    assert [(row["count"], row["sum"]) for row in r.json()] == [(1, 2)]
+
+    with SessionLocal() as db:
+        assert db.query(CalculationStat).filter(CalculationStat.bucket < datetime(2024, 1, 1)).count() == 0
+
+
+def test_stats_requires_auth(client, register_and_login):
+    assert client.get("/calculations/stats").status_code == 401
+    headers = register_and_login("statsbad")
+    assert client.get("/calculations/stats", params={"bucket": "week"}, headers=headers).status_code == 400
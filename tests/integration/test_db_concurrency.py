@@ -0,0 +1,61 @@
+# tests/integration/test_db_concurrency.py
+import time
+
+import anyio
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app.db import engine, init_db
+from main import app
+
+QUERY_LATENCY = 0.05
+CONCURRENCY = 20
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def slow_queries():
+    """Make every statement block its thread, like a round trip to a remote DB."""
+    def _sleep(*args):
+        time.sleep(QUERY_LATENCY)
+
+    event.listen(engine, "before_cursor_execute", _sleep)
+    yield
+    event.remove(engine, "before_cursor_execute", _sleep)
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_overlap_db_io(slow_queries):
+    init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post(
+            "/users/register",
+            json={"username": "concurrent", "email": "concurrent@x.com", "password": "password123"},
+        )
+        r = await ac.post(
+            "/users/login",
+            json={"username_or_email": "concurrent", "password": "password123"},
+        )
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+        statuses = []
+
+        async def fetch():
+            r = await ac.get("/calculations", headers=headers)
+            statuses.append(r.status_code)
+
+        start = time.perf_counter()
+        async with anyio.create_task_group() as tg:
+            for _ in range(CONCURRENCY):
+                tg.start_soon(fetch)
+        elapsed = time.perf_counter() - start
+
+    assert statuses == [200] * CONCURRENCY
+    # each request runs at least one blocking statement; run serially on the
+    # event loop that would take CONCURRENCY * QUERY_LATENCY seconds
+    assert elapsed < CONCURRENCY * QUERY_LATENCY / 2
@@ -0,0 +1,36 @@
+# tests/integration/test_evaluate_endpoint.py
+
+
+def test_evaluate_single(client):
+    r = client.post("/evaluate", json={"expression": "2*x^2 + y", "variables": {"x": 3, "y": 1}})
+    assert r.status_code == 200
+    assert r.json() == {"result": 19}
+
+
+def test_evaluate_bindings(client):
+    r = client.post(
+        "/evaluate",
+        json={"expression": "a / b", "bindings": [{"a": 1, "b": 4}, {"a": 1, "b": 0}, {"a": 9, "b": 3}]},
+    )
+    assert r.status_code == 200
+    assert r.json() == {"results": [0.25, None, 3]}
+
+
+def test_evaluate_errors(client):
+    r = client.post("/evaluate", json={"expression": "1 / 0"})
+    assert r.status_code == 400
+    assert r.json() == {"error": "Expression result is not a finite number"}
+
+    r = client.post("/evaluate", json={"expression": "__import__('os')"})
+    assert r.status_code == 400
+
+    r = client.post("/evaluate", json={"expression": "1" * 400})
+    assert r.status_code == 400
+    assert r.json() == {"error": "Literal is too large"}
+
+    r = client.post("/evaluate", json={"expression": "x + 1", "bindings": [{"x": 1}, {"y": 2}]})
+    assert r.status_code == 400
+    assert r.json() == {"error": "Missing variables: x"}
+
+    r = client.post("/evaluate", json={"expression": "x", "variables": {"x": 1}, "bindings": [{"x": 1}]})
+    assert r.status_code == 400
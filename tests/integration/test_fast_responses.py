@@ -0,0 +1,42 @@
+# tests/integration/test_fast_responses.py
+import pytest
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    import main
+
+    def toggle(enabled):
+        monkeypatch.setattr(main, "FAST_RESPONSES", enabled)
+
+    return toggle
+
+
+def test_fast_mode_matches_validated_output(client, register_and_login, fast):
+    headers = register_and_login("fastuser")
+    created = client.post("/calculations", json={"a": 7, "b": 2, "type": "Divide"}, headers=headers).json()
+    client.post("/calculations", json={"a": 1, "b": 2, "type": "Add"}, headers=headers)
+
+    requests = [
+        ("post", "/multiply", {"json": {"a": 6, "b": 7}}),
+        ("get", "/calculations", {"params": {"limit": 1}}),
+        ("get", f"/calculations/{created['id']}", {}),
+    ]
+    for method, url, kwargs in requests:
+        fast(False)
+        slow = getattr(client, method)(url, headers=headers, **kwargs)
+        fast(True)
+        quick = getattr(client, method)(url, headers=headers, **kwargs)
+        assert quick.status_code == slow.status_code == 200
+        assert quick.json() == slow.json()
+        assert quick.headers.get("X-Next-Cursor") == slow.headers.get("X-Next-Cursor")
+
+
+def test_fast_mode_write_endpoints(client, register_and_login, fast):
+    fast(True)
+    headers = register_and_login("fastwriter")
+    r = client.post("/calculations", json={"a": 3, "b": 4, "type": "Multiply"}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["result"] == 12
+    r = client.put(f"/calculations/{r.json()['id']}", json={"a": 3, "b": 4, "type": "Add"}, headers=headers)
+    assert r.json()["result"] == 7
@@ -0,0 +1,28 @@
+# tests/integration/test_group_commit.py
+import pytest
+
+import main
+from app.db import GroupCommitter, SessionLocal
+
+
+@pytest.fixture
+def group_commit(monkeypatch):
+    committer = GroupCommitter(SessionLocal, enabled=True)
+    monkeypatch.setattr(main, "group_commit", committer)
+    yield committer
+    committer.close()
+
+
+def test_register_and_create_through_group_commit(client, group_commit):
+    user = {"username": "grouped", "email": "grouped@example.com", "password": "password123"}
+    assert client.post("/users/register", json=user).status_code == 200
+    r = client.post("/users/register", json=user)
+    assert r.status_code == 400
+    assert r.json() == {"error": "Username or email already registered"}
+
+    token = client.post("/users/login", json={"username_or_email": "grouped", "password": "password123"}).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    created = client.post("/calculations", json={"a": 2, "b": 5, "type": "Multiply"}, headers=headers).json()
+    assert created["result"] == 10
+    assert client.get(f"/calculations/{created['id']}", headers=headers).json()["result"] == 10
+    assert group_commit.stats()["writes"] == 2
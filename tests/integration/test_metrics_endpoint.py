@@ -0,0 +1,40 @@
+# tests/integration/test_metrics_endpoint.py
+from app.metrics import db_queries_total, http_requests_total, password_hash_duration_seconds
+
+
+def test_metrics_endpoint_exposes_text_format(client):
+    client.post("/add", json={"a": 1, "b": 2})
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert "# TYPE http_requests_total counter" in body
+    assert 'http_requests_total{method="POST",route="/add",status="200"}' in body
+    assert "http_request_duration_seconds_bucket" in body
+    assert "hash_pool_workers" in body
+    assert "result_cache_hits" in body
+
+
+def test_requests_are_labelled_by_route_template(client):
+    before = http_requests_total.value(("GET", "/calculations/{calc_id}", "401"))
+    client.get("/calculations/1")
+    client.get("/calculations/2")
+    assert http_requests_total.value(("GET", "/calculations/{calc_id}", "401")) == before + 2
+
+    before = http_requests_total.value(("GET", "unmatched", "404"))
+    client.get("/no/such/path")
+    assert http_requests_total.value(("GET", "unmatched", "404")) == before + 1
+
+
+def test_db_queries_and_hashing_are_recorded(client):
+    queries_before = db_queries_total.value()
+    hashes_before = password_hash_duration_seconds.count()
+
+    client.post(
+        "/users/register",
+        json={"username": "metricsuser", "email": "metricsuser@example.com", "password": "password123"},
+    )
+
+    assert db_queries_total.value() > queries_before
+    assert password_hash_duration_seconds.count() == hashes_before + 1
@@ -0,0 +1,114 @@
+# tests/integration/test_migrations.py
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+from app.db import BASE_DIR, SCHEMA_REVISION, Base, upgrade_schema
+
+# calculations as the first release created it, and as create_all() built it
+# once calculations had owners but before they had updated_at
+BASELINE = """
+CREATE TABLE calculations (
+    id INTEGER NOT NULL PRIMARY KEY, a FLOAT NOT NULL, b FLOAT NOT NULL,
+    type VARCHAR(8) NOT NULL, result FLOAT NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+OWNED = """
+CREATE TABLE calculations (
+    id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER REFERENCES users (id) ON DELETE CASCADE,
+    a FLOAT NOT NULL, b FLOAT NOT NULL, type VARCHAR(8) NOT NULL, result FLOAT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    yield engine
+    engine.dispose()
+
+
+def columns(engine):
+    return {column["name"] for column in inspect(engine).get_columns("calculations")}
+
+
+def revision(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar_one()
+
+
+def test_schema_revision_is_the_latest_migration():
+    # upgrade_schema trusts SCHEMA_REVISION to skip alembic on up-to-date databases
+    assert ScriptDirectory.from_config(Config(str(BASE_DIR / "alembic.ini"))).get_current_head() == SCHEMA_REVISION
+
+
+def test_new_database_is_created_and_stamped(engine):
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+    assert set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+    assert revision(engine) == SCHEMA_REVISION
+
+
+@pytest.mark.parametrize("schema, owner", [(BASELINE, None), (OWNED, 1)], ids=["baseline", "owned"])
+def test_existing_database_is_migrated(engine, schema, owner):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, username VARCHAR NOT NULL, "
+            "email VARCHAR NOT NULL, password_hash VARCHAR NOT NULL, created_at DATETIME)"
+        )
+        connection.exec_driver_sql("INSERT INTO users VALUES (1, 'old', 'old@example.com', 'x', NULL)")
+        connection.exec_driver_sql(schema)
+        if owner is None:
+            connection.exec_driver_sql("INSERT INTO calculations (a, b, type, result) VALUES (1, 2, 'Add', 3)")
+        else:
+            connection.exec_driver_sql(
+                "INSERT INTO calculations (user_id, a, b, type, result) VALUES (1, 1, 2, 'Add', 3)"
+            )
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+
+    assert {"user_id", "updated_at"} <= columns(engine)
+    assert {"ix_calculations_user_created_id", "ix_calculations_user_type_created_id"} <= {
+        index["name"] for index in inspect(engine).get_indexes("calculations")
+    }
+    assert revision(engine) == SCHEMA_REVISION
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT user_id, a FROM calculations")).all() == [(owner, 1.0)]
+        # the rollup and the ETag versions start from the existing history
+        versions = connection.execute(text("SELECT user_id, version FROM calculation_versions")).all()
+        assert versions == ([] if owner is None else [(1, 1)])
+        assert connection.execute(text("SELECT count FROM calculation_stats")).all() == (
+            [] if owner is None else [(1,)]
+        )
+
+    # a second startup has nothing left to do
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+    assert revision(engine) == SCHEMA_REVISION
+
+
+def test_startup_at_the_current_revision_runs_no_ddl(engine):
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+    assert not [s for s in statements if s.split()[0].upper() not in ("SELECT", "PRAGMA")], statements
+
+
+def test_trigger_definitions_are_replaced_by_a_migration(engine):
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+        # a database whose triggers predate the current definitions
+        connection.exec_driver_sql("DROP TRIGGER calculation_stats_insert")
+        connection.exec_driver_sql("UPDATE alembic_version SET version_num = '0003'")
+    with engine.begin() as connection:
+        upgrade_schema(connection)
+    assert revision(engine) == SCHEMA_REVISION
+    with engine.connect() as connection:
+        triggers = connection.execute(text("SELECT count(*) FROM sqlite_master WHERE type = 'trigger'")).scalar_one()
+    assert triggers == 8
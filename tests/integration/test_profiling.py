@@ -0,0 +1,55 @@
+# tests/integration/test_profiling.py
+import pytest
+
+import app.profiling as profiling
+
+
+def phases(header):
+    return {entry.split(";")[0].strip() for entry in header.split(",")}
+
+
+@pytest.fixture
+def allow_header(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ALLOW_HEADER", True)
+
+
+def test_header_ignored_unless_allowed(client):
+    r = client.post("/add", json={"a": 1, "b": 2}, headers={"X-Profile": "timing"})
+    assert r.status_code == 200
+    assert "server-timing" not in r.headers
+
+
+def test_server_timing_breaks_out_phases(client, register_and_login, allow_header):
+    headers = register_and_login("profileuser")
+    headers["X-Profile"] = "timing"
+
+    r = client.post("/calculations", json={"a": 1, "b": 2, "type": "Add"}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["result"] == 3
+    assert {"resolve", "get_db", "auth", "handler", "db", "render", "total"} <= phases(r.headers["server-timing"])
+
+
+def test_hashing_time_is_attributed(client, allow_header):
+    r = client.post(
+        "/users/register",
+        json={"username": "hashprofile", "email": "hashprofile@example.com", "password": "password123"},
+        headers={"X-Profile": "timing"},
+    )
+    assert r.status_code == 200
+    assert "hash" in phases(r.headers["server-timing"])
+
+
+def test_speedscope_download(client, allow_header):
+    r = client.post("/add", json={"a": 1, "b": 2}, headers={"X-Profile": "speedscope"})
+    assert r.status_code == 200
+    assert r.headers["x-profiled-status"] == "200"
+    assert "attachment" in r.headers["content-disposition"]
+    document = r.json()
+    assert document["profiles"][0]["type"] == "sampled"
+    assert len(document["profiles"][0]["samples"]) == len(document["profiles"][0]["weights"])
+
+
+def test_sample_rate_profiles_without_header(client, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    r = client.post("/multiply", json={"a": 2, "b": 3})
+    assert "handler" in phases(r.headers["server-timing"])
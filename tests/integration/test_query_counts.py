@@ -0,0 +1,74 @@
+# tests/integration/test_query_counts.py
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.db import engine
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def test_register_is_one_lookup_and_one_write(client):
+    with count_statements() as statements:
+        r = client.post(
+            "/users/register",
+            json={"username": "counted", "email": "counted@example.com", "password": "password123"},
+        )
+    assert r.status_code == 200
+    assert r.json()["created_at"]
+    assert [s.split()[0] for s in statements] == ["SELECT", "INSERT"], statements
+
+    with count_statements() as statements:
+        r = client.post(
+            "/users/register",
+            json={"username": "counted", "email": "other@example.com", "password": "password123"},
+        )
+    # refused by the lookup, before hashing the password
+    assert r.status_code == 400
+    assert [s.split()[0] for s in statements] == ["SELECT"], statements
+
+
+def test_calculation_writes_are_one_statement_each(client):
+    client.post(
+        "/users/register",
+        json={"username": "writer", "email": "writer@example.com", "password": "password123"},
+    )
+    token = client.post(
+        "/users/login", json={"username_or_email": "writer", "password": "password123"}
+    ).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/calculations", headers=headers)  # warm the principal cache
+
+    with count_statements() as statements:
+        r = client.post("/calculations", json={"a": 1, "b": 2, "type": "Add"}, headers=headers)
+    assert r.status_code == 200
+    calc = r.json()
+    assert calc["id"] and calc["created_at"]
+    assert len(statements) == 1, statements
+
+    with count_statements() as statements:
+        r = client.put(f"/calculations/{calc['id']}", json={"a": 4, "b": 2, "type": "Divide"}, headers=headers)
+    assert r.json()["result"] == 2
+    assert r.json()["created_at"] == calc["created_at"]
+    assert len(statements) == 1, statements
+
+    with count_statements() as statements:
+        r = client.put("/calculations/999999", json={"a": 4, "b": 2, "type": "Add"}, headers=headers)
+    assert r.status_code == 404
+    assert len(statements) == 1, statements
+
+    with count_statements() as statements:
+        assert client.delete(f"/calculations/{calc['id']}", headers=headers).status_code == 204
+    assert len(statements) == 1, statements
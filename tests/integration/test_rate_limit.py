@@ -0,0 +1,60 @@
+# tests/integration/test_rate_limit.py
+from types import SimpleNamespace
+
+import pytest
+
+from app.rate_limit import Limit, MemoryBackend, parse_rules
+from main import rate_limiter
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Turn limiting on for one test, with fresh budgets."""
+    monkeypatch.setattr(rate_limiter, "backend", MemoryBackend())
+
+    def configure(routes="", default=None, **shedding):
+        monkeypatch.setattr(rate_limiter, "rules", parse_rules(routes))
+        monkeypatch.setattr(rate_limiter, "default", default)
+        for name, value in shedding.items():
+            monkeypatch.setattr(rate_limiter, name, value)
+
+    return configure
+
+
+def test_route_budget_limits_login_by_address(client, register_and_login, limits):
+    register_and_login("rluser")
+    limits("POST /users/login=2/m")
+    login = {"username_or_email": "rluser", "password": "password123"}
+    assert [client.post("/users/login", json=login).status_code for _ in range(3)] == [200, 200, 429]
+
+    r = client.post("/users/login", json=login)
+    assert r.status_code == 429
+    assert r.json() == {"error": "Too many requests"}
+    assert 1 <= int(r.headers["Retry-After"]) <= 60
+    # other routes have no budget
+    assert client.get("/").status_code == 200
+
+
+def test_default_budget_is_per_user(client, register_and_login, limits):
+    alice = register_and_login("rlalice")
+    bob = register_and_login("rlbob")
+    limits(default=Limit(2, 60.0))
+    assert [client.get("/calculations", headers=alice).status_code for _ in range(3)] == [200, 200, 429]
+    assert client.get("/calculations", headers=bob).status_code == 200
+    assert client.get("/health").status_code == 200
+
+    metrics = client.get("/metrics").text
+    assert "rate_limit_limited_total " in metrics
+    assert 'status="429"' in metrics
+
+
+def test_overload_sheds_with_503(client, register_and_login, limits):
+    headers = register_and_login("rlshed")
+    limits(pool_wait=SimpleNamespace(wait=lambda: 2.0), shed_pool_wait=0.5)
+    r = client.get("/calculations", headers=headers)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+    assert client.get("/health").status_code == 200
+
+    limits(pool_wait=SimpleNamespace(wait=lambda: 0.0), shed_pool_wait=0.5)
+    assert client.get("/calculations", headers=headers).status_code == 200
@@ -0,0 +1,127 @@
+# tests/integration/test_supervisor.py
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.db import SCHEMA_REVISION
+
+REPO = Path(__file__).resolve().parents[2]
+INIT = "from app.db import init_db; init_db()"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def env_for(tmp_path, **extra):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}", "LOG_MODE": "off",
+           "SECRET_KEY": "supervisor-test-secret", **extra}
+    env.pop("TESTING", None)
+    return env
+
+
+def test_concurrent_schema_setup_is_serialised(tmp_path):
+    processes = [
+        subprocess.Popen([sys.executable, "-c", INIT], cwd=REPO, env=env_for(tmp_path),
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        for _ in range(4)
+    ]
+    errors = [p.communicate(timeout=60)[1].decode() for p in processes]
+    assert [p.returncode for p in processes] == [0, 0, 0, 0], errors
+
+
+def test_serve_rolling_restart_keeps_workers_serving(tmp_path):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", "2", "--port", str(port), "--timeout", "20"],
+        cwd=REPO, env=env_for(tmp_path, WORKER_HEARTBEAT_INTERVAL="0.2"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    def serving(deadline=30):
+        end = time.monotonic() + deadline
+        while time.monotonic() < end:
+            try:
+                body = httpx.get(f"http://127.0.0.1:{port}/health", timeout=2).json()
+                pids = {w["pid"] for w in body["workers"] if w["state"] == "serving"}
+                yield body, pids
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        pytest.fail("server did not reach the expected state")
+
+    try:
+        for body, before in serving():
+            if len(before) == 2:
+                break
+        assert body["supervised"] is True
+
+        server.send_signal(signal.SIGHUP)
+        for body, after in serving():
+            # never fewer than two workers serving while they are replaced
+            assert len(after) >= 2
+            if len(after) == 2 and not after & before:
+                break
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=60) == 0
+
+
+def test_rolling_restart_applies_pending_migrations(tmp_path):
+    import sqlite3
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", "1", "--port", str(port), "--timeout", "20"],
+        cwd=REPO, env=env_for(tmp_path, WORKER_HEARTBEAT_INTERVAL="0.2"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    def worker_pids():
+        try:
+            body = httpx.get(f"http://127.0.0.1:{port}/health", timeout=2).json()
+        except httpx.HTTPError:
+            return set()
+        return {w["pid"] for w in body["workers"] if w["state"] == "serving"}
+
+    def wait_for(condition, deadline=30):
+        end = time.monotonic() + deadline
+        while time.monotonic() < end:
+            value = condition()
+            if value:
+                return value
+            time.sleep(0.2)
+        pytest.fail("server did not reach the expected state")
+
+    try:
+        before = wait_for(worker_pids)
+        # a deploy whose code is one migration ahead of the database
+        with sqlite3.connect(tmp_path / "app.db") as db:
+            db.execute("DROP TRIGGER calculation_stats_insert")
+            db.execute("UPDATE alembic_version SET version_num = '0003'")
+
+        server.send_signal(signal.SIGHUP)
+        wait_for(lambda: (pids := worker_pids()) and not pids & before)
+        with sqlite3.connect(tmp_path / "app.db") as db:
+            assert db.execute("SELECT version_num FROM alembic_version").fetchone() == (SCHEMA_REVISION,)
+            assert db.execute(
+                "SELECT count(*) FROM sqlite_master WHERE name = 'calculation_stats_insert'"
+            ).fetchone() == (1,)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=60) == 0
+
+
+def test_health_outside_the_supervisor(client):
+    r = client.get("/health")
+    assert r.status_code == 200
+    assert r.json() == {"status": "ok", "supervised": False, "worker": {"pid": os.getpid()}}
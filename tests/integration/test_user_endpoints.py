@@ -12,6 +12,18 @@ def test_register_and_duplicate(client):
     assert r2.status_code == 400
 
 
+def test_duplicate_registration_skips_the_password_hash(client, monkeypatch):
+    import main
+
+    client.post("/users/register", json={"username": "dupe", "email": "dupe@x.com", "password": "pass1234"})
+    hashed = []
+    monkeypatch.setattr(main, "hash_password", lambda password: hashed.append(password))
+    for payload in ({"username": "dupe", "email": "other@x.com"}, {"username": "other", "email": "dupe@x.com"}):
+        r = client.post("/users/register", json={**payload, "password": "pass1234"})
+        assert r.status_code == 400
+    assert hashed == []
+
+
 def test_login_success_and_failure(client):
     client.post(
         "/users/register",
@@ -30,3 +42,88 @@ def test_login_success_and_failure(client):
         json={"username_or_email": "loginuser", "password": "wrong"},
     )
     assert bad.status_code == 400
+
+
+def test_login_returns_503_when_hash_pool_saturated(client, monkeypatch):
+    import main
+    from app.security import HashPoolSaturated
+
+    client.post(
+        "/users/register",
+        json={"username": "busyuser", "email": "busy@x.com", "password": "pass1234"},
+    )
+
+    def saturated(*args):
+        raise HashPoolSaturated("Password hashing capacity exhausted")
+
+    monkeypatch.setattr(main, "verify_password", saturated)
+    r = client.post(
+        "/users/login",
+        json={"username_or_email": "busyuser", "password": "pass1234"},
+    )
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_token_is_signed_and_revocable(client):
+    client.post(
+        "/users/register",
+        json={"username": "tokuser", "email": "tok@x.com", "password": "pass1234"},
+    )
+    token = client.post(
+        "/users/login",
+        json={"username_or_email": "tokuser", "password": "pass1234"},
+    ).json()["token"]
+    assert token != "tokuser"
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/calculations", headers=headers).status_code == 200
+    assert client.get("/calculations", headers={"Authorization": "Bearer tokuser"}).status_code == 401
+
+    assert client.post("/users/logout", headers=headers).status_code == 204
+    r = client.get("/calculations", headers=headers)
+    assert r.status_code == 401
+    assert r.json() == {"error": "Token revoked"}
+
+
+def test_logout_while_the_revocation_store_is_down(client, register_and_login, monkeypatch):
+    import app.security as security
+
+    class Down:
+        def set(self, key, value, ex=None):
+            raise ConnectionError("store unreachable")
+
+        def get(self, key):
+            raise ConnectionError("store unreachable")
+
+    monkeypatch.setattr(security, "_revoked", security.RevocationList(Down()))
+    headers = register_and_login("outage")
+    assert client.post("/users/logout", headers=headers).status_code == 204
+    r = client.get("/calculations", headers=headers)
+    assert r.status_code == 401
+    assert r.json() == {"error": "Token revoked"}
+
+
+def test_cached_principal_skips_user_lookup(client):
+    from sqlalchemy import event
+    from app.db import engine
+
+    client.post(
+        "/users/register",
+        json={"username": "cacheuser", "email": "cache@x.com", "password": "pass1234"},
+    )
+    token = client.post(
+        "/users/login",
+        json={"username_or_email": "cacheuser", "password": "pass1234"},
+    ).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/calculations", headers=headers)
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/calculations", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not any("FROM users" in s for s in statements)
@@ -0,0 +1,56 @@
+# tests/integration/test_write_behind.py
+import pytest
+
+import main
+from app.db import SessionLocal
+from app.write_behind import WriteBehindBuffer
+
+
+@pytest.fixture
+def write_mode(monkeypatch):
+    def use(mode, **kwargs):
+        buffer = WriteBehindBuffer(SessionLocal, mode=mode, **kwargs)
+        monkeypatch.setattr(main, "write_buffer", buffer)
+        return buffer
+
+    return use
+
+
+def test_group_mode_returns_persisted_row(client, register_and_login, write_mode):
+    buffer = write_mode("group", interval=0.005)
+    headers = register_and_login("groupuser")
+
+    r = client.post("/calculations", json={"a": 6, "b": 7, "type": "Multiply"}, headers=headers)
+    assert r.status_code == 200
+    created = r.json()
+    assert created["result"] == 42
+    assert buffer.stats()["flushed"] == 1
+
+    fetched = client.get(f"/calculations/{created['id']}", headers=headers).json()
+    assert fetched["result"] == 42
+
+
+def test_async_mode_accepts_then_persists_on_close(client, register_and_login, write_mode):
+    buffer = write_mode("async", interval=60)
+    headers = register_and_login("asyncuser")
+
+    r = client.post("/calculations", json={"a": 1, "b": 2, "type": "Add"}, headers=headers)
+    assert r.status_code == 202
+    assert r.json()["id"] is None
+    assert r.json()["result"] == 3
+    assert client.get("/calculations", headers=headers).json() == []
+
+    buffer.close()
+    rows = client.get("/calculations", headers=headers).json()
+    assert [row["result"] for row in rows] == [3]
+
+
+def test_full_buffer_returns_503(client, register_and_login, write_mode):
+    buffer = write_mode("async", interval=60, max_pending=1, enqueue_timeout=0)
+    headers = register_and_login("fulluser")
+
+    client.post("/calculations", json={"a": 1, "b": 2, "type": "Add"}, headers=headers)
+    r = client.post("/calculations", json={"a": 1, "b": 2, "type": "Add"}, headers=headers)
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+    buffer.close()
@@ -0,0 +1,115 @@
+import math
+import time
+
+import pytest
+
+from app.cache import LocalSharedBackend, ResultCache, TTLCache, result_key
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_expiry():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_pop_and_clear():
+    cache = TTLCache()
+    cache.set("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "gone") == "gone"
+    cache.set("b", 2)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def counting(fn):
+    calls = []
+
+    def wrapper(a, b):
+        calls.append((a, b))
+        return fn(a, b)
+
+    wrapper.calls = calls
+    return wrapper
+
+
+def test_result_cache_hits_and_stats():
+    cache = ResultCache(maxsize=10)
+    add = counting(lambda a, b: a + b)
+    assert cache.get_or_compute("Add", 1.0, 2.0, add) == 3.0
+    assert cache.get_or_compute("Add", 1.0, 2.0, add) == 3.0
+    assert cache.get_or_compute("Subtract", 1.0, 2.0, lambda a, b: a - b) == -1.0
+    assert len(add.calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_signed_zero_and_nan_keys():
+    assert result_key("Add", 0.0, 0.0) != result_key("Add", -0.0, 0.0)
+    assert result_key("Add", float("nan"), 1.0) == result_key("Add", float("nan"), 1.0)
+
+    cache = ResultCache(maxsize=10)
+    add = lambda a, b: a + b
+    assert math.copysign(1, cache.get_or_compute("Add", 0.0, -0.0, add)) == 1
+    assert math.copysign(1, cache.get_or_compute("Add", -0.0, -0.0, add)) == -1
+    nan_add = counting(add)
+    assert math.isnan(cache.get_or_compute("Add", float("nan"), 1.0, nan_add))
+    assert math.isnan(cache.get_or_compute("Add", float("nan"), 1.0, nan_add))
+    assert len(nan_add.calls) == 1
+
+
+def test_exceptions_are_not_cached():
+    cache = ResultCache(maxsize=10)
+
+    def boom(a, b):
+        raise ValueError("Cannot divide by zero!")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.get_or_compute("Divide", 1.0, 0.0, boom)
+    assert cache.stats()["size"] == 0
+
+
+def test_shared_tier_is_consulted_across_instances():
+    shared = LocalSharedBackend()
+    first, second = ResultCache(shared=shared), ResultCache(shared=shared)
+    first.get_or_compute("Multiply", -0.0, 3.0, lambda a, b: a * b)
+    result = second.get_or_compute("Multiply", -0.0, 3.0, lambda a, b: pytest.fail("recomputed"))
+    assert math.copysign(1, result) == -1
+    assert second.stats()["shared_hits"] == 1
+
+
+def test_shared_tier_failure_degrades_to_miss():
+    class Down:
+        def get(self, key):
+            raise ConnectionError("down")
+
+        def set(self, key, value, ex=None):
+            raise ConnectionError("down")
+
+    cache = ResultCache(shared=Down())
+    assert cache.get_or_compute("Add", 1.0, 1.0, lambda a, b: a + b) == 2.0
+    assert cache.stats()["shared_errors"] == 2
+
+
+def test_disabled_cache_always_computes():
+    cache = ResultCache(maxsize=0)
+    add = counting(lambda a, b: a + b)
+    cache.get_or_compute("Add", 1.0, 1.0, add)
+    cache.get_or_compute("Add", 1.0, 1.0, add)
+    assert len(add.calls) == 2
@@ -232,3 +232,24 @@ def test_divide_by_zero() -> None:
     # Assert that the exception message contains the expected error message
     assert "Cannot divide by zero!" in str(excinfo.value), \
         f"Expected error message 'Cannot divide by zero!', but got '{excinfo.value}'"
+
+
+# ---------------------------------------------
+# Array Operands
+# ---------------------------------------------
+
+def test_array_operands_broadcast() -> None:
+    """Array-like operands are evaluated element by element and broadcast."""
+    import array
+    import numpy as np
+
+    assert add([1, 2, 3], 1).tolist() == [2, 3, 4]
+    assert subtract(np.array([5.0, 6.0]), [1, 2]).tolist() == [4, 4]
+    assert multiply(array.array("d", [1.5, 2.0]), 2).tolist() == [3, 4]
+
+
+def test_array_divide_masks_zero_divisors() -> None:
+    """Array division masks zero divisors instead of raising."""
+    result = divide([6, 1, 9], [3, 0, 3])
+    assert result.mask.tolist() == [False, True, False]
+    assert result.compressed().tolist() == [2, 3]
@@ -0,0 +1,42 @@
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app.db import DatabaseSettings, create_db_engine
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.delenv("TESTING", raising=False)
+    monkeypatch.setenv("DATABASE_URL", "postgresql://u:p@db:5432/app")
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "1500")
+    settings = DatabaseSettings.from_env()
+    assert settings.url == "postgresql://u:p@db:5432/app"
+    assert settings.pool_size == 20
+    assert settings.pool_pre_ping is False
+    assert settings.statement_timeout_ms == 1500
+    assert settings.max_overflow == DatabaseSettings.max_overflow
+
+
+def test_testing_forces_in_memory(monkeypatch):
+    monkeypatch.setenv("TESTING", "1")
+    monkeypatch.setenv("DATABASE_URL", "postgresql://u:p@db:5432/app")
+    assert DatabaseSettings.from_env().url == "sqlite:///:memory:"
+
+
+def test_sqlite_file_uses_wal_and_pool(tmp_path):
+    engine = create_db_engine(DatabaseSettings(url=f"sqlite:///{tmp_path / 'app.db'}", pool_size=3))
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == 3
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    engine.dispose()
+
+
+def test_sqlite_memory_shares_one_connection():
+    engine = create_db_engine(DatabaseSettings(url="sqlite:///:memory:"))
+    assert isinstance(engine.pool, StaticPool)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.expressions import ExpressionError, compile_expression
+
+
+@pytest.mark.parametrize("source, variables, expected", [
+    ("1 + 2 * 3", {}, 7),
+    ("(1 + 2) * 3", {}, 9),
+    ("2^3 + 1", {}, 9),
+    ("2^3^2", {}, 512),
+    ("-x^2", {"x": 3}, -9),
+    ("sqrt(x) + max(x, y) % 4", {"x": 16, "y": 2}, 4),
+    ("2 * pi", {}, 2 * math.pi),
+])
+def test_evaluate_scalar(source, variables, expected):
+    assert float(compile_expression(source).evaluate(variables)) == pytest.approx(expected)
+
+
+def test_evaluate_vectorized_bindings():
+    expression = compile_expression("a / b + c")
+    result = expression.evaluate({"a": np.array([6.0, 1.0, 9.0]), "b": [3, 0, 3], "c": 1})
+    assert result[0] == 3
+    assert math.isinf(result[1])
+    assert result[2] == 4
+
+
+def test_variables_are_collected():
+    assert compile_expression("x * y + sin(pi * z)").variables == {"x", "y", "z"}
+
+
+def test_compiled_expressions_are_cached():
+    assert compile_expression("x + 41") is compile_expression("x + 41")
+
+
+def test_huge_powers_overflow_instead_of_hanging():
+    assert math.isinf(compile_expression("9^9^9").evaluate({}))
+
+
+@pytest.mark.parametrize("source", [
+    "__import__('os')",
+    "x.real",
+    "x[0]",
+    "lambda: 1",
+    "'text'",
+    "True + 1",
+    "x if y else z",
+    "sin",
+    "nope(1)",
+    "max(1)",
+    "sqrt(x=1)",
+    "_k0 + 1",
+    "1 +",
+    "x" * 1001,
+    "+".join(["1"] * 300),
+    "1" * 400,
+])
+def test_rejected_expressions(source):
+    with pytest.raises(ExpressionError):
+        compile_expression(source)
+
+
+def test_missing_variable():
+    with pytest.raises(ExpressionError, match="Missing variables: y"):
+        compile_expression("x + y").evaluate({"x": 1})
@@ -14,3 +14,27 @@ def test_compute(type, a, b, expected):
 def test_compute_invalid():
     with pytest.raises(ValueError):
         compute("Unknown", 1, 1)
+
+def test_compute_many_mixed_types_and_zero_division():
+    from app.factory.calculation_factory import compute_many
+
+    result = compute_many(
+        [CalculationType.Add, CalculationType.Divide, "Divide", CalculationType.Multiply],
+        [1, 4, 4, 3],
+        [2, 0, 2, 3],
+    )
+    assert result.mask.tolist() == [False, True, False, False]
+    assert result.compressed().tolist() == [3, 2, 9]
+
+def test_compute_many_accepts_string_arrays_and_broadcasts():
+    import numpy as np
+    from app.factory.calculation_factory import compute_many
+
+    result = compute_many(np.array(["Add", "Subtract"]), np.array([10.0, 10.0]), 1)
+    assert result.tolist() == [11, 9]
+
+def test_compute_many_invalid_type():
+    from app.factory.calculation_factory import compute_many
+
+    with pytest.raises(ValueError):
+        compute_many(["Add", "Modulo"], [1, 1], [1, 1])
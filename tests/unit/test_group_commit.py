@@ -0,0 +1,105 @@
+# tests/unit/test_group_commit.py
+import threading
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, GroupCommitter
+from app.models.user import User
+import app.models.calculation  # noqa: F401
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'gc.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def add_user(name):
+    stmt = insert(User).values(username=name, email=f"{name}@example.com", password_hash="x").returning(User.id)
+    return lambda session: session.execute(stmt).scalar_one()
+
+
+def usernames(session_factory):
+    with session_factory() as db:
+        return sorted(db.execute(select(User.username)).scalars())
+
+
+def test_disabled_runs_on_callers_session(session_factory):
+    committer = GroupCommitter(session_factory, enabled=False)
+    with session_factory() as db:
+        assert isinstance(committer.execute(db, add_user("solo")), int)
+        with pytest.raises(IntegrityError):
+            committer.execute(db, add_user("solo"))
+        # the failed write was rolled back and the session is usable again
+        committer.execute(db, add_user("other"))
+    assert usernames(session_factory) == ["other", "solo"]
+    assert committer.stats()["commits"] == 0
+
+
+def test_concurrent_writes_share_commits(session_factory):
+    committer = GroupCommitter(session_factory, enabled=True, window=0.05)
+    ids = []
+    threads = [
+        threading.Thread(target=lambda i=i: ids.append(committer.execute(None, add_user(f"user{i}"))))
+        for i in range(10)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    committer.close()
+
+    assert len(set(ids)) == 10
+    stats = committer.stats()
+    assert stats["writes"] == 10
+    assert stats["commits"] < 10
+    assert len(usernames(session_factory)) == 10
+
+
+def test_failing_write_only_fails_its_caller(session_factory):
+    committer = GroupCommitter(session_factory, enabled=True, window=0.05)
+    committer.execute(None, add_user("taken"))
+    outcomes = {}
+
+    def write(name, key):
+        try:
+            outcomes[key] = committer.execute(None, add_user(name))
+        except IntegrityError as e:
+            outcomes[key] = e
+
+    threads = [threading.Thread(target=write, args=(name, key)) for key, name in enumerate(["a1", "taken", "b2"])]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    committer.close()
+
+    assert isinstance(outcomes[1], IntegrityError)
+    assert isinstance(outcomes[0], int) and isinstance(outcomes[2], int)
+    assert usernames(session_factory) == ["a1", "b2", "taken"]
+
+
+def test_close_stops_and_restarts_lazily(session_factory):
+    committer = GroupCommitter(session_factory, enabled=True)
+    committer.execute(None, add_user("before"))
+    committer.close()
+    committer.execute(None, add_user("after"))
+    committer.close()
+    assert usernames(session_factory) == ["after", "before"]
+
+
+def test_waiting_callers_do_not_starve_the_writer(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'gc1.db'}", pool_size=1, max_overflow=0, pool_timeout=1)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    committer = GroupCommitter(factory, enabled=True)
+    with factory() as db:
+        db.execute(select(func.count(User.id)))  # the request's session holds the only connection
+        assert isinstance(committer.execute(db, add_user("pooled")), int)
+    committer.close()
+    engine.dispose()
@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from app.security import HashPool, HashPoolSaturated
+
+
+def test_run_returns_result_and_records_stats():
+    pool = HashPool(workers=2, max_queue=2)
+    assert pool.run(lambda x: x * 2, 21) == 42
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["latency_seconds_total"] > 0
+    pool.shutdown()
+
+
+def test_rejects_when_saturated():
+    pool = HashPool(workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    t = threading.Thread(target=pool.run, args=(block,))
+    t.start()
+    started.wait(5)
+    with pytest.raises(HashPoolSaturated):
+        pool.run(lambda: None)
+    assert pool.stats()["rejected"] == 1
+    release.set()
+    t.join()
+    pool.shutdown()
+
+
+def test_invalid_kind():
+    with pytest.raises(ValueError):
+        HashPool(workers=1, max_queue=1, kind="fiber")
+
+
+def test_default_admission_leaves_most_handler_threads_free():
+    from app.db import DB_THREADPOOL_SIZE
+    from app.security import hash_pool
+
+    assert hash_pool.workers + hash_pool.max_queue <= DB_THREADPOOL_SIZE // 2
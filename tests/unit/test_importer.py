@@ -0,0 +1,126 @@
+# tests/unit/test_importer.py
+import io
+import json
+import warnings
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+import app.importer as importer
+from app.db import Base
+from app.importer import ImportFormatError, detect_format, read_chunks, run_import, validate
+from app.models.calculation import Calculation
+from app.models.calculation_stats import CalculationStat, CalculationVersion
+from app.models.user import User
+
+NOW = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(User(id=1, username="importer", email="importer@example.com", password_hash="x"))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def chunks(data: str, format: str, chunk_size: int = 100):
+    return list(read_chunks(io.BytesIO(data.encode()), format, chunk_size))
+
+
+def test_detect_format():
+    assert detect_format("text/csv; charset=utf-8") == "csv"
+    assert detect_format("application/x-ndjson") == "ndjson"
+    assert detect_format("application/json") is None
+    assert detect_format(None) is None
+
+
+def test_csv_header_is_checked_up_front():
+    with pytest.raises(ImportFormatError, match="type"):
+        read_chunks(io.BytesIO(b"a,b\n1,2\n"), "csv")
+    with pytest.raises(ImportFormatError):
+        read_chunks(io.BytesIO(b""), "xml")
+
+
+def test_csv_columns_by_name_and_chunking():
+    data = "﻿id,type,b,a,result\n1,Add,2,1,3\n2,Multiply,3,2,6\n\n3,Subtract,1,5,4\n"
+    parsed = chunks(data, "csv", chunk_size=2)
+    assert [c.lines for c in parsed] == [[2, 3], [5]]
+    assert parsed[0].a == ["1", "2"] and parsed[0].type == ["Add", "Multiply"]
+
+
+@pytest.mark.parametrize("loads", ["orjson", "stdlib"])
+def test_validate_reports_each_kind_of_reject(monkeypatch, loads):
+    if loads == "stdlib":
+        monkeypatch.setattr(importer, "_loads", json.loads)
+    data = "\n".join([
+        '{"a": 1, "b": 2, "type": "Add"}',
+        '{"a": 1, "b": 0, "type": "Divide"}',
+        '{"a": "x", "b": 1, "type": "Add"}',
+        '{"a": 1, "b": null, "type": "Add"}',
+        '{"a": 1, "b": 1, "type": "Power"}',
+        '{"a": 1, "b": 1, "type": "Add", "created_at": "yesterday"}',
+        "not json",
+        "[1, 2]",
+        '{"a": "2.5", "b": 2, "type": "Multiply", "created_at": "2024-05-01T10:30:00+02:00"}',
+        '{"a": 1e308, "b": 10, "type": "Multiply"}',
+        '{"a": 1e308, "b": 1e308, "type": "Add"}',
+    ])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        rows, rejects = validate(chunks(data, "ndjson")[0], NOW)
+    assert [(r.line, r.error) for r in rejects] == [
+        (2, "Cannot divide by zero!"),
+        (3, "a and b must be finite numbers"),
+        (4, "a and b must be finite numbers"),
+        (5, "Unsupported calculation type"),
+        (6, "Invalid created_at"),
+        (7, "Invalid JSON"),
+        (8, "Expected a JSON object"),
+        (10, "Result is not a finite number"),
+        (11, "Result is not a finite number"),
+    ]
+    assert rows.result.tolist() == [3.0, 5.0]
+    assert rows.type.tolist() == ["Add", "Multiply"]
+    assert [str(ts) for ts in rows.created_at] == ["2026-01-02T03:04:05.000000", "2024-05-01T08:30:00.000000"]
+
+
+def test_run_import_inserts_and_rolls_up(session_factory):
+    lines = ["a,b,type,created_at"]
+    lines += [f"{i},2,Multiply,2024-03-01T10:{i % 60:02d}:00" for i in range(250)]
+    lines += ["1,0,Divide,", "3,1,Add,2024-03-01T11:00:00Z"]
+    with session_factory() as db:
+        schema_version = db.execute(text("PRAGMA schema_version")).scalar_one()
+    updates = list(run_import(session_factory, 1, read_chunks(io.BytesIO("\n".join(lines).encode()), "csv", 100)))
+
+    assert [(p.rows, p.imported, p.rejected) for p in updates] == [(100, 100, 0), (200, 200, 0), (252, 251, 1)]
+    assert updates[-1].rejects[0].line == 252
+    with session_factory() as db:
+        assert db.execute(select(func.count()).select_from(Calculation)).scalar_one() == 251
+        stats = {
+            (s.type.value, s.bucket.hour): (s.count, s.total, s.min_result, s.max_result)
+            for s in db.query(CalculationStat)
+        }
+        assert stats == {("Multiply", 10): (250, 2 * sum(range(250)), 0, 498), ("Add", 11): (1, 4, 4, 4)}
+        # one version bump per chunk
+        assert db.get(CalculationVersion, 1).version == 3
+        # no DDL ran, so other connections keep their prepared statements,
+        # and the triggers are back on for everyone else
+        assert db.execute(text("PRAGMA schema_version")).scalar_one() == schema_version
+        db.add(Calculation(user_id=1, a=1, b=1, type="Add", result=2, created_at=datetime(2024, 3, 1, 11, 5)))
+        db.commit()
+        assert db.query(CalculationStat.count).filter(CalculationStat.type == "Add").scalar() == 2
+        assert db.get(CalculationVersion, 1).version == 4
+
+
+def test_run_import_caps_listed_rejects(session_factory):
+    data = "a,b,type\n" + "1,0,Divide\n" * 5
+    updates = list(run_import(session_factory, 1, read_chunks(io.BytesIO(data.encode()), "csv", 2), max_rejects=3))
+    assert [len(p.rejects) for p in updates] == [2, 1, 0]
+    assert updates[-1].rejected == 5
@@ -0,0 +1,104 @@
+import io
+import json
+import logging
+import time
+
+import pytest
+
+from app import logging_config
+from app.logging_config import configure_logging
+from app.operations import add
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    ops = logging.getLogger("app.operations")
+    ops_level, rate = ops.level, logging_config._sample_rate
+    yield
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    ops.setLevel(ops_level)
+    logging_config._sample_rate = rate
+
+
+def emitted(mode, fmt="text", calls=1):
+    stream = io.StringIO()
+    listener = configure_logging(mode=mode, sample_rate=0.0, fmt=fmt, stream=stream)
+    for _ in range(calls):
+        add(2, 3)
+    listener.stop()
+    return stream.getvalue().splitlines()
+
+
+def test_full_mode_logs_every_call(restore_logging):
+    assert emitted("full", calls=3) == ["INFO:app.operations:add: 2 + 3 = 5"] * 3
+
+
+def test_off_and_sampled_modes_drop_info(restore_logging):
+    assert emitted("off") == []
+    assert emitted("sampled") == []
+
+
+def test_json_format_carries_structured_fields(restore_logging):
+    (line,) = emitted("full", fmt="json")
+    entry = json.loads(line)
+    assert entry["op"] == "add"
+    assert (entry["a"], entry["b"], entry["result"]) == (2, 3, 5)
+
+
+def test_sampled_mode_keeps_errors(restore_logging):
+    from app.operations import divide
+
+    stream = io.StringIO()
+    listener = configure_logging(mode="sampled", sample_rate=0.0, stream=stream)
+    with pytest.raises(ValueError):
+        divide(1, 0)
+    listener.stop()
+    assert stream.getvalue() == "ERROR:app.operations:divide: attempt to divide 1 by zero\n"
+
+
+def test_hot_path_records_are_built_on_the_listener(restore_logging):
+    stream = io.StringIO()
+    listener = configure_logging(mode="full", fmt="json", stream=stream)
+    # pytest's capture handlers sit on root too; without them the caller
+    # only enqueues a tuple
+    logging.getLogger().handlers[:] = [logging_config._queue_handler]
+    before = time.time()
+    add(2, 3)
+    listener.stop()
+    entry = json.loads(stream.getvalue())
+    assert entry["msg"] == "add: 2 + 3 = 5"
+    assert (entry["level"], entry["logger"], entry["op"], entry["result"]) == ("INFO", "app.operations", "add", 5)
+    assert before <= entry["ts"] <= time.time()
+
+
+def test_other_handlers_still_see_hot_path_records(restore_logging):
+    records = []
+    listener = configure_logging(mode="full", stream=io.StringIO())
+    capture = logging.Handler()
+    capture.emit = records.append
+    logging.getLogger().addHandler(capture)
+    add(2, 3)
+    listener.stop()
+    assert [r.getMessage() for r in records] == ["add: 2 + 3 = 5"]
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        configure_logging(mode="verbose")
+
+
+def test_shutdown_detaches_the_queue_until_setup_runs_again(restore_logging):
+    def queue_handlers():
+        return [h for h in logging.getLogger().handlers if isinstance(h, logging_config.DeferredQueueHandler)]
+
+    logging_config.shutdown_logging()
+    logging_config.setup_logging()
+    assert len(queue_handlers()) == 1
+    logging_config.shutdown_logging()
+    assert queue_handlers() == []
+    logging_config.setup_logging()
+    assert len(queue_handlers()) == 1
+    logging_config.shutdown_logging()
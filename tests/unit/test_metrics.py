@@ -0,0 +1,79 @@
+# tests/unit/test_metrics.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.metrics import Counter, Gauge, Histogram, Registry, db_queries_total, instrument_engine, stats_metrics
+
+
+def test_counter_renders_labelled_samples():
+    c = Counter("requests_total", "Requests.", ("route", "status"))
+    c.inc(("/add", "200"))
+    c.inc(("/add", "200"))
+    c.inc(("/add", "400"))
+
+    text = "\n".join(c.render())
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/add",status="200"} 2.0' in text
+    assert 'requests_total{route="/add",status="400"} 1.0' in text
+
+
+def test_gauge_moves_both_ways():
+    g = Gauge("in_flight", "In flight.")
+    g.inc()
+    g.inc()
+    g.dec()
+    assert g.value() == 1.0
+    g.set(7)
+    assert g.value() == 7
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        h.observe(value)
+
+    lines = h.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_count 4" in lines
+    assert h.count() == 4
+
+
+def test_label_values_are_escaped():
+    c = Counter("x_total", "X.", ("path",))
+    c.inc(('a"b\\c',))
+    assert 'x_total{path="a\\"b\\\\c"} 1.0' in c.render()
+
+
+def test_registry_runs_collectors_only_on_render():
+    calls = []
+
+    def collector():
+        calls.append(1)
+        return stats_metrics("pool", {"size": 3, "kind": "thread", "completed": 5}, "Pool", counters=("completed",))
+
+    registry = Registry()
+    registry.add_collector(collector)
+    assert calls == []
+
+    text = registry.render()
+    assert calls == [1]
+    assert "# TYPE pool_size gauge" in text and "pool_size 3" in text
+    assert "# TYPE pool_completed_total counter" in text and "pool_completed_total 5" in text
+    assert "pool_kind" not in text
+
+
+def test_failed_statements_do_not_unbalance_query_timing():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+        before = db_queries_total.value()
+        connection.execute(text("SELECT 1"))
+        assert connection.info["query_start"] == []
+    assert db_queries_total.value() == before + 1
+    engine.dispose()
@@ -0,0 +1,81 @@
+# tests/unit/test_profiling.py
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.profiling import (
+    Profile, StackSampler, _current, profile_engine, profile_phase, profiled, record_phase,
+)
+
+
+def test_phases_are_noops_without_a_profile():
+    with profile_phase("db"):
+        pass
+    record_phase("hash", 1.0)
+    assert _current.get() is None
+
+
+def test_phases_accumulate_on_the_current_profile():
+    profile = Profile("test")
+    token = _current.set(profile)
+    try:
+        with profile_phase("db"):
+            time.sleep(0.01)
+        with profile_phase("db"):
+            pass
+        record_phase("hash", 0.5)
+
+        @profiled("auth")
+        def check():
+            return "ok"
+
+        assert check() == "ok"
+    finally:
+        _current.reset(token)
+
+    assert profile.phases["db"] >= 0.01
+    assert profile.phases["hash"] == 0.5
+    assert "auth" in profile.phases
+    assert 'hash;dur=500.000;desc="bcrypt"' in profile.server_timing()
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_stack_sampler_records_the_watched_thread():
+    profile = Profile("busy", sample_stacks=True)
+    profile.start()
+    busy(0.05)
+    profile.stop()
+
+    document = profile.speedscope()
+    frames = document["shared"]["frames"]
+    samples = document["profiles"][0]["samples"]
+    assert samples
+    assert any(frames[i]["name"] == "busy" for stack in samples for i in stack)
+
+
+def test_empty_document_is_valid_speedscope():
+    document = StackSampler.empty("nothing")
+    assert document["profiles"][0]["samples"] == []
+    assert document["$schema"].startswith("https://www.speedscope.app/")
+
+
+def test_failed_statements_leave_no_db_start_behind():
+    engine = create_engine("sqlite://")
+    profile_engine(engine)
+    token = _current.set(Profile("test"))
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+            connection.execute(text("SELECT 1"))
+            assert connection.info["profile_start"] == []
+    finally:
+        _current.reset(token)
+        engine.dispose()
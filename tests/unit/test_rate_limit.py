@@ -0,0 +1,162 @@
+# tests/unit/test_rate_limit.py
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import app.rate_limit as rate_limit
+from app.rate_limit import (
+    CounterBackend,
+    Limit,
+    LocalCounterStore,
+    LoopLagMonitor,
+    MemoryBackend,
+    PoolWaitMonitor,
+    RateLimiter,
+    parse_limit,
+    parse_rules,
+)
+from app.security import create_access_token
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable clock standing in for the time module inside app.rate_limit."""
+    fake = SimpleNamespace(now=1_000_000.0)
+    fake.monotonic = fake.time = lambda: fake.now
+    monkeypatch.setattr(rate_limit, "time", fake)
+    return fake
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("100/s", Limit(100, 1.0)),
+    ("10/m", Limit(10, 60.0)),
+    ("500/5m", Limit(500, 300.0)),
+    ("3 / 2", Limit(3, 2.0)),
+    ("1/h", Limit(1, 3600.0)),
+])
+def test_parse_limit(spec, expected):
+    assert parse_limit(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["", "0/s", "ten/s", "10/0", "10/d", "10"])
+def test_parse_limit_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_limit(spec)
+
+
+def test_parse_rules_match_route_templates():
+    rules = parse_rules("post /users/login=10/m; GET /calculations/{calc_id}=5/s;")
+    assert [rule.name for rule in rules] == ["POST /users/login", "GET /calculations/{calc_id}"]
+    assert rules[0].matches("POST", "/users/login")
+    assert not rules[0].matches("GET", "/users/login")
+    assert rules[1].matches("GET", "/calculations/42")
+    assert not rules[1].matches("GET", "/calculations/42/extra")
+    with pytest.raises(ValueError):
+        parse_rules("/users/login=10/m")
+
+
+@pytest.mark.anyio
+async def test_memory_backend_allows_a_burst_then_refills(clock):
+    backend, limit = MemoryBackend(), Limit(3, 3.0)
+    assert [await backend.hit("k", limit) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert await backend.hit("k", limit) == pytest.approx(1.0)
+    assert await backend.hit("other", limit) == 0.0
+
+    clock.now += 1.0
+    assert await backend.hit("k", limit) == 0.0
+    assert await backend.hit("k", limit) > 0
+
+
+@pytest.mark.anyio
+async def test_counter_backend_shares_budget_across_workers(clock):
+    store = LocalCounterStore()
+    workers, limit = [CounterBackend(store), CounterBackend(store)], Limit(4, 10.0)
+    results = [await workers[i % 2].hit("k", limit) for i in range(5)]
+    assert results[:4] == [0.0] * 4
+    assert 0 < results[4] <= 10.0
+
+    # halfway through the next window, half of the previous one (rejected
+    # request included) still counts: 2.5 + 1 fits, 2.5 + 2 does not
+    clock.now += 15.0
+    assert await workers[0].hit("k", limit) == 0.0
+    assert await workers[1].hit("k", limit) == pytest.approx(1.0)
+
+
+def test_client_key_prefers_a_valid_token():
+    limiter = RateLimiter()
+    scope = {"client": ("10.0.0.1", 5000), "headers": []}
+    assert limiter.client_key(scope) == "ip:10.0.0.1"
+    scope["headers"] = [(b"authorization", f"Bearer {create_access_token(7, 'bob')}".encode())]
+    assert limiter.client_key(scope) == "user:7"
+    scope["headers"] = [(b"authorization", b"Bearer forged.token")]
+    assert limiter.client_key(scope) == "ip:10.0.0.1"
+
+
+@pytest.mark.anyio
+async def test_limiter_sheds_before_charging_budgets():
+    lag = LoopLagMonitor()
+    limiter = RateLimiter(default=Limit(1, 60.0), loop_lag=lag, shed_loop_lag=0.1)
+    scope = {"method": "GET", "path": "/calculations", "client": ("10.0.0.1", 1), "headers": []}
+    lag.lag = 0.5
+    assert (await limiter.check(scope)).status_code == 503
+    lag.lag = 0.0
+    assert await limiter.check(scope) is None
+    response = await limiter.check(scope)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 59
+    assert limiter.stats()["shed_loop_lag"] == 1
+    assert limiter.stats()["limited"] == 1
+
+
+@pytest.mark.anyio
+async def test_limiter_fails_open_when_the_backend_is_down():
+    class Down:
+        async def hit(self, key, limit):
+            raise ConnectionError("store unreachable")
+
+    limiter = RateLimiter(default=Limit(1, 60.0), backend=Down())
+    scope = {"method": "GET", "path": "/", "client": None, "headers": []}
+    assert await limiter.check(scope) is None
+    assert limiter.stats()["backend_errors"] == 1
+
+
+@pytest.mark.anyio
+async def test_loop_lag_monitor_sees_a_blocked_loop():
+    monitor = LoopLagMonitor(interval=0.01)
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.02)
+    time.sleep(0.2)  # block the loop
+    await asyncio.sleep(0.005)
+    assert monitor.lag >= 0.09
+    await asyncio.sleep(0.1)
+    task.cancel()
+    assert monitor.lag < 0.05
+
+
+def test_pool_wait_monitor_times_blocked_checkouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0)
+    monitor = PoolWaitMonitor(engine, window=0.5)
+    held = engine.connect()
+    waiter = threading.Thread(target=lambda: engine.connect().close())
+    waiter.start()
+    time.sleep(0.2)
+    assert monitor.wait() >= 0.15
+    held.close()
+    waiter.join()
+    assert monitor.wait() >= 0.15  # the finished wait is still recent
+    time.sleep(0.6)
+    assert monitor.wait() < 0.1
+
+    engine.dispose()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert monitor._last[1] > 0  # the replacement pool is instrumented too
@@ -0,0 +1,39 @@
+import json
+from datetime import datetime, timezone
+
+from app import responses
+from app.models.calculation import CalculationType
+from app.responses import FastJSONResponse, calculation_etag, collection_etag, etag_matches
+
+
+def test_render_with_and_without_orjson(monkeypatch):
+    content = [{"id": 1, "type": CalculationType.Add, "result": 2.5,
+                "created_at": datetime(2026, 1, 2, 3, 4, 5, 600000)},
+               {"id": 2, "result": float("nan"), "bounds": (float("-inf"), 1.0)}]
+    expected = [{"id": 1, "type": "Add", "result": 2.5, "created_at": "2026-01-02T03:04:05.600000"},
+                {"id": 2, "result": None, "bounds": [None, 1.0]}]
+    assert json.loads(FastJSONResponse(content).body) == expected
+    monkeypatch.setattr(responses, "orjson", None)
+    body = FastJSONResponse(content).body
+    assert b"NaN" not in body and b"Infinity" not in body
+    assert json.loads(body) == expected
+
+
+def test_etags_follow_versions_and_queries():
+    created = datetime(2026, 1, 2, 3, 4, 5, 600000)
+    tag = calculation_etag(7, None, created)
+    # naive SQLite values and aware PostgreSQL values tag alike
+    assert tag == calculation_etag(7, None, created.replace(tzinfo=timezone.utc))
+    assert calculation_etag(7, created.replace(microsecond=600001), created) != tag
+
+    listing = collection_etag(1, 3, "limit=10")
+    assert listing != collection_etag(1, 4, "limit=10")
+    assert listing != collection_etag(1, 3, "limit=20")
+    assert listing != collection_etag(2, 3, "limit=10")
+
+
+def test_etag_matches_if_none_match_lists():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
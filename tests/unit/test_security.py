@@ -1,7 +1,106 @@
-from app.security import hash_password, verify_password
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from app.cache import LocalSharedBackend
+from app.security import (
+    RevocationList,
+    create_access_token,
+    decode_access_token,
+    hash_password,
+    revoke_token,
+    verify_password,
+    InvalidToken,
+)
+
 
 def test_hash_and_verify():
     password = "supersecret"
     hashed = hash_password(password)
     assert verify_password(password, hashed)
     assert not verify_password("wrongpass", hashed)
+
+
+def test_token_round_trip():
+    claims = decode_access_token(create_access_token(7, "alice"))
+    assert claims["sub"] == 7
+    assert claims["usr"] == "alice"
+
+
+@pytest.mark.parametrize("token", ["", "garbage", "a.b.c", "e30.sig", "é.é"])
+def test_malformed_tokens_rejected(token):
+    with pytest.raises(InvalidToken):
+        decode_access_token(token)
+
+
+def test_tampered_token_rejected():
+    _, signature = create_access_token(1, "bob").split(".")
+    forged = create_access_token(2, "mallory").split(".")[0]
+    with pytest.raises(InvalidToken):
+        decode_access_token(f"{forged}.{signature}")
+
+
+def test_expired_token_rejected():
+    with pytest.raises(InvalidToken, match="expired"):
+        decode_access_token(create_access_token(1, "bob", ttl=-1))
+
+
+def test_revoked_token_rejected():
+    token = create_access_token(1, "bob")
+    revoke_token(token)
+    with pytest.raises(InvalidToken, match="revoked"):
+        decode_access_token(token)
+
+
+def test_passlib_loads_on_first_hash():
+    code = (
+        "import sys, main\n"
+        "assert 'passlib' not in sys.modules and 'uvicorn' not in sys.modules\n"
+        "from app.security import hash_password, verify_password\n"
+        "assert verify_password('secret-pass', hash_password('secret-pass'))\n"
+        "assert 'passlib' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[2], check=True)
+
+
+def test_refuses_to_start_without_secret_key():
+    env = {k: v for k, v in os.environ.items() if k not in ("SECRET_KEY", "TESTING")}
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.security"],
+        cwd=Path(__file__).resolve().parents[2], env=env, capture_output=True, text=True,
+    )
+    assert result.returncode != 0
+    assert "SECRET_KEY is not set" in result.stderr
+
+
+def test_revocations_reach_other_workers_through_the_shared_store():
+    class Down:
+        def get(self, key):
+            raise ConnectionError("store unreachable")
+
+    shared = LocalSharedBackend()
+    worker_a, worker_b = RevocationList(shared), RevocationList(shared)
+    expires_at = time.time() + 60
+    worker_a.add("jti-1", expires_at)
+    assert worker_b.contains("jti-1", expires_at)
+    assert not worker_b.contains("jti-2", expires_at)
+    assert not RevocationList(Down()).contains("jti-1", expires_at)
+
+
+def test_revocation_survives_a_store_outage(caplog):
+    class Down:
+        def set(self, key, value, ex=None):
+            raise ConnectionError("store unreachable")
+
+        def get(self, key):
+            raise ConnectionError("store unreachable")
+
+    revoked = RevocationList(Down())
+    expires_at = time.time() + 60
+    revoked.add("jti-1", expires_at)
+    # still revoked here, and the outage is on record
+    assert revoked.contains("jti-1", expires_at)
+    assert "revocation store unavailable" in caplog.text
@@ -0,0 +1,68 @@
+# tests/unit/test_supervisor.py
+import time
+
+import pytest
+
+from app import supervisor
+from app.metrics import http_requests_total
+from app.supervisor import WorkerTable
+
+
+@pytest.fixture
+def attached(monkeypatch):
+    table = WorkerTable(3)
+    table.write(1, pid=4321, started=time.time() - 5)
+    monkeypatch.setattr(supervisor, "_table", table)
+    monkeypatch.setattr(supervisor, "_slot", 1)
+    return table
+
+
+def test_slots_are_claimed_and_freed():
+    table = WorkerTable(2)
+    assert table.free_slot() == 0
+    table.write(0, pid=10, started=time.time())
+    assert table.free_slot() == 1
+    table.clear(0)
+    assert table.free_slot() == 0
+    assert table.snapshot() == []
+
+
+def test_describe_reports_starting_then_serving():
+    table = WorkerTable(1)
+    now = time.time()
+    table.write(0, pid=10, started=now - 2)
+    entry = table.describe(0, now)
+    assert (entry["state"], entry["healthy"], entry["heartbeat_age"]) == ("starting", True, None)
+
+    table.write(0, heartbeat=now - 0.5, requests=7, in_flight=2)
+    entry = table.describe(0, now)
+    assert entry == {
+        "slot": 0, "pid": 10, "state": "serving", "healthy": True,
+        "uptime": 2.0, "heartbeat_age": 0.5, "requests": 7, "in_flight": 2,
+    }
+
+
+def test_stale_heartbeat_is_unhealthy():
+    table = WorkerTable(1)
+    now = time.time()
+    table.write(0, pid=10, started=now - 100, heartbeat=now - supervisor.WORKER_TIMEOUT - 1)
+    assert table.describe(0, now)["healthy"] is False
+
+
+def test_publish_writes_heartbeat_and_load(attached):
+    http_requests_total.inc(("GET", "/x", "200"), 3)
+    supervisor.publish()
+    entry = attached.read(1)
+    assert entry["heartbeat"] > 0
+    assert entry["requests"] == http_requests_total.total() >= 3
+
+
+def test_worker_health(attached, monkeypatch):
+    supervisor.publish()
+    health = supervisor.worker_health()
+    assert health["supervised"] is True
+    assert health["worker"]["pid"] == 4321
+    assert [w["slot"] for w in health["workers"]] == [1]
+
+    monkeypatch.setattr(supervisor, "_table", None)
+    assert supervisor.worker_health()["supervised"] is False
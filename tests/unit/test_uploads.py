@@ -0,0 +1,94 @@
+import anyio
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.uploads import DuplexResponse, UploadAborted
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class Channel:
+    """ASGI receive/send over the given body parts; ``hang_up`` ends with a disconnect."""
+
+    def __init__(self, parts, hang_up=False):
+        self.parts, self.hang_up = list(parts), hang_up
+        self.sent = []
+        self.line_sent, self.finished = anyio.Event(), anyio.Event()
+
+    async def receive(self):
+        if self.parts:
+            part = self.parts.pop(0)
+            return {"type": "http.request", "body": part, "more_body": bool(self.parts) or self.hang_up}
+        if not self.hang_up:
+            # like a server: the channel stays quiet until the response is over
+            await self.finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        self.sent.append(message)
+        if message["type"] == "http.response.body" and message["body"]:
+            self.line_sent.set()
+        if message["type"] == "http.response.body" and not message["more_body"]:
+            self.finished.set()
+
+    def body(self):
+        return b"".join(m["body"] for m in self.sent if m["type"] == "http.response.body")
+
+
+def respond(channel, produce, receive=None, **kw):
+    receive = receive or channel.receive
+    request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+    return DuplexResponse(request, produce, media_type="text/plain", **kw)(request.scope, receive, channel.send)
+
+
+@pytest.mark.anyio
+async def test_lines_go_out_while_the_body_is_still_arriving():
+    channel = Channel([b"one\ntw", b"o\n"])
+
+    async def receive():
+        # the second part waits for the first line: this only finishes if
+        # the response streams while the upload is open
+        if len(channel.parts) == 1:
+            await channel.line_sent.wait()
+        return await channel.receive()
+
+    def produce(body):
+        for line in body:
+            yield line.decode().upper()
+
+    with anyio.fail_after(5):
+        await respond(channel, produce, receive)
+    assert channel.sent[0]["status"] == 200
+    assert channel.body() == b"ONE\nTWO\n"
+    assert channel.sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+
+@pytest.mark.anyio
+async def test_client_errors_before_the_first_line_become_a_400():
+    def produce(body):
+        raise ValueError(f"bad header: {body.readline().decode().strip()}")
+        yield
+
+    with pytest.raises(HTTPException) as excinfo:
+        await respond(Channel([b"x,y\n", b"1,2\n"]), produce, client_errors=(ValueError,))
+    assert (excinfo.value.status_code, excinfo.value.detail) == (400, "bad header: x,y")
+
+
+@pytest.mark.anyio
+async def test_a_hang_up_mid_upload_aborts_the_reader():
+    seen = []
+
+    def produce(body):
+        try:
+            body.read()
+        except UploadAborted as e:
+            seen.append(e)
+        yield "gone\n"
+
+    with anyio.fail_after(5):
+        await respond(Channel([b"partial"], hang_up=True), produce)
+    assert len(seen) == 1
@@ -0,0 +1,99 @@
+# tests/unit/test_write_behind.py
+import threading
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models.calculation import Calculation, CalculationType
+import app.models.user  # noqa: F401  (registers the users table for the FK)
+from app.write_behind import WriteBehindBuffer, WriteBehindFull
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wb.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def row(i):
+    return {"a": float(i), "b": 1.0, "type": CalculationType.Add, "result": i + 1.0}
+
+
+def count(session_factory):
+    with session_factory() as db:
+        return db.execute(select(func.count()).select_from(Calculation)).scalar_one()
+
+
+def test_rejects_unknown_mode(session_factory):
+    with pytest.raises(ValueError):
+        WriteBehindBuffer(session_factory, mode="eventually")
+
+
+def test_flushes_full_batches_in_one_transaction(session_factory):
+    buffer = WriteBehindBuffer(session_factory, batch_size=5, interval=60)
+    futures = [buffer.submit(row(i)) for i in range(10)]
+
+    ids = [f.result(timeout=5) for f in futures]
+    assert len(set(ids)) == 10
+    assert buffer.stats()["batches"] == 2
+    with session_factory() as db:
+        stored = dict(db.execute(select(Calculation.id, Calculation.a)).all())
+    assert [stored[i] for i in ids] == [float(i) for i in range(10)]
+    buffer.close()
+
+
+def test_partial_batch_flushes_after_interval(session_factory):
+    buffer = WriteBehindBuffer(session_factory, batch_size=100, interval=0.01)
+    assert isinstance(buffer.submit(row(1)).result(timeout=5), int)
+    assert buffer.stats()["flushed"] == 1
+    buffer.close()
+
+
+def test_close_flushes_pending_rows(session_factory):
+    buffer = WriteBehindBuffer(session_factory, mode="async", batch_size=100, interval=60)
+    for i in range(3):
+        buffer.submit(row(i))
+    assert count(session_factory) == 0
+
+    buffer.close()
+    assert count(session_factory) == 3
+    assert buffer.stats()["pending"] == 0
+
+
+def test_full_buffer_rejects_after_timeout(session_factory):
+    buffer = WriteBehindBuffer(session_factory, batch_size=100, interval=60, max_pending=2, enqueue_timeout=0.01)
+    buffer.submit(row(1))
+    buffer.submit(row(2))
+    with pytest.raises(WriteBehindFull):
+        buffer.submit(row(3))
+    assert buffer.stats()["rejected"] == 1
+    buffer.close()
+
+
+def test_blocked_producer_proceeds_once_space_frees(session_factory):
+    buffer = WriteBehindBuffer(session_factory, batch_size=1, interval=60, max_pending=1, enqueue_timeout=5)
+    futures = []
+    threads = [threading.Thread(target=lambda i=i: futures.append(buffer.submit(row(i)))) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(isinstance(f.result(timeout=5), int) for f in futures)
+    assert buffer.stats()["rejected"] == 0
+    buffer.close()
+
+
+def test_failed_flush_fails_the_batch(session_factory):
+    buffer = WriteBehindBuffer(session_factory, batch_size=1, interval=60)
+    bad = {"a": 1.0, "b": 1.0, "type": CalculationType.Add, "result": None}  # result is NOT NULL
+    future = buffer.submit(bad)
+    with pytest.raises(Exception):
+        future.result(timeout=5)
+    assert buffer.stats()["failed"] == 1
+    # the writer survives a failed batch
+    assert isinstance(buffer.submit(row(1)).result(timeout=5), int)
+    buffer.close()